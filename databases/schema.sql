@@ -21,6 +21,17 @@ CREATE TABLE IF NOT EXISTS data_sources (
     scraped_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+--- One row per upload chunk the uploader has processed, keyed by the scraper's
+--- idempotency key (file name | group key | chunk index). Replayed chunks from the
+--- scraper's outbox are answered from here instead of being inserted again.
+CREATE TABLE IF NOT EXISTS upload_receipts (
+    idempotency_key TEXT PRIMARY KEY,
+    source_id INTEGER REFERENCES data_sources(id) ON DELETE SET NULL,
+    storage_key TEXT NOT NULL,
+    records INTEGER NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
 CREATE TABLE IF NOT EXISTS stores (
     id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
     chain_id INTEGER NOT NULL REFERENCES chains(id) ON DELETE CASCADE,
@@ -107,17 +118,39 @@ CREATE TABLE IF NOT EXISTS product_components (
     PRIMARY KEY (parent_product_id, child_product_id)
 );
 
+--- price_events is partitioned by month on scraped_at: rows only ever land in the
+--- current month, so old partitions are immutable and can be detached/archived
+--- (see create_price_events_partitions / detach_price_events_partitions below).
+--- published_at (PriceUpdateDate) can be years old and is often NULL, so it is
+--- indexed with BRIN instead of being the partition key.
 CREATE TABLE IF NOT EXISTS price_events (
-    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY,
     product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
     store_id INTEGER NOT NULL REFERENCES stores(id) ON DELETE CASCADE,
     source_id INTEGER NOT NULL REFERENCES data_sources(id) ON DELETE CASCADE,
     price NUMERIC(10, 2) NOT NULL,
     --- unit price is the price per base unit
     unit_price NUMERIC(10, 2),
-    scraped_at TIMESTAMPTZ DEFAULT NOW(),
+    scraped_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
     published_at TIMESTAMPTZ,
-    raw_xml_item_data JSONB
+    raw_xml_item_data JSONB,
+    PRIMARY KEY (id, scraped_at)
+) PARTITION BY RANGE (scraped_at);
+
+--- Catches rows outside the created monthly partitions; should stay empty.
+CREATE TABLE IF NOT EXISTS price_events_default PARTITION OF price_events DEFAULT;
+
+--- Latest price per (product, store), upserted on every ingest. Comparison queries
+--- read this table and never scan price_events.
+CREATE TABLE IF NOT EXISTS latest_prices (
+    product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    store_id INTEGER NOT NULL REFERENCES stores(id) ON DELETE CASCADE,
+    source_id INTEGER REFERENCES data_sources(id) ON DELETE SET NULL,
+    price NUMERIC(10, 2) NOT NULL,
+    unit_price NUMERIC(10, 2),
+    published_at TIMESTAMPTZ,
+    scraped_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (product_id, store_id)
 );
 
 ---
@@ -125,9 +158,161 @@ CREATE TABLE IF NOT EXISTS price_events (
 ---
 
 CREATE INDEX IF NOT EXISTS idx_price_events_product_id ON price_events(product_id);
-CREATE INDEX IF NOT EXISTS idx_price_events_scraped_at ON price_events(scraped_at);
+--- Time columns grow with insertion order, so BRIN indexes stay tiny and cheap to maintain.
+CREATE INDEX IF NOT EXISTS idx_price_events_scraped_at ON price_events USING BRIN (scraped_at);
+CREATE INDEX IF NOT EXISTS idx_price_events_published_at ON price_events USING BRIN (published_at);
+CREATE INDEX IF NOT EXISTS idx_latest_prices_store_id ON latest_prices(store_id);
 CREATE INDEX IF NOT EXISTS idx_price_events_source_id ON price_events(source_id);
 CREATE INDEX IF NOT EXISTS idx_product_identifiers_code ON product_identifiers(external_code);
 CREATE INDEX IF NOT EXISTS idx_brands_parent ON brands(parent_brand_id);
 CREATE INDEX IF NOT EXISTS idx_categories_parent ON categories(parent_id);
 CREATE INDEX IF NOT EXISTS idx_stores_location ON stores(latitude, longitude);
+
+---
+--- 5. תחזוקת מחיצות (Partition maintenance)
+---
+
+--- Creates the monthly price_events partitions from the current month up to
+--- months_ahead months ahead (idempotent). Run monthly, e.g. from
+--- scripts/maintain_partitions.sh.
+--- If the month's rows already landed in price_events_default (maintenance did not
+--- run in time), CREATE ... PARTITION OF would fail on them. The default partition is
+--- then detached, the month created, its rows moved and the default re-attached, all
+--- in the calling transaction. This locks price_events until the transaction ends.
+CREATE OR REPLACE FUNCTION create_price_events_partitions(months_ahead INTEGER DEFAULT 3)
+RETURNS SETOF TEXT
+LANGUAGE plpgsql AS $$
+DECLARE
+    month_start DATE;
+    month_end DATE;
+    partition_name TEXT;
+    moved BIGINT;
+BEGIN
+    FOR i IN 0..months_ahead LOOP
+        month_start := (date_trunc('month', NOW()) + make_interval(months => i))::DATE;
+        month_end := (month_start + INTERVAL '1 month')::DATE;
+        partition_name := format('price_events_%s', to_char(month_start, 'YYYY_MM'));
+        IF to_regclass(partition_name) IS NULL THEN
+            IF EXISTS (
+                SELECT 1 FROM price_events_default
+                WHERE scraped_at >= month_start AND scraped_at < month_end
+            ) THEN
+                ALTER TABLE price_events DETACH PARTITION price_events_default;
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF price_events FOR VALUES FROM (%L) TO (%L)',
+                    partition_name, month_start, month_end
+                );
+                WITH moved_rows AS (
+                    DELETE FROM price_events_default
+                    WHERE scraped_at >= month_start AND scraped_at < month_end
+                    RETURNING *
+                )
+                INSERT INTO price_events SELECT * FROM moved_rows;
+                GET DIAGNOSTICS moved = ROW_COUNT;
+                ALTER TABLE price_events ATTACH PARTITION price_events_default DEFAULT;
+                RAISE NOTICE 'moved % rows from price_events_default into %', moved, partition_name;
+            ELSE
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF price_events FOR VALUES FROM (%L) TO (%L)',
+                    partition_name, month_start, month_end
+                );
+            END IF;
+            RETURN NEXT partition_name;
+        END IF;
+    END LOOP;
+END;
+$$;
+
+--- Detaches monthly partitions that ended more than retain_months months ago.
+--- Detached tables keep their data (archive or DROP them separately);
+--- latest_prices is unaffected.
+CREATE OR REPLACE FUNCTION detach_price_events_partitions(retain_months INTEGER DEFAULT 13)
+RETURNS SETOF TEXT
+LANGUAGE plpgsql AS $$
+DECLARE
+    cutoff DATE := (date_trunc('month', NOW()) - make_interval(months => retain_months))::DATE;
+    old_partition RECORD;
+BEGIN
+    FOR old_partition IN
+        SELECT child.relname AS name
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        WHERE parent.relname = 'price_events'
+          AND child.relname ~ '^price_events_[0-9]{4}_[0-9]{2}$'
+          AND to_date(substring(child.relname FROM 14), 'YYYY_MM') < cutoff
+        ORDER BY child.relname
+    LOOP
+        EXECUTE format('ALTER TABLE price_events DETACH PARTITION %I', old_partition.name);
+        RETURN NEXT old_partition.name;
+    END LOOP;
+END;
+$$;
+
+SELECT create_price_events_partitions();
+
+---
+--- 6. אגרגציות לדשבורדים (Dashboard aggregates)
+---
+
+--- Pre-computed from latest_prices so dashboard charts never aggregate the raw
+--- tables. Refreshed after every ingestion run (refresh_price_aggregates(), called
+--- by the scraper's dashboard warm-up) just before Superset caches are warmed.
+CREATE MATERIALIZED VIEW IF NOT EXISTS product_price_stats AS
+SELECT
+    lp.product_id,
+    s.chain_id,
+    MIN(lp.price) AS min_price,
+    MAX(lp.price) AS max_price,
+    ROUND(AVG(lp.price), 2) AS avg_price,
+    COUNT(*) AS store_count,
+    (ARRAY_AGG(lp.store_id ORDER BY lp.price, lp.store_id))[1] AS cheapest_store_id,
+    MAX(lp.published_at) AS last_published_at
+FROM latest_prices lp
+JOIN stores s ON s.id = lp.store_id
+GROUP BY lp.product_id, s.chain_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_product_price_stats_key ON product_price_stats(product_id, chain_id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS chain_city_price_summary AS
+SELECT
+    s.chain_id,
+    COALESCE(s.city, '') AS city,
+    COUNT(DISTINCT lp.store_id) AS store_count,
+    COUNT(*) AS price_count,
+    ROUND(AVG(lp.price), 2) AS avg_price,
+    MAX(lp.scraped_at) AS last_scraped_at
+FROM latest_prices lp
+JOIN stores s ON s.id = lp.store_id
+GROUP BY s.chain_id, COALESCE(s.city, '');
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_chain_city_price_summary_key ON chain_city_price_summary(chain_id, city);
+
+--- CONCURRENTLY keeps the views readable while they refresh.
+CREATE OR REPLACE FUNCTION refresh_price_aggregates()
+RETURNS VOID
+LANGUAGE plpgsql AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY product_price_stats;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY chain_city_price_summary;
+END;
+$$;
+
+--- Daily rollups per (day, ItemCode, chain, sub-chain, city), written by the scraper at
+--- ingest time (analytics/price_rollups.py); each rebuilt day replaces its rows. Keyed by
+--- the chains' external ids so no join is needed to chart them.
+CREATE TABLE IF NOT EXISTS daily_price_rollups (
+    day DATE NOT NULL,
+    item_code TEXT NOT NULL,
+    chain_id TEXT NOT NULL,
+    sub_chain_id TEXT NOT NULL DEFAULT '',
+    city TEXT NOT NULL DEFAULT '',
+    min_price NUMERIC(10, 2) NOT NULL,
+    max_price NUMERIC(10, 2) NOT NULL,
+    mean_price NUMERIC(10, 2) NOT NULL,
+    store_count INTEGER NOT NULL,
+    cheapest_store_id TEXT NOT NULL,
+    PRIMARY KEY (day, item_code, chain_id, sub_chain_id, city)
+);
+
+CREATE INDEX IF NOT EXISTS idx_daily_price_rollups_chain_city ON daily_price_rollups(chain_id, city, day);
@@ -0,0 +1,25 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+DB_CONTAINER=${DB_CONTAINER:-retail-postgres}
+DB_USER=${POSTGRES_USER:-postgres}
+DB_NAME=${POSTGRES_DB:-retail_store}
+# Monthly price_events partitions to create ahead of the current month.
+MONTHS_AHEAD=${MONTHS_AHEAD:-3}
+# Partitions older than this many months are detached (their tables are kept).
+RETAIN_MONTHS=${RETAIN_MONTHS:-13}
+
+# Safety: ensure container is running
+if ! docker ps --format '{{.Names}}' | grep -q "^${DB_CONTAINER}$"; then
+	echo "Container ${DB_CONTAINER} not running; start with 'docker compose up -d' first." >&2
+	exit 1
+fi
+
+docker exec -i "${DB_CONTAINER}" psql -v ON_ERROR_STOP=1 -U "${DB_USER}" -d "${DB_NAME}" \
+	-v months_ahead="${MONTHS_AHEAD}" -v retain_months="${RETAIN_MONTHS}" <<'SQL'
+SELECT create_price_events_partitions(:months_ahead) AS created;
+SELECT detach_price_events_partitions(:retain_months) AS detached;
+SELECT count(*) AS rows_in_default_partition FROM price_events_default;
+SQL
+
+echo "Maintained price_events partitions in ${DB_NAME} on ${DB_CONTAINER}."
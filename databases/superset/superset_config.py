@@ -27,6 +27,14 @@ REDIS_CELERY_DB = int(os.getenv("REDIS_CELERY_DB", "0"))
 REDIS_RESULTS_DB = int(os.getenv("REDIS_RESULTS_DB", "1"))
 
 # --- Cache --------------------------------------------------------------------
+# Price pipelines ingest hourly and the scraper warms the dashboard charts right
+# after each run (see monorepo/scraper/dashboards/superset_warmup.py), so chart
+# data is cached for one ingestion interval plus a grace period: every load between
+# two runs is served from cache, and a late run never leaves the cache cold.
+INGESTION_INTERVAL_SECONDS = int(os.getenv("INGESTION_INTERVAL_SECONDS", "3600"))
+CACHE_GRACE_SECONDS = int(os.getenv("CACHE_GRACE_SECONDS", "1800"))
+DATA_CACHE_TIMEOUT = INGESTION_INTERVAL_SECONDS + CACHE_GRACE_SECONDS
+
 CACHE_CONFIG = {
     "CACHE_TYPE": "RedisCache",
     "CACHE_DEFAULT_TIMEOUT": 300,
@@ -35,7 +43,11 @@ CACHE_CONFIG = {
     "CACHE_REDIS_PORT": REDIS_PORT,
     "CACHE_REDIS_DB": REDIS_RESULTS_DB,
 }
-DATA_CACHE_CONFIG = CACHE_CONFIG
+DATA_CACHE_CONFIG = {
+    **CACHE_CONFIG,
+    "CACHE_DEFAULT_TIMEOUT": DATA_CACHE_TIMEOUT,
+    "CACHE_KEY_PREFIX": "superset_data_",
+}
 
 # --- Celery (async queries & scheduled reports) -------------------------------
 class CeleryConfig:
@@ -3,17 +3,25 @@ from datetime import timedelta
 from typing import List, Optional, TypedDict
 
 
-class Link(TypedDict):
-    """Type definition for file metadata."""
+class _RequiredLink(TypedDict):
     url: str
     date: str
     file_name: str
 
 
+class Link(_RequiredLink, total=False):
+    """Type definition for file metadata (``size`` in bytes, when the listing provides it)."""
+    size: int
+
+
 class LinkExtractor(ABC):
     """Base interface for scraping retail file links."""
 
     @abstractmethod
     def fetch(self, time_back: timedelta = None, max_links: Optional[int] = None) -> List[Link]:
         """Fetch and filter file metadata by time."""
+        pass
+
+    def commit(self, processed: List[Link]) -> None:
+        """Record that ``processed`` (links from the last ``fetch``) were handled; no-op by default."""
         pass
\ No newline at end of file
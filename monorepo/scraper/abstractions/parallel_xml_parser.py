@@ -0,0 +1,167 @@
+"""
+Intra-file parallel parsing for large XML price files.
+
+A PriceFull file of a big store is a short header, tens of thousands of sibling
+``<Item>`` elements inside one ``<Items>`` container and a short footer.
+``ParallelXmlParser`` splits the decompressed text at ``<Item>`` boundaries into
+``workers`` ranges of about equal size, wraps each range in the file's own header
+and footer, so every piece is a complete document with the same header fields and
+``Items`` attributes, parses the pieces in worker processes with the wrapped
+``XmlSchemaParser`` and joins the records in document order.
+
+The split is textual, so it is only used when the text cannot hide structure
+from it: exactly one record container, every record element between its start
+and end tags, record elements balanced at every split offset, and no comments,
+CDATA sections, DOCTYPE or processing instructions after the XML declaration.
+Anything else is parsed serially, as are files below ``min_bytes`` and files
+whose schema does not end in a repeated record element inside a single
+container.
+
+The result is the serial parser's: if any piece fails to parse, the whole file is
+treated as unparseable (``[]``), just as ``XmlSchemaParser.parse`` does. Worker
+processes are started with ``forkserver`` (``spawn`` where it is unavailable), so
+they never inherit the locks or threads of the multi-threaded runner.
+"""
+import multiprocessing
+import os
+import re
+import threading
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from abstractions.parser import Parser, Projection, projection_map
+from abstractions.xml_schema_parser import XmlSchemaParser
+
+DEFAULT_MIN_BYTES = 8 * 1024 * 1024
+
+_executors: Dict[int, ProcessPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _mp_context() -> multiprocessing.context.BaseContext:
+    """Start workers from a clean process: forking a threaded runner can copy held locks."""
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+def _executor(workers: int) -> ProcessPoolExecutor:
+    """One process pool per worker count, shared by every parser in this process."""
+    with _executors_lock:
+        executor = _executors.get(workers)
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context())
+            _executors[workers] = executor
+        return executor
+
+
+def _parse_piece(
+    parser: XmlSchemaParser, document: str, fields: Optional[Projection]
+) -> List[Dict[str, str]]:
+    return parser.parse(document, fields)
+
+
+class ParallelXmlParser(Parser):
+    """Parses large files with ``parser`` in ``workers`` processes; same output as ``parser.parse``."""
+
+    def __init__(
+        self,
+        parser: XmlSchemaParser,
+        workers: Optional[int] = None,
+        min_bytes: int = DEFAULT_MIN_BYTES,
+    ):
+        self.parser = parser
+        self.workers = workers or os.cpu_count() or 1
+        self.min_bytes = min_bytes
+        tags = self._splittable_tags(parser)
+        self._container_tag, self._record_tag = tags or (None, None)
+        self._record_start = self._start_tag(self._record_tag) if tags else None
+        self._container_start = self._start_tag(self._container_tag) if tags else None
+
+    @staticmethod
+    def _start_tag(tag: str) -> Pattern:
+        return re.compile(f"<{re.escape(tag)}[\\s>/]")
+
+    @staticmethod
+    def _splittable_tags(parser: XmlSchemaParser) -> Optional[Tuple[str, str]]:
+        """
+        ``(container tag, record tag)`` if the file can be split textually at record
+        boundaries, else None.
+        """
+        schema = parser.schema
+        paths = schema.get("record_paths", [])
+        if len(paths) != 1 or schema.get("case_insensitive") or schema.get("strip_namespaces"):
+            return None
+        path = paths[0]
+        # The records must be the repeated children of one container reached without repetition.
+        if len(path) < 2 or not path[-1].get("repeated") or any(step.get("repeated") for step in path[:-1]):
+            return None
+        return path[-2]["tag"], path[-1]["tag"]
+
+    def split(self, content: str) -> Optional[Tuple[str, List[str], str]]:
+        """
+        ``(header, ranges, footer)`` with ``ranges`` covering the record elements in order,
+        or None if the content cannot be split safely (too few records or an unexpected layout).
+        """
+        # Comments, CDATA, DOCTYPE (entities) and processing instructions can hide or fake tags.
+        if "<!" in content or content.count("<?") > 1:
+            return None
+        containers = [match.start() for match in self._container_start.finditer(content)]
+        container_close = f"</{self._container_tag}>"
+        if len(containers) != 1 or content.count(container_close) != 1:
+            return None
+        container_end = content.find(container_close)
+
+        starts = [match.start() for match in self._record_start.finditer(content)]
+        if len(starts) < 2 or starts[0] < containers[0] or starts[-1] > container_end:
+            return None
+        close_tag = f"</{self._record_tag}>"
+        # Sibling records only: as many end tags as start tags, the last one closing the range.
+        if content.count(close_tag) != len(starts):
+            return None
+        end = content.rfind(close_tag, 0, container_end)
+        if end < starts[-1]:
+            return None
+        end += len(close_tag)
+
+        pieces = min(self.workers, len(starts))
+        span = end - starts[0]
+        bounds = [starts[0]]
+        for piece in range(1, pieces):
+            target = starts[0] + span * piece // pieces
+            index = min(bisect_left(starts, target), len(starts) - 1)
+            if starts[index] > bounds[-1]:
+                # Every record started before the offset must also have ended before it.
+                if content.count(close_tag, starts[0], starts[index]) != index:
+                    return None
+                bounds.append(starts[index])
+        bounds.append(end)
+        ranges = [content[bounds[i]:bounds[i + 1]] for i in range(len(bounds) - 1)]
+        return content[:starts[0]], ranges, content[end:]
+
+    def parse(self, content: str, fields: Optional[Projection] = None) -> List[Dict[str, str]]:
+        """Parse ``content``; large files are split and parsed in worker processes."""
+        if self._record_start is None or self.workers < 2 or len(content) < self.min_bytes:
+            return self.parser.parse(content, fields)
+        split = self.split(content)
+        if split is None or len(split[1]) < 2:
+            return self.parser.parse(content, fields)
+        if fields is not None:
+            # Sent to every worker process: one-shot iterables must become a reusable dict.
+            fields = projection_map(fields)
+
+        header, ranges, footer = split
+        executor = _executor(self.workers)
+        futures = [
+            executor.submit(_parse_piece, self.parser, header + piece + footer, fields) for piece in ranges
+        ]
+        records: List[Dict[str, str]] = []
+        failed = False
+        for future in futures:
+            piece_records = future.result()
+            # Every piece holds at least one record element, so no records means a parse error.
+            if not piece_records:
+                failed = True
+            if not failed:
+                records.extend(piece_records)
+        return [] if failed else records
@@ -1,11 +1,31 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from typing import Dict, Iterable, List, Mapping, Optional, Union
+
+# Record fields to keep: an iterable of keys, or a mapping of key -> output name (alias).
+Projection = Union[Iterable[str], Mapping[str, str]]
+
+
+def projection_map(fields: Projection) -> Dict[str, str]:
+    """Normalize a projection to ``{record key: output key}``."""
+    if isinstance(fields, Mapping):
+        return dict(fields)
+    if isinstance(fields, str):
+        return {fields: fields}
+    return {field: field for field in fields}
+
+
+def project_records(records: List[Dict[str, str]], fields: Optional[Projection]) -> List[Dict[str, str]]:
+    """Apply a projection to already parsed records (for parsers that cannot push it down)."""
+    if fields is None:
+        return records
+    keep = projection_map(fields)
+    return [{keep[key]: value for key, value in record.items() if key in keep} for record in records]
 
 
 class Parser(ABC):
     """Base interface for parsing retail file content."""
 
     @abstractmethod
-    def parse(self, content: str) -> List[Dict[str, str]]:
-        """Parse raw content into records."""
+    def parse(self, content: str, fields: Optional[Projection] = None) -> List[Dict[str, str]]:
+        """Parse raw content into records, keeping only ``fields`` if given."""
         pass
@@ -1,6 +1,11 @@
 from abc import ABC, abstractmethod
 from datetime import timedelta
-from typing import Dict, List, Literal, Optional, TypedDict
+from typing import TYPE_CHECKING, Dict, List, Literal, Optional, TypedDict
+from abstractions.link_extractor import Link
+from abstractions.parser import Projection
+
+if TYPE_CHECKING:
+    from columnar.price_columns import PriceColumns
 
 PipelineType = Literal["prices", "stores"]
 
@@ -13,12 +18,16 @@ class SourceMetadata(TypedDict):
     scraped_at: str
 
 
-class ExtractedFile(TypedDict):
-    """A single scraped file with its source metadata and parsed records."""
+class _RequiredExtractedFile(TypedDict):
     source: SourceMetadata
     records: List[Dict[str, str]]
 
 
+class ExtractedFile(_RequiredExtractedFile, total=False):
+    """A single scraped file with its source metadata, parsed records and, optionally, typed columns."""
+    columns: "PriceColumns"
+
+
 class ScrapingPipeline(ABC):
     """Base interface for orchestrating scraping, fetching, and parsing."""
 
@@ -28,6 +37,36 @@ class ScrapingPipeline(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def extract(self, time_back: timedelta = None, max_links: Optional[int] = None) -> List[ExtractedFile]:
-        """Fetch files, download, extract, and parse them."""
+    def list_files(self, time_back: timedelta = None, max_links: Optional[int] = None) -> List[Link]:
+        """Fetch and filter the file links this pipeline would process."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def extract_file(self, file_meta: Link, fields: Optional[Projection] = None) -> Optional[ExtractedFile]:
+        """
+        Download, extract and parse a single file; return None if it could not be downloaded.
+        ``fields`` (keys, or key -> alias) keeps only those record fields for this call; the
+        runner never passes it, so uploaded and loaded records are always complete.
+        """
         raise NotImplementedError
+
+    def commit_files(self, processed: List[Link]) -> None:
+        """
+        Called by the runner once ``processed`` (links from ``list_files``) were uploaded, loaded or
+        queued durably; pipelines whose listing remembers progress advance it here.
+        """
+        pass
+
+    def extract(
+        self,
+        time_back: timedelta = None,
+        max_links: Optional[int] = None,
+        fields: Optional[Projection] = None,
+    ) -> List[ExtractedFile]:
+        """Fetch files, download, extract, and parse them (keeping only ``fields`` if given)."""
+        results: List[ExtractedFile] = []
+        for file_meta in self.list_files(time_back=time_back, max_links=max_links):
+            extracted = self.extract_file(file_meta, fields)
+            if extracted is not None:
+                results.append(extracted)
+        return results
@@ -0,0 +1,491 @@
+"""
+Declarative XML schemas compiled into single-pass parsers.
+
+Chain files all follow the same shape: a few header fields next to a
+container of repeated record elements, whose children become the record's
+keys. An ``XmlSchema`` describes that shape (header fields with tag aliases,
+the path down to the records, key renames, tag matching rules) and
+``XmlSchemaParser`` compiles it into lookup tables, so every element is
+visited once and each distinct tag is normalized only once per parser.
+
+The file is parsed incrementally with ``XMLPullParser``: each element with a
+record tag is turned into its fields as soon as it ends and then cleared, so
+the tree never holds more than the header, the containers and the (empty)
+record elements. The record paths are then walked over that skeleton, which
+gives exactly the records a walk over the full tree would. If a cleared
+element turns out to matter (a record tag nested inside a record or on the
+path itself), the file is parsed again as a full tree.
+
+ElementTree allocates one garbage-collected object per element, and the
+collector's full passes over a big file's elements cost about as much as the
+parse itself. Parsing builds no reference cycles, so the cyclic collector is
+paused while any parse runs (reference counted across threads).
+
+A new chain whose files fit this shape needs only a schema::
+
+    class MyChainParser(XmlSchemaParser):
+        SCHEMA = XmlSchema(
+            header={"ChainId": ["ChainId", "ChainID"]},
+            record_paths=[[RecordStep(tag="Items"), RecordStep(tag="Item", repeated=True)]],
+        )
+
+``parse(content, fields=...)`` pushes a projection down into the parse. For
+schemas that match tags exactly (no ``case_insensitive``/``strip_namespaces``),
+leaf elements of tags that cannot be projected are cut from the text before it
+is parsed, so ElementTree never builds them; the tags are taken from the start
+of the file. Any other child element whose key is not projected is skipped in
+the record loop without reading its text, and header fields are filtered the
+same way.
+"""
+import gc
+import logging
+import re
+import threading
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Pattern, Tuple, TypedDict
+
+from abstractions.parser import Parser, Projection, projection_map
+from observability.log import get_logger
+
+_log = get_logger(__name__)
+
+
+class _RequiredRecordStep(TypedDict):
+    tag: str
+
+
+class RecordStep(_RequiredRecordStep, total=False):
+    """One level on the path from the root to the record elements."""
+    # Visit every matching child (default: only the first one).
+    repeated: bool
+    # Output key -> tag aliases (first alias found wins), read from this element's
+    # children and added to the header of every record below it.
+    header: Dict[str, List[str]]
+    # Attribute name -> output key, set on every record below this element after its own fields.
+    attributes: Dict[str, str]
+
+
+class XmlSchema(TypedDict, total=False):
+    """Declarative description of a chain XML file."""
+    # Root tag -> child tag to descend into first (e.g. ABAP envelopes).
+    unwrap: Dict[str, str]
+    # Output key -> tag aliases, read from the children of the (unwrapped) root.
+    header: Dict[str, List[str]]
+    # Alternative paths to the record elements; the first whose first step exists is used.
+    # The last step of a path is the record element itself.
+    record_paths: List[List[RecordStep]]
+    # Record child tag -> output key; unmapped tags are kept as-is.
+    key_map: Dict[str, str]
+    # Match tags regardless of case (key_map keys are matched the same way).
+    case_insensitive: bool
+    # Match and emit tags without their "{namespace}" prefix.
+    strip_namespaces: bool
+    # Log a (rate-limited) warning for each file whose records have tags without a key_map entry.
+    report_unmapped: bool
+
+
+# (output keys in order, normalized alias -> (output key, alias rank))
+_HeaderSpec = Tuple[Tuple[str, ...], Dict[str, Tuple[str, int]]]
+# (normalized tag, repeated, header spec, attribute name -> output key pairs)
+_CompiledStep = Tuple[str, bool, _HeaderSpec, Tuple[Tuple[str, str], ...]]
+_NO_HEADER: _HeaderSpec = ((), {})
+# (record key -> output key, raw tag -> output key or None if the tag is not projected,
+#  dropped tags -> pattern cutting their leaf elements from the text)
+_CompiledProjection = Tuple[Dict[str, str], Dict[str, Optional[str]], Dict[FrozenSet[str], Pattern]]
+_UNSEEN = object()
+# Tags of the file start that the pre-filter considers.
+_PREFILTER_SAMPLE_CHARS = 64 * 1024
+_TAG_NAME = re.compile(r"<([A-Za-z_][\w.\-]*)")
+# Characters fed to the pull parser at a time; finished records are cleared between feeds.
+_STREAM_CHUNK_CHARS = 64 * 1024
+
+
+_collector_lock = threading.Lock()
+_collector_pauses = 0
+_collector_was_enabled = False
+
+
+@contextmanager
+def _collector_paused() -> Iterator[None]:
+    """Pause the cyclic garbage collector until the last concurrent parse is done."""
+    global _collector_pauses, _collector_was_enabled
+    with _collector_lock:
+        if _collector_pauses == 0:
+            _collector_was_enabled = gc.isenabled()
+            gc.disable()
+        _collector_pauses += 1
+    try:
+        yield
+    finally:
+        with _collector_lock:
+            _collector_pauses -= 1
+            if _collector_pauses == 0 and _collector_was_enabled:
+                gc.enable()
+
+
+class _Unstreamable(Exception):
+    """The streamed parse cleared an element the schema still needs; parse the whole tree instead."""
+
+
+class _ParseState:
+    """Per-call parse inputs: the projection, the record body builder and the streamed bodies."""
+
+    __slots__ = ("projection", "build", "bodies")
+
+    def __init__(
+        self,
+        projection: Optional[_CompiledProjection],
+        build: Callable[[ET.Element], Dict[str, str]],
+    ):
+        self.projection = projection
+        self.build = build
+        self.bodies: Dict[ET.Element, Dict[str, str]] = {}
+
+
+class XmlSchemaParser(Parser):
+    """Parser driven by an ``XmlSchema``; subclasses set ``SCHEMA``."""
+
+    SCHEMA: XmlSchema = XmlSchema()
+
+    def __init__(self, schema: Optional[XmlSchema] = None):
+        self.schema: XmlSchema = schema if schema is not None else self.SCHEMA
+        self._case_insensitive = self.schema.get("case_insensitive", False)
+        self._strip_namespaces = self.schema.get("strip_namespaces", False)
+        self._report_unmapped = self.schema.get("report_unmapped", False)
+
+        self._norm_cache: Dict[str, str] = {}
+        self._key_cache: Dict[str, str] = {}
+        # Raw tag -> output key of record tags that had no key_map entry.
+        self._unmapped: Dict[str, str] = {}
+        self._projections: Dict[Tuple[Tuple[str, str], ...], _CompiledProjection] = {}
+        self._key_map = {
+            self._normalize(tag): key for tag, key in self.schema.get("key_map", {}).items()
+        }
+        self._unwrap = {
+            self._normalize(tag): self._normalize(child)
+            for tag, child in self.schema.get("unwrap", {}).items()
+        }
+        # Record keys are the raw tags: skip the per-tag key lookup entirely.
+        self._identity_keys = not self._key_map and not self._strip_namespaces
+        # Tags are matched as written, so a projection can drop elements from the text by name.
+        self._prefilter = not self._case_insensitive and not self._strip_namespaces
+        self._structural_tags = self._schema_tags()
+        self._header = self._compile_header(self.schema.get("header", {}))
+        self._paths = [
+            [
+                (
+                    self._normalize(step["tag"]),
+                    step.get("repeated", False),
+                    self._compile_header(step.get("header", {})),
+                    tuple(step.get("attributes", {}).items()),
+                )
+                for step in path
+            ]
+            for path in self.schema.get("record_paths", [])
+        ]
+        # Normalized tags of the record elements, which are turned into fields as they are parsed.
+        self._record_tags = frozenset(path[-1][0] for path in self._paths)
+        self._record_tag_cache: Dict[str, bool] = {}
+
+    def _schema_tags(self) -> FrozenSet[str]:
+        """Every tag the schema itself reads: unwrap, header and record path tags."""
+        schema = self.schema
+        tags = set(schema.get("unwrap", {})) | set(schema.get("unwrap", {}).values())
+        for aliases in schema.get("header", {}).values():
+            tags.update(aliases)
+        for path in schema.get("record_paths", []):
+            for step in path:
+                tags.add(step["tag"])
+                for aliases in step.get("header", {}).values():
+                    tags.update(aliases)
+        return frozenset(tags)
+
+    def _normalize(self, tag: str) -> str:
+        """Tag as used for matching (namespace and case rules applied), cached per tag."""
+        normalized = self._norm_cache.get(tag)
+        if normalized is None:
+            normalized = tag
+            if self._strip_namespaces and "}" in normalized:
+                normalized = normalized.split("}", 1)[1]
+            if self._case_insensitive:
+                normalized = normalized.upper()
+            self._norm_cache[tag] = normalized
+        return normalized
+
+    def _compile_header(self, fields: Dict[str, List[str]]) -> _HeaderSpec:
+        lookup: Dict[str, Tuple[str, int]] = {}
+        for key, aliases in fields.items():
+            for rank, alias in enumerate(aliases):
+                lookup.setdefault(self._normalize(alias), (key, rank))
+        return tuple(fields), lookup
+
+    def _record_key(self, tag: str) -> str:
+        key = self._key_cache.get(tag)
+        if key is None:
+            local = tag.split("}", 1)[1] if self._strip_namespaces and "}" in tag else tag
+            key = self._key_map.get(self._normalize(tag))
+            if key is None:
+                key = local
+                if self._key_map and self._report_unmapped:
+                    self._unmapped[tag] = key
+            self._key_cache[tag] = key
+        return key
+
+    def _compile_projection(self, fields: Projection) -> _CompiledProjection:
+        """Projection with its per-tag decisions, cached per distinct projection."""
+        keep = projection_map(fields)
+        cache_key = tuple(sorted(keep.items()))
+        projection = self._projections.get(cache_key)
+        if projection is None:
+            projection = (keep, {}, {})
+            self._projections[cache_key] = projection
+        return projection
+
+    def _drop_unprojected(self, content: str, projection: _CompiledProjection) -> str:
+        """Cut leaf elements of tags that are neither projected nor read by the schema."""
+        keep, _, patterns = projection
+        drop = frozenset(
+            tag
+            for tag in set(_TAG_NAME.findall(content, 0, _PREFILTER_SAMPLE_CHARS))
+            if tag not in self._structural_tags and self._record_key(tag) not in keep
+        )
+        if not drop:
+            return content
+        pattern = patterns.get(drop)
+        if pattern is None:
+            names = "|".join(re.escape(tag) for tag in sorted(drop))
+            # Only elements with plain text (no children, CDATA or comments) match; anything
+            # else is left to the record loop.
+            pattern = re.compile(f"<({names})(?:\\s[^<>]*)?(?:/>|>[^<]*</\\1\\s*>)")
+            patterns[drop] = pattern
+        return pattern.sub("", content)
+
+    @staticmethod
+    def _text(node: ET.Element) -> str:
+        return node.text.strip() if node.text else ""
+
+    def _scan(
+        self, node: ET.Element, header_spec: _HeaderSpec, wanted: Dict[str, bool]
+    ) -> Tuple[Dict[str, str], Dict[str, List[ET.Element]]]:
+        """
+        One pass over ``node``'s children, collecting header fields and the children
+        whose tag is in ``wanted`` (all of them if repeated, else only the first).
+        """
+        order, lookup = header_spec
+        found: Dict[str, Tuple[int, str]] = {}
+        matches: Dict[str, List[ET.Element]] = {}
+        normalized = self._norm_cache
+        for child in node:
+            tag = normalized.get(child.tag)
+            if tag is None:
+                tag = self._normalize(child.tag)
+            repeated = wanted.get(tag)
+            if repeated is not None:
+                bucket = matches.setdefault(tag, [])
+                if repeated or not bucket:
+                    bucket.append(child)
+            hit = lookup.get(tag)
+            if hit is not None:
+                key, rank = hit
+                current = found.get(key)
+                if current is None or rank < current[0]:
+                    found[key] = (rank, self._text(child))
+        return {key: found[key][1] for key in order if key in found}, matches
+
+    def _body_builder(
+        self, projection: Optional[_CompiledProjection]
+    ) -> Callable[[ET.Element], Dict[str, str]]:
+        """Function turning a record element into its children's fields, in document order."""
+        if projection is not None:
+            return partial(self._projected_body, projection)
+        if self._identity_keys:
+            return self._identity_body
+        return self._mapped_body
+
+    @staticmethod
+    def _identity_body(element: ET.Element) -> Dict[str, str]:
+        body = {}
+        for child in element:
+            text = child.text
+            body[child.tag] = text.strip() if text else ""
+        return body
+
+    def _mapped_body(self, element: ET.Element) -> Dict[str, str]:
+        key_cache = self._key_cache
+        body = {}
+        for child in element:
+            tag = child.tag
+            key = key_cache.get(tag)
+            if key is None:
+                key = self._record_key(tag)
+            text = child.text
+            body[key] = text.strip() if text else ""
+        return body
+
+    def _projected_body(self, projection: _CompiledProjection, element: ET.Element) -> Dict[str, str]:
+        """Projected fields only; other children are skipped before reading their text."""
+        keep, tags, _ = projection
+        body = {}
+        for child in element:
+            tag = child.tag
+            key = tags.get(tag, _UNSEEN)
+            if key is _UNSEEN:
+                key = tags[tag] = keep.get(self._record_key(tag))
+            if key is not None:
+                text = child.text
+                body[key] = text.strip() if text else ""
+        return body
+
+    def _emit(
+        self,
+        elements: List[ET.Element],
+        header: Dict[str, str],
+        trailer: Dict[str, str],
+        records: List[Dict[str, str]],
+        state: "_ParseState",
+    ) -> None:
+        """Turn record elements into dicts: header, then children in document order, then trailer."""
+        if state.projection is not None:
+            keep = state.projection[0]
+            header = {keep[key]: value for key, value in header.items() if key in keep}
+            trailer = {keep[key]: value for key, value in trailer.items() if key in keep}
+        append = records.append
+        streamed = state.bodies.pop
+        build = state.build
+        for element in elements:
+            body = streamed(element, None)
+            if body is None:
+                body = build(element)
+            record = dict(header)
+            record.update(body)
+            if trailer:
+                record.update(trailer)
+            append(record)
+
+    def _descend(
+        self,
+        node: ET.Element,
+        steps: List[_CompiledStep],
+        header: Dict[str, str],
+        trailer: Dict[str, str],
+        records: List[Dict[str, str]],
+        state: "_ParseState",
+    ) -> None:
+        if node in state.bodies:
+            # A streamed (and cleared) record element is also on a record path.
+            raise _Unstreamable
+        _, _, header_spec, attributes = steps[0]
+        if attributes:
+            trailer = dict(trailer)
+            for attribute, key in attributes:
+                if attribute in node.attrib:
+                    trailer[key] = node.attrib[attribute]
+
+        next_tag, next_repeated, _, _ = steps[1]
+        own_header, matches = self._scan(node, header_spec, {next_tag: next_repeated})
+        if own_header:
+            header = {**header, **own_header}
+        children = matches.get(next_tag, [])
+        if len(steps) == 2:
+            self._emit(children, header, trailer, records, state)
+            return
+        for child in children:
+            self._descend(child, steps[1:], header, trailer, records, state)
+
+    def _is_record_tag(self, tag: str) -> bool:
+        is_record = self._record_tag_cache.get(tag)
+        if is_record is None:
+            is_record = self._record_tag_cache[tag] = self._normalize(tag) in self._record_tags
+        return is_record
+
+    def _stream(self, content: str, build: Callable[[ET.Element], Dict[str, str]]) -> Tuple[ET.Element, Dict]:
+        """
+        Parse ``content`` incrementally, turning every element with a record tag into its
+        fields as soon as it ends and clearing it; returns the root of what is left (the
+        header, containers and empty record elements) and the fields by record element.
+        """
+        parser = ET.XMLPullParser(("end",))
+        bodies: Dict[ET.Element, Dict[str, str]] = {}
+        record_tags = self._record_tag_cache
+        is_record_tag = self._is_record_tag
+        element = None
+        for start in range(0, len(content), _STREAM_CHUNK_CHARS):
+            parser.feed(content[start:start + _STREAM_CHUNK_CHARS])
+            for _, element in parser.read_events():
+                is_record = record_tags.get(element.tag)
+                if is_record is None:
+                    is_record = is_record_tag(element.tag)
+                if is_record:
+                    bodies[element] = build(element)
+                    element.clear()
+        parser.close()
+        for _, element in parser.read_events():
+            pass
+        if element is None:
+            raise ET.ParseError("no element found")
+        return element, bodies
+
+    def parse(self, content: str, fields: Optional[Projection] = None) -> List[Dict[str, str]]:
+        """Parse XML content into records as described by the schema, keeping only ``fields`` if given."""
+        if not content:
+            return []
+        projection = self._compile_projection(fields) if fields is not None else None
+        if projection is not None and self._prefilter:
+            content = self._drop_unprojected(content, projection)
+        content = content.lstrip("\ufeff")
+        state = _ParseState(projection, self._body_builder(projection))
+        with _collector_paused():
+            try:
+                root, state.bodies = self._stream(content, state.build)
+                records = self._walk(root, state)
+                if state.bodies:
+                    # Record elements off the record path (e.g. nested in a record) were cleared
+                    # although the records that are emitted may need their text.
+                    raise _Unstreamable
+            except ET.ParseError:
+                return []
+            except _Unstreamable:
+                state.bodies = {}
+                records = self._walk(ET.fromstring(content), state)
+        if self._unmapped and _log.isEnabledFor(logging.WARNING):
+            self._log_unmapped(records)
+        return records
+
+    def _walk(self, root: ET.Element, state: "_ParseState") -> List[Dict[str, str]]:
+        """Records along the first record path that exists below ``root``."""
+        wrapped_child = self._unwrap.get(self._normalize(root.tag))
+        if wrapped_child is not None:
+            _, matches = self._scan(root, _NO_HEADER, {wrapped_child: False})
+            if wrapped_child not in matches:
+                return []
+            root = matches[wrapped_child][0]
+
+        wanted: Dict[str, bool] = {}
+        for path in self._paths:
+            wanted.setdefault(path[0][0], path[0][1])
+        header, matches = self._scan(root, self._header, wanted)
+
+        records: List[Dict[str, str]] = []
+        for path in self._paths:
+            first_tag = path[0][0]
+            if first_tag in matches:
+                if len(path) == 1:
+                    self._emit(matches[first_tag], header, {}, records, state)
+                else:
+                    for child in matches[first_tag]:
+                        self._descend(child, path, header, {}, records, state)
+                break
+        return records
+
+    def _log_unmapped(self, records: List[Dict[str, str]]) -> None:
+        """One warning per unmapped key present in this file (repeats are aggregated by the log filter)."""
+        parser = type(self).__name__
+        for key in set(self._unmapped.values()):
+            count = sum(1 for record in records if key in record)
+            if count:
+                _log.warning(
+                    "missing key mapping, using original key",
+                    extra={"parser": parser, "tag": key, "records": count, "key": f"unmapped:{parser}:{key}"},
+                )
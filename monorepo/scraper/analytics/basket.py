@@ -0,0 +1,161 @@
+"""
+Basket optimizer: which stores are cheapest for a list of items.
+
+Prices are held as a dense store x item NumPy matrix with NaN for items a
+store does not carry, built from the latest prices per store (the local
+``PriceIndex``, or typed columns of the latest price files). Ranking a basket
+is then a handful of vectorized operations over the whole matrix:
+
+- line cost = price x quantity (quantities may be fractional, e.g. kilograms
+  of a weighted item priced per kilogram)
+- a missing item costs ``missing_penalty`` times its median price across the
+  stores that carry it, so a store missing one item is not automatically
+  the "cheapest"
+- stores can be restricted to a set of (chain_id, store_id) pairs, and stores
+  missing more than ``max_missing`` items are dropped
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, TypedDict
+
+import numpy as np
+
+from columnar.price_columns import PRICE_SCALE, PriceColumns
+
+StoreKey = Tuple[str, str]  # (chain_id, store_id)
+
+DEFAULT_MISSING_PENALTY = 1.5
+
+
+class _RequiredBasketLine(TypedDict):
+    item_code: str
+
+
+class BasketLine(_RequiredBasketLine, total=False):
+    """One basket item; ``quantity`` defaults to 1 (units, or kilograms for weighted items)."""
+    quantity: float
+
+
+class BasketResult(TypedDict):
+    """Cost of the basket in one store."""
+    chain_id: str
+    store_id: str
+    total: float          # shekels, including penalties for missing items
+    items_cost: float     # shekels, available items only
+    missing: List[str]    # item codes the store does not carry
+
+
+class PriceMatrix:
+    """Latest price of each item (columns) in each store (rows), in shekels."""
+
+    def __init__(self, stores: Sequence[StoreKey], item_codes: Sequence[str], prices: np.ndarray):
+        if prices.shape != (len(stores), len(item_codes)):
+            raise ValueError("prices must have one row per store and one column per item")
+        self.stores = list(stores)
+        self.item_codes = list(item_codes)
+        self.prices = prices
+        self._columns = {code: column for column, code in enumerate(self.item_codes)}
+        self._rows = {store: row for row, store in enumerate(self.stores)}
+
+    @classmethod
+    def from_price_index(cls, index, item_codes: Sequence[str]) -> "PriceMatrix":
+        """Matrix for ``item_codes`` from a ``PriceIndex``."""
+        stores, prices = index.price_matrix(list(item_codes))
+        return cls(stores, item_codes, prices)
+
+    @classmethod
+    def from_columns(cls, files: Iterable[PriceColumns], item_codes: Optional[Sequence[str]] = None) -> "PriceMatrix":
+        """
+        Matrix from typed columns of price files (later files win for the same store and item).
+
+        Without ``item_codes``, every item that appears in ``files`` gets a column.
+        """
+        files = list(files)
+        if item_codes is None:
+            item_codes = sorted({code for columns in files for code in columns["item_code"][columns["valid"]].tolist()})
+        columns_by_code = {code: column for column, code in enumerate(item_codes)}
+        codes = np.array(item_codes, dtype=str)
+        order = np.argsort(codes)
+
+        store_rows: Dict[StoreKey, int] = {}
+        cells: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        for columns in files:
+            valid = columns["valid"]
+            file_codes = columns["item_code"][valid]
+            position = np.searchsorted(codes, file_codes, sorter=order).clip(max=max(len(codes) - 1, 0))
+            known = codes[order[position]] == file_codes if len(codes) else np.zeros(len(file_codes), bool)
+            keys = list(zip(columns["chain_id"][valid][known].tolist(), columns["store_id"][valid][known].tolist()))
+            rows = np.array([store_rows.setdefault(key, len(store_rows)) for key in keys], dtype=np.int64)
+            cells.append((rows, order[position[known]], columns["item_price"][valid][known] / PRICE_SCALE))
+
+        prices = np.full((len(store_rows), len(columns_by_code)), np.nan)
+        for rows, item_columns, values in cells:
+            prices[rows, item_columns] = values
+        return cls(list(store_rows), item_codes, prices)
+
+    def rank(
+        self,
+        basket: Sequence[BasketLine],
+        stores: Optional[Iterable[StoreKey]] = None,
+        missing_penalty: float = DEFAULT_MISSING_PENALTY,
+        max_missing: Optional[int] = None,
+        top: Optional[int] = 10,
+    ) -> List[BasketResult]:
+        """
+        Rank stores by the total cost of ``basket``, cheapest first.
+
+        Args:
+            basket: Items and quantities; items unknown to the matrix count as missing everywhere
+            stores: Only consider these (chain_id, store_id) pairs (optional)
+            missing_penalty: Multiple of an item's median price charged when a store lacks it
+            max_missing: Drop stores missing more than this many basket items (optional)
+            top: Number of stores to return (None for all)
+        """
+        codes = [line["item_code"] for line in basket]
+        quantities = np.array([line.get("quantity", 1.0) for line in basket], dtype=np.float64)
+        columns = np.array([self._columns.get(code, -1) for code in codes], dtype=np.int64)
+        known = columns >= 0
+
+        if stores is not None:
+            rows = np.array(sorted({self._rows[key] for key in stores if key in self._rows}), dtype=np.int64)
+        else:
+            rows = np.arange(len(self.stores))
+
+        prices = np.full((len(rows), len(codes)), np.nan)
+        if len(rows) and known.any():
+            prices[:, known] = self.prices[np.ix_(rows, columns[known])]
+
+        line_costs = prices * quantities
+        present = ~np.isnan(prices)
+        # Median over all stores (not just the filtered ones), so penalties don't depend on the filter.
+        with np.errstate(all="ignore"):
+            medians = np.full(len(codes), np.nan)
+            if known.any():
+                all_prices = self.prices[:, columns[known]]
+                has_any = ~np.isnan(all_prices).all(axis=0)
+                medians_known = np.full(all_prices.shape[1], np.nan)
+                if has_any.any():
+                    medians_known[has_any] = np.nanmedian(all_prices[:, has_any], axis=0)
+                medians[known] = medians_known
+        penalties = np.where(np.isnan(medians), 0.0, medians * quantities * missing_penalty)
+
+        items_cost = np.where(present, line_costs, 0.0).sum(axis=1)
+        totals = items_cost + np.where(present, 0.0, penalties).sum(axis=1)
+        missing_counts = (~present).sum(axis=1)
+
+        candidates = np.arange(len(rows))
+        if max_missing is not None:
+            candidates = candidates[missing_counts <= max_missing]
+        ranked = candidates[np.lexsort((missing_counts[candidates], totals[candidates]))]
+        if top is not None:
+            ranked = ranked[:top]
+
+        results: List[BasketResult] = []
+        for position in ranked.tolist():
+            chain_id, store_id = self.stores[rows[position]]
+            results.append(BasketResult(
+                chain_id=chain_id,
+                store_id=store_id,
+                total=round(float(totals[position]), 2),
+                items_cost=round(float(items_cost[position]), 2),
+                missing=[code for code, has in zip(codes, present[position].tolist()) if not has],
+            ))
+        return results
@@ -0,0 +1,229 @@
+"""
+Store geocoding from a local gazetteer, with a persistent per-store cache.
+
+Chain stores files carry ``Address``, ``City`` and ``ZipCode`` but no
+coordinates. ``StoreLocator`` resolves them against a local gazetteer CSV
+(no network calls) with the columns::
+
+    city,street,house_number,zip_code,latitude,longitude
+
+``street``, ``house_number`` and ``zip_code`` may be empty (a row with only a
+city is that city's centroid). A store is matched on the most precise level
+available: city + street + house number, city + street, zip code, then city.
+
+Resolved stores are kept in a JSON cache keyed by (chain_id, store_id), so a
+store is looked up again only when its address changes, and the gazetteer
+itself is loaded only when some store is not cached. Stores that could not be
+resolved are cached too and retried once the gazetteer file changes.
+"""
+import csv
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, TypedDict
+
+from observability import metrics
+
+GEOCODED_STORES = metrics.REGISTRY.counter(
+    "scraper_store_geocodes_total",
+    "Stores resolved by the enrichment stage, by precision (address/street/zip/city/miss) or cached.",
+    ("pipeline", "result"),
+)
+
+# Quotes, geresh/gershayim and punctuation that vary between chains ("רח' הרצל", "רחוב הרצל").
+_PUNCTUATION = re.compile(r"[\"'`׳״.,;:()\-/\\]+")
+_STREET_PREFIXES = ("רחוב ", "רח ", "שדרות ", "שד ", "דרך ")
+_HOUSE_NUMBER = re.compile(r"^(?P<street>.*?)\s*(?P<number>\d+)\s*[א-ת]?$")
+
+Coordinates = Tuple[float, float]
+
+
+class StoreLocation(TypedDict):
+    """Coordinates of one store and how they were resolved."""
+    chain_id: str
+    store_id: str
+    address: str
+    city: str
+    zip_code: str
+    latitude: Optional[float]
+    longitude: Optional[float]
+    precision: str          # address / street / zip / city / miss
+
+
+def normalize_place(text: Optional[str]) -> str:
+    """Place name as used for matching: no punctuation, single spaces, common street prefixes dropped."""
+    if not text:
+        return ""
+    normalized = " ".join(_PUNCTUATION.sub(" ", text).split()).lower()
+    for prefix in _STREET_PREFIXES:
+        if normalized.startswith(prefix):
+            normalized = normalized[len(prefix):]
+            break
+    return normalized
+
+
+def split_address(address: Optional[str]) -> Tuple[str, str]:
+    """(street, house number) of an address such as "רח' הרצל 12"; the number may be ""."""
+    normalized = normalize_place(address)
+    match = _HOUSE_NUMBER.match(normalized)
+    if match and match.group("street"):
+        return match.group("street"), match.group("number")
+    return normalized, ""
+
+
+def normalize_store_id(store_id: str) -> str:
+    """Store ID as the uploader and typed columns store it ("001" -> "1")."""
+    store_id = (store_id or "").strip()
+    return store_id.lstrip("0") or ("0" if store_id else "")
+
+
+class Gazetteer:
+    """In-memory lookup tables built from a gazetteer CSV."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._addresses: Dict[Tuple[str, str, str], Coordinates] = {}
+        self._streets: Dict[Tuple[str, str], List[Coordinates]] = {}
+        self._zip_codes: Dict[str, Coordinates] = {}
+        self._cities: Dict[str, List[Coordinates]] = {}
+        with self.path.open(encoding="utf-8-sig", newline="") as handle:
+            for row in csv.DictReader(handle):
+                try:
+                    point = (float(row["latitude"]), float(row["longitude"]))
+                except (KeyError, TypeError, ValueError):
+                    continue
+                city = normalize_place(row.get("city"))
+                street = normalize_place(row.get("street"))
+                number = (row.get("house_number") or "").strip()
+                zip_code = (row.get("zip_code") or "").strip()
+                if city and street and number:
+                    self._addresses.setdefault((city, street, number), point)
+                if city and street:
+                    self._streets.setdefault((city, street), []).append(point)
+                if zip_code:
+                    self._zip_codes.setdefault(zip_code, point)
+                if city:
+                    self._cities.setdefault(city, []).append(point)
+
+    @staticmethod
+    def _centroid(points: List[Coordinates]) -> Coordinates:
+        return (
+            sum(point[0] for point in points) / len(points),
+            sum(point[1] for point in points) / len(points),
+        )
+
+    def resolve(
+        self, address: Optional[str], city: Optional[str], zip_code: Optional[str]
+    ) -> Tuple[Optional[float], Optional[float], str]:
+        """(latitude, longitude, precision) for a store address; precision is "miss" if unresolved."""
+        city_key = normalize_place(city)
+        street, number = split_address(address)
+        if city_key and street:
+            if number and (city_key, street, number) in self._addresses:
+                return (*self._addresses[(city_key, street, number)], "address")
+            if (city_key, street) in self._streets:
+                return (*self._centroid(self._streets[(city_key, street)]), "street")
+        zip_code = (zip_code or "").strip()
+        if zip_code and zip_code in self._zip_codes:
+            return (*self._zip_codes[zip_code], "zip")
+        if city_key in self._cities:
+            return (*self._centroid(self._cities[city_key]), "city")
+        return None, None, "miss"
+
+
+class StoreLocator:
+    """Resolves store records' coordinates, caching results per store on disk."""
+
+    def __init__(self, gazetteer_path: str, cache_path: str):
+        self.gazetteer_path = Path(gazetteer_path)
+        self.cache_path = Path(cache_path)
+        self._gazetteer: Optional[Gazetteer] = None
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._fingerprint = self._gazetteer_fingerprint()
+        self._stores: Dict[str, StoreLocation] = {}
+        if self.cache_path.exists():
+            cached = json.loads(self.cache_path.read_text(encoding="utf-8"))
+            stale_misses = cached.get("gazetteer") != self._fingerprint
+            self._stores = {
+                key: location
+                for key, location in cached.get("stores", {}).items()
+                if not (stale_misses and location["precision"] == "miss")
+            }
+
+    def _gazetteer_fingerprint(self) -> str:
+        stat = self.gazetteer_path.stat()
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def _load_gazetteer(self) -> Gazetteer:
+        if self._gazetteer is None:
+            self._gazetteer = Gazetteer(str(self.gazetteer_path))
+        return self._gazetteer
+
+    def locate(self, record: Dict[str, str]) -> Optional[StoreLocation]:
+        """Location of the store in a parsed stores record (None if the record has no store key)."""
+        chain_id = (record.get("ChainId") or "").strip()
+        store_id = normalize_store_id(record.get("StoreId") or "")
+        if not chain_id or not store_id:
+            return None
+        address = (record.get("Address") or "").strip()
+        city = (record.get("City") or "").strip()
+        zip_code = (record.get("ZipCode") or "").strip()
+
+        key = f"{chain_id}:{store_id}"
+        with self._lock:
+            cached = self._stores.get(key)
+            if cached is not None and (cached["address"], cached["city"], cached["zip_code"]) == (
+                address, city, zip_code
+            ):
+                metrics.count(GEOCODED_STORES, result="cached")
+                return cached
+
+            latitude, longitude, precision = self._load_gazetteer().resolve(address, city, zip_code)
+            location = StoreLocation(
+                chain_id=chain_id,
+                store_id=store_id,
+                address=address,
+                city=city,
+                zip_code=zip_code,
+                latitude=latitude,
+                longitude=longitude,
+                precision=precision,
+            )
+            self._stores[key] = location
+            self._dirty = True
+        metrics.count(GEOCODED_STORES, result=precision)
+        return location
+
+    def enrich(self, records: List[Dict[str, str]]) -> int:
+        """Add ``Latitude``/``Longitude`` to resolved store records in place; returns stores resolved."""
+        resolved = 0
+        for record in records:
+            location = self.locate(record)
+            if location is not None and location["latitude"] is not None:
+                record["Latitude"] = f"{location['latitude']:.8f}"
+                record["Longitude"] = f"{location['longitude']:.8f}"
+                resolved += 1
+        return resolved
+
+    def locations(self) -> Iterator[StoreLocation]:
+        """Every cached store that has coordinates."""
+        with self._lock:
+            stores = list(self._stores.values())
+        return (location for location in stores if location["latitude"] is not None)
+
+    def save(self) -> None:
+        """Write the cache if anything changed since it was loaded."""
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = json.dumps(
+                {"gazetteer": self._fingerprint, "stores": self._stores}, ensure_ascii=False
+            )
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.cache_path.with_suffix(self.cache_path.suffix + ".tmp")
+            temporary.write_text(payload, encoding="utf-8")
+            os.replace(temporary, self.cache_path)
+            self._dirty = False
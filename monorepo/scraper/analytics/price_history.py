@@ -0,0 +1,528 @@
+"""
+Embedded price history: one run-length encoded series per (chain, store, ItemCode).
+
+Consecutive scrapes mostly repeat the same prices, so instead of one row per
+scrape the history keeps one interval per price: the price, when it became
+valid and when it was replaced. The directory holds compressed columnar files:
+
+- ``series-<n>.npz``: chain, store and ItemCode of every series id, plus an
+  index by ItemCode (sorted items, offsets and series ids)
+- ``heads-<n>.npz``: the open (current) interval of every series: price, the
+  price before it, valid-from and the last time the price was seen
+- ``seg-<n>.npz``: closed intervals (series, valid_from, valid_to, price,
+  previous price), sorted by series and valid_from
+- ``MANIFEST``: the files of the current generation, replaced atomically
+
+Ingested price files are buffered in memory and folded in by ``commit``: an
+observation with the head's price only moves ``last_seen``; a different price
+closes the head into a new segment and opens a new head. A change takes effect
+at the file's ``PriceUpdateDate`` when that lies between the last observation of
+the old price and the new one, otherwise at the observation time. Observations
+not newer than a series' last observation are ignored. When there are more than
+``max_segments`` segments, ``commit`` compacts them into one (``compact``).
+
+Times are wall-clock seconds in ``time_zone`` (the chains publish local times).
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, TypedDict, Union
+
+import numpy as np
+
+from columnar.price_columns import PRICE_SCALE, PriceColumns
+
+DEFAULT_MAX_SEGMENTS = 8
+NO_PRICE = -1
+# Missing PriceUpdateDate / "never seen".
+_NO_DATE = np.iinfo(np.int64).min
+_SEGMENT_COLUMNS = ("series", "valid_from", "valid_to", "price", "previous_price")
+_HEAD_COLUMNS = ("price", "previous_price", "valid_from", "last_seen")
+
+TimeLike = Union[str, datetime, np.datetime64]
+
+
+class PriceInterval(TypedDict):
+    """A price and the time range it was valid in (``valid_to`` is None for the current price)."""
+    price: float
+    valid_from: str
+    valid_to: Optional[str]
+    last_seen: Optional[str]
+
+
+class StoreHistory(TypedDict):
+    """Price intervals of an item in one store, oldest first."""
+    chain_id: str
+    store_id: str
+    intervals: List[PriceInterval]
+
+
+class PriceChange(TypedDict):
+    """One price change of an item in one store."""
+    chain_id: str
+    store_id: str
+    item_code: str
+    old_price: float
+    new_price: float
+    changed_at: str
+
+
+def _format(seconds: int) -> str:
+    return str(np.datetime64(int(seconds), "s"))
+
+
+def _series_keys(chains: np.ndarray, stores: np.ndarray, items: np.ndarray) -> np.ndarray:
+    keys = np.char.add(np.char.add(np.char.add(chains.astype(str), ":"), stores.astype(str)), ":")
+    return np.char.add(keys, items.astype(str))
+
+
+def _shift(values: np.ndarray, first: np.ndarray) -> np.ndarray:
+    """``values`` moved one row down, with ``first`` (per row) in place of the missing predecessor."""
+    shifted = np.empty_like(values)
+    shifted[1:] = values[:-1]
+    shifted[:1] = first[:1]
+    return shifted
+
+
+class PriceHistory:
+    """Run-length encoded price history on disk, with an in-memory buffer of ingested files."""
+
+    def __init__(
+        self,
+        directory: str,
+        time_zone: str = "Asia/Jerusalem",
+        max_segments: int = DEFAULT_MAX_SEGMENTS,
+    ):
+        from zoneinfo import ZoneInfo
+
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.time_zone = ZoneInfo(time_zone)
+        self.max_segments = max_segments
+        self._pending: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, int]] = []
+        self._segment_cache: Dict[str, Dict[str, np.ndarray]] = {}
+        self._lock = threading.RLock()
+        self._load()
+
+    # -- loading -----------------------------------------------------------
+
+    def _load(self) -> None:
+        manifest_path = self.directory / "MANIFEST"
+        self._manifest = (
+            json.loads(manifest_path.read_text(encoding="utf-8"))
+            if manifest_path.exists()
+            else {"generation": 0, "series": None, "heads": None, "segments": [], "observations": 0}
+        )
+        if self._manifest["series"] is None:
+            empty = np.array([], dtype="<U1")
+            self._chains, self._stores, self._items = empty, empty, empty
+            self._heads = {column: np.zeros(0, dtype=np.int64) for column in _HEAD_COLUMNS}
+        else:
+            with np.load(self.directory / self._manifest["series"]) as series:
+                self._chains, self._stores, self._items = series["chain"], series["store"], series["item"]
+                self._index_items = series["index_items"]
+                self._index_offsets = series["index_offsets"]
+                self._item_order = series["index_series"]
+            with np.load(self.directory / self._manifest["heads"]) as heads:
+                self._heads = {column: heads[column] for column in _HEAD_COLUMNS}
+            self._build_key_lookup()
+            return
+        self._build_lookups()
+
+    def _build_key_lookup(self) -> None:
+        keys = _series_keys(self._chains, self._stores, self._items)
+        self._key_order = np.argsort(keys, kind="stable")
+        self._sorted_keys = keys[self._key_order]
+
+    def _build_lookups(self) -> None:
+        """Key lookup for ingestion and the ItemCode -> series index."""
+        self._build_key_lookup()
+        self._item_order = np.argsort(self._items, kind="stable")
+        self._index_items, starts = np.unique(self._items[self._item_order], return_index=True)
+        self._index_offsets = np.append(starts, len(self._items)).astype(np.int64)
+
+    def _segment(self, name: str) -> Dict[str, np.ndarray]:
+        segment = self._segment_cache.get(name)
+        if segment is None:
+            with np.load(self.directory / name) as data:
+                segment = {column: data[column] for column in _SEGMENT_COLUMNS}
+            self._segment_cache[name] = segment
+        return segment
+
+    # -- time conversion ---------------------------------------------------
+
+    def _seconds(self, value: TimeLike) -> int:
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if isinstance(value, datetime):
+            if value.tzinfo is not None:
+                value = value.astimezone(self.time_zone).replace(tzinfo=None)
+            value = np.datetime64(value, "s")
+        return int(np.datetime64(value, "s").astype(np.int64))
+
+    # -- ingestion ---------------------------------------------------------
+
+    def ingest(self, columns: PriceColumns, observed_at: Optional[TimeLike] = None) -> int:
+        """Buffer the valid rows of one price file observed at ``observed_at`` (default: now)."""
+        observed = self._seconds(observed_at if observed_at is not None else datetime.now(self.time_zone))
+        valid = columns["valid"]
+        updated = columns["price_update_date"].astype("datetime64[s]").astype(np.int64)
+        updated = np.where(np.isnat(columns["price_update_date"]), _NO_DATE, updated)
+        with self._lock:
+            self._pending.append((
+                columns["chain_id"][valid],
+                columns["store_id"][valid],
+                columns["item_code"][valid],
+                columns["item_price"][valid],
+                updated[valid],
+                observed,
+            ))
+        return int(valid.sum())
+
+    def ingest_records(self, records: List[Dict[str, str]], observed_at: Optional[TimeLike] = None) -> int:
+        """Convenience wrapper for parsed (string) price records."""
+        from columnar.price_columns import to_price_columns
+
+        return self.ingest(to_price_columns(records), observed_at)
+
+    def _series_ids(self, chains: np.ndarray, stores: np.ndarray, items: np.ndarray) -> np.ndarray:
+        """Ids of the given series, registering new ones (heads start empty)."""
+        keys = _series_keys(chains, stores, items)
+        positions = np.searchsorted(self._sorted_keys, keys)
+        clipped = np.minimum(positions, max(len(self._sorted_keys) - 1, 0))
+        known = (positions < len(self._sorted_keys)) & (
+            self._sorted_keys[clipped] == keys if len(self._sorted_keys) else False
+        )
+        ids = np.empty(len(keys), dtype=np.int64)
+        ids[known] = self._key_order[clipped[known]]
+
+        new_keys, first_row, inverse = np.unique(keys[~known], return_index=True, return_inverse=True)
+        if len(new_keys):
+            unknown_rows = np.flatnonzero(~known)
+            ids[unknown_rows] = len(self._items) + inverse
+            new_rows = unknown_rows[first_row]
+            self._chains = np.concatenate([self._chains.astype(str), chains[new_rows].astype(str)])
+            self._stores = np.concatenate([self._stores.astype(str), stores[new_rows].astype(str)])
+            self._items = np.concatenate([self._items.astype(str), items[new_rows].astype(str)])
+            for column in _HEAD_COLUMNS:
+                fill = NO_PRICE if column in ("price", "previous_price") else _NO_DATE
+                self._heads[column] = np.concatenate(
+                    [self._heads[column], np.full(len(new_keys), fill, dtype=np.int64)]
+                )
+            self._build_lookups()
+        return ids
+
+    def _fold(self) -> Tuple[Dict[str, np.ndarray], int]:
+        """Apply buffered observations to the heads; returns the intervals they closed."""
+        observations = sum(len(pending[0]) for pending in self._pending)
+        ids = self._series_ids(
+            np.concatenate([pending[0].astype(str) for pending in self._pending]),
+            np.concatenate([pending[1].astype(str) for pending in self._pending]),
+            np.concatenate([pending[2].astype(str) for pending in self._pending]),
+        )
+        prices = np.concatenate([pending[3] for pending in self._pending]).astype(np.int64)
+        updated = np.concatenate([pending[4] for pending in self._pending])
+        observed = np.concatenate([np.full(len(pending[0]), pending[5], dtype=np.int64) for pending in self._pending])
+        sequence = np.arange(len(ids))
+
+        # Per series in observation order; a later row of the same file wins.
+        order = np.lexsort((sequence, observed, ids))
+        ids, prices, updated, observed = ids[order], prices[order], updated[order], observed[order]
+        last_of_time = np.ones(len(ids), dtype=bool)
+        last_of_time[:-1] = (ids[1:] != ids[:-1]) | (observed[1:] != observed[:-1])
+        heads = self._heads
+        keep = last_of_time & (observed > heads["last_seen"][ids])
+        ids, prices, updated, observed = ids[keep], prices[keep], updated[keep], observed[keep]
+        if not len(ids):
+            return {column: np.zeros(0, dtype=np.int64) for column in _SEGMENT_COLUMNS}, observations
+
+        group_start = np.ones(len(ids), dtype=bool)
+        group_start[1:] = ids[1:] != ids[:-1]
+        previous_price = np.where(group_start, heads["price"][ids], _shift(prices, prices))
+        previous_seen = np.where(group_start, heads["last_seen"][ids], _shift(observed, observed))
+        change = prices != previous_price
+        has_update = (updated != _NO_DATE) & (updated > previous_seen) & (updated <= observed)
+        valid_from = np.where(has_update, updated, observed)
+
+        changes = np.flatnonzero(change)
+        change_ids = ids[changes]
+        next_same = np.zeros(len(changes), dtype=bool)
+        next_same[:-1] = change_ids[1:] == change_ids[:-1]
+        first_change = np.ones(len(changes), dtype=bool)
+        first_change[1:] = change_ids[1:] != change_ids[:-1]
+
+        # Intervals opened and closed within this batch.
+        inner = changes[:-1][next_same[:-1]]
+        inner_end = valid_from[changes[1:][next_same[:-1]]]
+        # Heads replaced by the first change of their series.
+        replaced = changes[first_change]
+        replaced_ids = ids[replaced]
+        had_head = heads["price"][replaced_ids] != NO_PRICE
+        replaced, replaced_ids = replaced[had_head], replaced_ids[had_head]
+
+        closed = {
+            "series": np.concatenate([replaced_ids, ids[inner]]),
+            "valid_from": np.concatenate([heads["valid_from"][replaced_ids], valid_from[inner]]),
+            "valid_to": np.concatenate([valid_from[replaced], inner_end]),
+            "price": np.concatenate([heads["price"][replaced_ids], prices[inner]]),
+            "previous_price": np.concatenate([heads["previous_price"][replaced_ids], previous_price[inner]]),
+        }
+
+        opened = changes[~next_same]
+        opened_ids = ids[opened]
+        heads["price"][opened_ids] = prices[opened]
+        heads["previous_price"][opened_ids] = previous_price[opened]
+        heads["valid_from"][opened_ids] = valid_from[opened]
+        group_end = np.ones(len(ids), dtype=bool)
+        group_end[:-1] = ids[1:] != ids[:-1]
+        heads["last_seen"][ids[group_end]] = observed[group_end]
+        return closed, observations
+
+    # -- persistence -------------------------------------------------------
+
+    def commit(self) -> None:
+        """Fold buffered files into the history and write a new generation."""
+        with self._lock:
+            if not self._pending:
+                return
+            series_count = len(self._items)
+            closed, observations = self._fold()
+            self._pending = []
+
+            manifest = dict(self._manifest)
+            generation = manifest["generation"] + 1
+            manifest["generation"] = generation
+            manifest["observations"] += observations
+            if manifest["series"] is None or len(self._items) != series_count:
+                manifest["series"] = f"series-{generation:06d}.npz"
+                np.savez_compressed(
+                    self.directory / manifest["series"],
+                    chain=self._chains,
+                    store=self._stores,
+                    item=self._items,
+                    index_items=self._index_items,
+                    index_offsets=self._index_offsets,
+                    index_series=self._item_order,
+                )
+            manifest["heads"] = f"heads-{generation:06d}.npz"
+            np.savez_compressed(self.directory / manifest["heads"], **self._heads)
+            segments = list(manifest["segments"])
+            if len(closed["series"]):
+                segments.append(self._write_segment(f"seg-{generation:06d}.npz", closed))
+            manifest["segments"] = segments
+            self._switch(manifest)
+            if len(segments) > self.max_segments:
+                self.compact()
+
+    def _write_segment(self, name: str, columns: Dict[str, np.ndarray]) -> dict:
+        order = np.lexsort((columns["valid_from"], columns["series"]))
+        np.savez_compressed(
+            self.directory / name,
+            series=columns["series"][order].astype(np.int32),
+            **{column: columns[column][order].astype(np.int64) for column in _SEGMENT_COLUMNS[1:]},
+        )
+        return {
+            "file": name,
+            "rows": int(len(order)),
+            "min_from": int(columns["valid_from"].min()),
+            "max_from": int(columns["valid_from"].max()),
+            "max_to": int(columns["valid_to"].max()),
+        }
+
+    def _switch(self, manifest: dict) -> None:
+        pointer = self.directory / "MANIFEST.tmp"
+        pointer.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        os.replace(pointer, self.directory / "MANIFEST")
+        self._manifest = manifest
+        live = {manifest["series"], manifest["heads"]} | {segment["file"] for segment in manifest["segments"]}
+        self._segment_cache = {name: data for name, data in self._segment_cache.items() if name in live}
+        for path in self.directory.glob("*.npz"):
+            if path.name not in live:
+                path.unlink()
+
+    def compact(self, retain_days: Optional[float] = None) -> None:
+        """
+        Merge all segments into one, optionally dropping intervals that ended more than
+        ``retain_days`` ago (current prices are always kept).
+        """
+        with self._lock:
+            segments = self._manifest["segments"]
+            if not segments or (len(segments) == 1 and retain_days is None):
+                return
+            columns = {
+                column: np.concatenate([self._segment(segment["file"])[column] for segment in segments])
+                for column in _SEGMENT_COLUMNS
+            }
+            if retain_days is not None:
+                cutoff = self._seconds(datetime.now(self.time_zone)) - int(retain_days * 86400)
+                keep = columns["valid_to"] >= cutoff
+                columns = {column: values[keep] for column, values in columns.items()}
+
+            manifest = dict(self._manifest)
+            generation = manifest["generation"] + 1
+            manifest["generation"] = generation
+            manifest["segments"] = (
+                [self._write_segment(f"seg-{generation:06d}.npz", columns)] if len(columns["series"]) else []
+            )
+            self._switch(manifest)
+
+    # -- queries -----------------------------------------------------------
+
+    def _series_id(self, chain_id: str, store_id: str, item_code: str) -> Optional[int]:
+        key = f"{chain_id}:{store_id}:{item_code}"
+        position = int(np.searchsorted(self._sorted_keys, key))
+        if position < len(self._sorted_keys) and self._sorted_keys[position] == key:
+            return int(self._key_order[position])
+        return None
+
+    def _item_series(self, item_code: str) -> np.ndarray:
+        position = int(np.searchsorted(self._index_items, item_code))
+        if position < len(self._index_items) and self._index_items[position] == item_code:
+            return self._item_order[self._index_offsets[position]:self._index_offsets[position + 1]]
+        return np.zeros(0, dtype=np.int64)
+
+    def _intervals(self, series: np.ndarray, start: Optional[int], end: Optional[int]) -> Dict[int, List[PriceInterval]]:
+        """Intervals of ``series`` (sorted ids) overlapping [start, end], oldest first."""
+        found: Dict[int, List[PriceInterval]] = {int(sid): [] for sid in series}
+        for segment_meta in self._manifest["segments"]:
+            if start is not None and segment_meta["max_to"] <= start:
+                continue
+            if end is not None and segment_meta["min_from"] > end:
+                continue
+            segment = self._segment(segment_meta["file"])
+            lo = np.searchsorted(segment["series"], series, side="left")
+            hi = np.searchsorted(segment["series"], series, side="right")
+            for sid, first, last in zip(series.tolist(), lo.tolist(), hi.tolist()):
+                for valid_from, valid_to, price in zip(
+                    segment["valid_from"][first:last].tolist(),
+                    segment["valid_to"][first:last].tolist(),
+                    segment["price"][first:last].tolist(),
+                ):
+                    if (start is None or valid_to > start) and (end is None or valid_from <= end):
+                        found[sid].append(PriceInterval(
+                            price=price / PRICE_SCALE,
+                            valid_from=_format(valid_from),
+                            valid_to=_format(valid_to),
+                            last_seen=None,
+                        ))
+        heads = self._heads
+        for sid in found:
+            if heads["price"][sid] == NO_PRICE or (end is not None and heads["valid_from"][sid] > end):
+                continue
+            found[sid].append(PriceInterval(
+                price=int(heads["price"][sid]) / PRICE_SCALE,
+                valid_from=_format(heads["valid_from"][sid]),
+                valid_to=None,
+                last_seen=_format(heads["last_seen"][sid]),
+            ))
+        for intervals in found.values():
+            intervals.sort(key=lambda interval: interval["valid_from"])
+        return found
+
+    def _bounds(self, start: Optional[TimeLike], end: Optional[TimeLike]) -> Tuple[Optional[int], Optional[int]]:
+        return (
+            self._seconds(start) if start is not None else None,
+            self._seconds(end) if end is not None else None,
+        )
+
+    def history(
+        self,
+        item_code: str,
+        chain_id: str,
+        store_id: str,
+        start: Optional[TimeLike] = None,
+        end: Optional[TimeLike] = None,
+    ) -> List[PriceInterval]:
+        """Price intervals of an item in one store that overlap [start, end], oldest first."""
+        with self._lock:
+            sid = self._series_id(chain_id, store_id, item_code)
+            if sid is None:
+                return []
+            return self._intervals(np.array([sid]), *self._bounds(start, end))[sid]
+
+    def item_history(
+        self,
+        item_code: str,
+        start: Optional[TimeLike] = None,
+        end: Optional[TimeLike] = None,
+    ) -> List[StoreHistory]:
+        """``history`` of an item in every store that carried it."""
+        with self._lock:
+            series = np.sort(self._item_series(item_code))
+            intervals = self._intervals(series, *self._bounds(start, end))
+            return [
+                StoreHistory(
+                    chain_id=str(self._chains[sid]),
+                    store_id=str(self._stores[sid]),
+                    intervals=intervals[sid],
+                )
+                for sid in series.tolist()
+                if intervals[sid]
+            ]
+
+    def changed_since(
+        self,
+        since: TimeLike,
+        item_codes: Optional[Sequence[str]] = None,
+        chain_id: Optional[str] = None,
+        store_id: Optional[str] = None,
+    ) -> List[PriceChange]:
+        """Price changes that took effect at or after ``since``, oldest first."""
+        with self._lock:
+            cutoff = self._seconds(since)
+            wanted = None
+            if item_codes is not None:
+                wanted = np.concatenate([self._item_series(code) for code in item_codes] + [np.zeros(0, dtype=np.int64)])
+
+            parts: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = []
+            for segment_meta in self._manifest["segments"]:
+                if segment_meta["max_from"] < cutoff:
+                    continue
+                segment = self._segment(segment_meta["file"])
+                parts.append((
+                    segment["series"].astype(np.int64),
+                    segment["valid_from"],
+                    segment["price"],
+                    segment["previous_price"],
+                ))
+            heads = self._heads
+            parts.append((np.arange(len(heads["price"])), heads["valid_from"], heads["price"], heads["previous_price"]))
+
+            changes: List[PriceChange] = []
+            for series, valid_from, price, previous_price in parts:
+                mask = (valid_from >= cutoff) & (previous_price != NO_PRICE) & (price != NO_PRICE)
+                if wanted is not None:
+                    mask &= np.isin(series, wanted)
+                if chain_id is not None:
+                    mask &= self._chains[series] == chain_id
+                if store_id is not None:
+                    mask &= self._stores[series] == store_id
+                for sid, changed_at, new_price, old_price in zip(
+                    series[mask].tolist(), valid_from[mask].tolist(), price[mask].tolist(), previous_price[mask].tolist()
+                ):
+                    changes.append(PriceChange(
+                        chain_id=str(self._chains[sid]),
+                        store_id=str(self._stores[sid]),
+                        item_code=str(self._items[sid]),
+                        old_price=old_price / PRICE_SCALE,
+                        new_price=new_price / PRICE_SCALE,
+                        changed_at=_format(changed_at),
+                    ))
+            changes.sort(key=lambda change: change["changed_at"])
+            return changes
+
+    def stats(self) -> Dict[str, int]:
+        """Series, stored intervals, folded observations, segments and bytes on disk."""
+        with self._lock:
+            manifest = self._manifest
+            files = [manifest["series"], manifest["heads"]] + [segment["file"] for segment in manifest["segments"]]
+            return {
+                "series": int(len(self._items)),
+                "intervals": int(sum(segment["rows"] for segment in manifest["segments"])
+                                 + np.count_nonzero(self._heads["price"] != NO_PRICE)),
+                "observations": int(manifest["observations"]),
+                "segments": len(manifest["segments"]),
+                "bytes": sum((self.directory / name).stat().st_size for name in files if name),
+            }
@@ -0,0 +1,299 @@
+"""
+Embedded cross-chain price index: ItemCode -> latest price per (chain, store).
+
+The index lives in a directory of NumPy ``.npy`` files that are memory-mapped
+on open, so loading is instant regardless of size and lookups touch only the
+pages they need:
+
+- ``items.npy``: sorted ItemCodes
+- ``offsets.npy``: row range of each item in ``entries.npy``
+- ``entries.npy``: one row per (item, store), sorted by price within each item,
+  so the cheapest stores for an item are the first rows of its range
+- ``stores.npy``: ``"<chain_id>:<store_id>"`` for each store number
+
+Ingested price files go into an in-memory delta that lookups consult
+immediately; ``commit`` merges the delta into a new generation directory and
+switches ``CURRENT`` to it atomically. A price only replaces an existing one
+if its ``PriceUpdateDate`` is not older.
+"""
+import os
+import shutil
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, TypedDict
+
+import numpy as np
+
+from columnar.price_columns import PRICE_SCALE, PriceColumns
+
+ENTRY_DTYPE = np.dtype([("store", "<i4"), ("price", "<i8"), ("updated", "<i8")])
+# Rows without a PriceUpdateDate sort as oldest.
+_NO_DATE = np.iinfo(np.int64).min
+
+_Delta = Dict[str, Dict[str, Tuple[int, int]]]  # item -> store key -> (price, updated)
+
+
+class StorePrice(TypedDict):
+    """Latest known price of an item in one store."""
+    chain_id: str
+    store_id: str
+    price: float
+    updated_at: Optional[str]
+
+
+def _store_key(chain_id: str, store_id: str) -> str:
+    return f"{chain_id}:{store_id}"
+
+
+@lru_cache(maxsize=4096)
+def _format_updated(updated: int) -> Optional[str]:
+    # Few distinct update times per chain, so formatting is cached.
+    return None if updated == _NO_DATE else str(np.datetime64(updated, "s"))
+
+
+def _store_price(store_key: str, price: int, updated: int) -> StorePrice:
+    chain_id, _, store_id = store_key.partition(":")
+    return StorePrice(
+        chain_id=chain_id,
+        store_id=store_id,
+        price=price / PRICE_SCALE,
+        updated_at=_format_updated(updated),
+    )
+
+
+class PriceIndex:
+    """Memory-mapped price index with an in-memory delta for newly ingested files."""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._delta: _Delta = {}
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self) -> None:
+        current = self.directory / "CURRENT"
+        if not current.exists():
+            self._items = np.array([], dtype="<U1")
+            self._offsets = np.zeros(1, dtype=np.int64)
+            self._entries = np.zeros(0, dtype=ENTRY_DTYPE)
+            self._stores = np.array([], dtype="<U1")
+            self._store_names: List[str] = []
+            self._store_numbers: Dict[str, int] = {}
+            return
+        generation = self.directory / current.read_text().strip()
+        self._items = np.load(generation / "items.npy", mmap_mode="r")
+        self._offsets = np.load(generation / "offsets.npy", mmap_mode="r")
+        self._entries = np.load(generation / "entries.npy", mmap_mode="r")
+        # Store names are few; keep them as a plain list for fast indexing.
+        self._stores = np.load(generation / "stores.npy")
+        self._store_names = self._stores.tolist()
+        self._store_numbers = {name: number for number, name in enumerate(self._store_names)}
+
+    # -- ingestion ---------------------------------------------------------
+
+    def ingest(self, columns: PriceColumns) -> int:
+        """Add the valid rows of one price file to the delta; returns rows accepted."""
+        valid = columns["valid"]
+        updated = columns["price_update_date"].astype("datetime64[s]").astype(np.int64)
+        updated = np.where(np.isnat(columns["price_update_date"]), _NO_DATE, updated)
+        rows = zip(
+            columns["item_code"][valid].tolist(),
+            columns["chain_id"][valid].tolist(),
+            columns["store_id"][valid].tolist(),
+            columns["item_price"][valid].tolist(),
+            updated[valid].tolist(),
+        )
+        accepted = 0
+        with self._lock:
+            for item_code, chain_id, store_id, price, updated_at in rows:
+                stores = self._delta.setdefault(item_code, {})
+                key = _store_key(chain_id, store_id)
+                previous = stores.get(key)
+                if previous is None or updated_at >= previous[1]:
+                    stores[key] = (price, updated_at)
+                    accepted += 1
+        return accepted
+
+    def ingest_records(self, records: List[Dict[str, str]]) -> int:
+        """Convenience wrapper for parsed (string) price records."""
+        from columnar.price_columns import to_price_columns
+
+        return self.ingest(to_price_columns(records))
+
+    # -- lookups -----------------------------------------------------------
+
+    def _base_rows(self, item_code: str) -> np.ndarray:
+        position = int(np.searchsorted(self._items, item_code))
+        if position < len(self._items) and self._items[position] == item_code:
+            return self._entries[self._offsets[position]:self._offsets[position + 1]]
+        return self._entries[:0]
+
+    def _rows(self, item_code: str) -> List[Tuple[str, int, int]]:
+        """(store key, price, updated) for an item, cheapest first, delta applied."""
+        base = self._base_rows(item_code)
+        names = self._store_names if len(base) else []
+        delta = self._delta.get(item_code)
+        if not delta:
+            return [
+                (names[store], price, updated)
+                for store, price, updated in base.tolist()
+            ]
+        merged: Dict[str, Tuple[int, int]] = {
+            names[store]: (price, updated) for store, price, updated in base.tolist()
+        }
+        for key, (price, updated) in delta.items():
+            previous = merged.get(key)
+            if previous is None or updated >= previous[1]:
+                merged[key] = (price, updated)
+        return sorted(
+            ((key, price, updated) for key, (price, updated) in merged.items()),
+            key=lambda row: (row[1], row[0]),
+        )
+
+    def lookup(self, item_code: str) -> List[StorePrice]:
+        """Latest price of ``item_code`` in every store that carries it, cheapest first."""
+        with self._lock:
+            return [_store_price(*row) for row in self._rows(item_code)]
+
+    def lookup_many(self, item_codes: Iterable[str]) -> Dict[str, List[StorePrice]]:
+        """``lookup`` for several items at once (items with no prices map to [])."""
+        with self._lock:
+            return {code: [_store_price(*row) for row in self._rows(code)] for code in item_codes}
+
+    def cheapest(self, item_code: str, k: int = 5) -> List[StorePrice]:
+        """The ``k`` cheapest stores for ``item_code``."""
+        with self._lock:
+            if item_code not in self._delta:
+                base = self._base_rows(item_code)[:k]
+                return [
+                    _store_price(self._store_names[store], price, updated)
+                    for store, price, updated in base.tolist()
+                ]
+            return [_store_price(*row) for row in self._rows(item_code)[:k]]
+
+    def price(self, item_code: str, chain_id: str, store_id: str) -> Optional[StorePrice]:
+        """Latest price of ``item_code`` in one store, or None."""
+        key = _store_key(chain_id, store_id)
+        with self._lock:
+            latest = (self._delta.get(item_code) or {}).get(key)
+            number = self._store_numbers.get(key)
+            if number is not None:
+                base = self._base_rows(item_code)
+                match = np.flatnonzero(base["store"] == number)
+                if len(match):
+                    row = base[match[0]]
+                    if latest is None or int(row["updated"]) > latest[1]:
+                        latest = (int(row["price"]), int(row["updated"]))
+        return _store_price(key, *latest) if latest is not None else None
+
+    def price_matrix(self, item_codes: List[str]) -> Tuple[List[Tuple[str, str]], np.ndarray]:
+        """
+        Dense store x item matrix of latest prices in shekels (NaN where a store lacks an item).
+
+        Returns:
+            (chain_id, store_id) per matrix row, and the matrix with one column per item code
+        """
+        with self._lock:
+            store_keys = list(self._store_names)
+            numbers = dict(self._store_numbers)
+            extra = sorted({
+                key for code in item_codes for key in self._delta.get(code, {}) if key not in numbers
+            })
+            for key in extra:
+                numbers[key] = len(store_keys)
+                store_keys.append(key)
+
+            matrix = np.full((len(store_keys), len(item_codes)), np.nan)
+            for column, code in enumerate(item_codes):
+                if code in self._delta:
+                    for key, price, _ in self._rows(code):
+                        matrix[numbers[key], column] = price / PRICE_SCALE
+                else:
+                    base = self._base_rows(code)
+                    matrix[np.asarray(base["store"]), column] = np.asarray(base["price"]) / PRICE_SCALE
+        stores = [tuple(key.partition(":")[::2]) for key in store_keys]
+        return stores, matrix
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, item_code: object) -> bool:
+        with self._lock:
+            return item_code in self._delta or (
+                isinstance(item_code, str) and len(self._base_rows(item_code)) > 0
+            )
+
+    # -- persistence -------------------------------------------------------
+
+    def commit(self) -> None:
+        """Merge the delta into a new on-disk generation and switch to it."""
+        with self._lock:
+            if not self._delta:
+                return
+            items, offsets, entries, stores = self._merged()
+
+            generations = sorted(self.directory.glob("gen-*"))
+            number = int(generations[-1].name.split("-")[1]) + 1 if generations else 1
+            generation = self.directory / f"gen-{number:06d}"
+            generation.mkdir()
+            np.save(generation / "items.npy", items)
+            np.save(generation / "offsets.npy", offsets)
+            np.save(generation / "entries.npy", entries)
+            np.save(generation / "stores.npy", stores)
+
+            pointer = self.directory / "CURRENT.tmp"
+            pointer.write_text(generation.name)
+            os.replace(pointer, self.directory / "CURRENT")
+
+            self._delta = {}
+            self._load()
+            # Open memory maps keep old files readable until they are dropped.
+            for old in generations:
+                shutil.rmtree(old, ignore_errors=True)
+
+    def _merged(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        base_count = len(self._entries)
+        base_items = np.repeat(np.asarray(self._items), np.diff(np.asarray(self._offsets)))
+        base_stores = np.asarray(self._stores)[np.asarray(self._entries["store"])]
+
+        delta_items: List[str] = []
+        delta_stores: List[str] = []
+        delta_values: List[Tuple[int, int]] = []
+        for item_code, by_store in self._delta.items():
+            for key, value in by_store.items():
+                delta_items.append(item_code)
+                delta_stores.append(key)
+                delta_values.append(value)
+        delta_prices = np.array([value[0] for value in delta_values], dtype=np.int64)
+        delta_updated = np.array([value[1] for value in delta_values], dtype=np.int64)
+
+        all_items = np.concatenate([base_items.astype(str), np.array(delta_items, dtype=str)])
+        all_stores = np.concatenate([base_stores.astype(str), np.array(delta_stores, dtype=str)])
+        prices = np.concatenate([np.asarray(self._entries["price"]), delta_prices])
+        updated = np.concatenate([np.asarray(self._entries["updated"]), delta_updated])
+        # Ties on the update date go to the newly ingested row.
+        source = np.concatenate([np.zeros(base_count, dtype=np.int8), np.ones(len(delta_values), dtype=np.int8)])
+
+        items, item_index = np.unique(all_items, return_inverse=True)
+        stores, store_index = np.unique(all_stores, return_inverse=True)
+
+        # Keep the newest row per (item, store): sort so it comes last in its group.
+        order = np.lexsort((source, updated, store_index, item_index))
+        last = np.ones(len(order), dtype=bool)
+        same_pair = (item_index[order][1:] == item_index[order][:-1]) & (
+            store_index[order][1:] == store_index[order][:-1]
+        )
+        last[:-1] = ~same_pair
+        keep = order[last]
+
+        # Final layout: by item, then price, then store.
+        keep = keep[np.lexsort((store_index[keep], prices[keep], item_index[keep]))]
+        entries = np.empty(len(keep), dtype=ENTRY_DTYPE)
+        entries["store"] = store_index[keep]
+        entries["price"] = prices[keep]
+        entries["updated"] = updated[keep]
+        offsets = np.zeros(len(items) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(item_index[keep], minlength=len(items)))
+        return items, offsets, entries, stores
@@ -0,0 +1,417 @@
+"""
+Daily price rollups per (day, ItemCode, chain, sub-chain, city), built at ingest time.
+
+Dashboards and comparisons want min / mean / max prices per item, chain and
+city, which otherwise means scanning ``price_events``. ``DailyRollups`` folds
+the typed columns of every ingested price file into one row per
+(day, ItemCode, chain, sub-chain, city) holding the min, max and mean price,
+the number of stores and the cheapest store.
+
+A store publishes several files a day (a full file and updates), so every store
+contributes its latest price of the day: ingesting a store again replaces its
+earlier price instead of counting it twice. For that, the store-level rows of
+the last ``open_days`` days are kept in ``open.npz``; older days are final and
+only their rollups remain. The directory holds:
+
+- ``day=YYYY-MM-DD.npz`` (or ``.parquet``): the rollup of one day, sorted by
+  ItemCode, chain, sub-chain and city
+- ``open.npz``: latest price per (day, store, ItemCode) of the open days, with
+  ItemCodes and ``"<chain>:<sub-chain>:<store>"`` keys dictionary-encoded
+- ``store_cities.json``: (chain, store) -> city, learned from stores files
+
+Days are calendar days in ``time_zone`` of the file's observation time. Cities
+are resolved when a day's rollup is rebuilt, so stores whose stores file is
+ingested later in the same run are still placed correctly; stores with no known
+city are rolled up under city ``""``.
+
+With ``dsn`` set, ``commit`` also replaces the rebuilt days in the
+``daily_price_rollups`` table (``databases/schema.sql``); that needs the
+optional ``psycopg`` dependency. The Parquet format needs ``pyarrow``.
+"""
+import json
+import os
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, TypedDict, Union
+
+import numpy as np
+
+from columnar.price_columns import PRICE_SCALE, PriceColumns
+
+DEFAULT_OPEN_DAYS = 2
+FORMATS = ("npz", "parquet")
+_OPEN_COLUMNS = ("day", "store", "item", "price")
+_ROLLUP_COLUMNS = (
+    "item", "chain", "sub_chain", "city", "min_price", "max_price", "price_sum", "store_count", "cheapest_store",
+)
+
+TimeLike = Union[str, datetime, np.datetime64]
+
+
+class DailyRollup(TypedDict):
+    """Prices of one item in one chain, sub-chain and city on one day."""
+    day: str
+    item_code: str
+    chain_id: str
+    sub_chain_id: str
+    city: str
+    min_price: float
+    max_price: float
+    mean_price: float
+    store_count: int
+    cheapest_store_id: str
+
+
+def _store_id(value: str) -> str:
+    # Same normalization as the typed columns ("001" -> "1").
+    value = value.strip()
+    return value.lstrip("0") or ("0" if value else "")
+
+
+def _day_name(day: int) -> str:
+    return str(np.datetime64(day, "D"))
+
+
+def _empty_open() -> Dict[str, np.ndarray]:
+    empty = np.array([], dtype="<U1")
+    return {
+        "stores": empty,
+        "items": empty,
+        "day": np.zeros(0, dtype=np.int32),
+        "store": np.zeros(0, dtype=np.int32),
+        "item": np.zeros(0, dtype=np.int32),
+        "price": np.zeros(0, dtype=np.int64),
+    }
+
+
+def _group_starts(*keys: np.ndarray) -> np.ndarray:
+    """Start positions of runs of equal key tuples in sorted ``keys``."""
+    if not len(keys[0]):
+        return np.zeros(0, dtype=np.int64)
+    changed = np.zeros(len(keys[0]), dtype=bool)
+    changed[0] = True
+    for key in keys:
+        changed[1:] |= key[1:] != key[:-1]
+    return np.flatnonzero(changed)
+
+
+class DailyRollups:
+    """Incrementally maintained daily rollups of ingested price files."""
+
+    def __init__(
+        self,
+        directory: str,
+        time_zone: str = "Asia/Jerusalem",
+        open_days: int = DEFAULT_OPEN_DAYS,
+        format: str = "npz",
+        dsn: Optional[str] = None,
+    ):
+        from zoneinfo import ZoneInfo
+
+        if format not in FORMATS:
+            raise ValueError(f"Unknown rollup format {format!r}; expected one of {FORMATS}")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.time_zone = ZoneInfo(time_zone)
+        self.open_days = open_days
+        self.format = format
+        self.dsn = dsn
+        self._pending: List[Dict[str, np.ndarray]] = []
+        self._lock = threading.RLock()
+        cities_path = self.directory / "store_cities.json"
+        self._cities: Dict[str, str] = (
+            json.loads(cities_path.read_text(encoding="utf-8")) if cities_path.exists() else {}
+        )
+        self._cities_changed = False
+        open_path = self.directory / "open.npz"
+        if open_path.exists():
+            with np.load(open_path) as data:
+                self._open = {column: data[column] for column in _OPEN_COLUMNS + ("stores", "items")}
+        else:
+            self._open = _empty_open()
+
+    def _day(self, value: TimeLike) -> int:
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if isinstance(value, datetime):
+            if value.tzinfo is not None:
+                value = value.astimezone(self.time_zone).replace(tzinfo=None)
+            value = np.datetime64(value, "s")
+        return int(np.datetime64(value, "D").astype(np.int64))
+
+    # -- ingestion ---------------------------------------------------------
+
+    def observe_stores(self, records: List[Dict[str, str]]) -> int:
+        """Learn store cities from parsed stores records; returns stores with a city."""
+        learned = 0
+        with self._lock:
+            for record in records:
+                chain_id = (record.get("ChainId") or "").strip()
+                store_id = _store_id(record.get("StoreId") or "")
+                city = (record.get("City") or "").strip()
+                if not chain_id or not store_id or not city:
+                    continue
+                key = f"{chain_id}:{store_id}"
+                if self._cities.get(key) != city:
+                    self._cities[key] = city
+                    self._cities_changed = True
+                learned += 1
+        return learned
+
+    def ingest(self, columns: PriceColumns, observed_at: Optional[TimeLike] = None) -> int:
+        """Buffer the valid rows of one price file observed at ``observed_at`` (default: now)."""
+        day = self._day(observed_at if observed_at is not None else datetime.now(self.time_zone))
+        valid = columns["valid"]
+        store_keys = columns["chain_id"][valid].astype(str)
+        for part in (columns["sub_chain_id"][valid], columns["store_id"][valid]):
+            store_keys = np.char.add(np.char.add(store_keys, ":"), part.astype(str))
+        rows = {
+            "store": store_keys,
+            "item": columns["item_code"][valid].astype(str),
+            "price": columns["item_price"][valid],
+            "day": np.full(int(valid.sum()), day, dtype=np.int32),
+        }
+        with self._lock:
+            self._pending.append(rows)
+        return len(rows["item"])
+
+    def ingest_records(self, records: List[Dict[str, str]], observed_at: Optional[TimeLike] = None) -> int:
+        """Convenience wrapper for parsed (string) price records."""
+        from columnar.price_columns import to_price_columns
+
+        return self.ingest(to_price_columns(records), observed_at)
+
+    # -- commit ------------------------------------------------------------
+
+    def commit(self) -> List[str]:
+        """
+        Fold buffered files into the store-level rows of their days, rebuild those days'
+        rollups and close days older than ``open_days``. Returns the rebuilt days.
+        """
+        with self._lock:
+            if self._cities_changed:
+                self._save_cities()
+            if not self._pending:
+                return []
+            pending, self._pending = self._pending, []
+            opened = self._open
+            pending_stores = np.concatenate([part["store"] for part in pending])
+            pending_items = np.concatenate([part["item"] for part in pending])
+            stores = np.union1d(opened["stores"], pending_stores)
+            items = np.union1d(opened["items"], pending_items)
+            # Re-encode the open rows against the grown dictionaries; pending rows go after
+            # them in ingestion order, which decides the latest row of a store.
+            rows = {
+                "day": np.concatenate([opened["day"]] + [part["day"] for part in pending]),
+                "store": np.concatenate([
+                    np.searchsorted(stores, opened["stores"])[opened["store"]],
+                    np.searchsorted(stores, pending_stores),
+                ]).astype(np.int32),
+                "item": np.concatenate([
+                    np.searchsorted(items, opened["items"])[opened["item"]],
+                    np.searchsorted(items, pending_items),
+                ]).astype(np.int32),
+                "price": np.concatenate([opened["price"]] + [part["price"] for part in pending]),
+            }
+            rows = self._latest_per_store(rows)
+
+            changed_days = np.unique(np.concatenate([part["day"] for part in pending]))
+            newest = int(rows["day"].max())
+            # Days that fell out of the open window are already final; late files for them are dropped.
+            changed_days = changed_days[changed_days > newest - self.open_days]
+            built = []
+            for day in changed_days.tolist():
+                in_day = rows["day"] == day
+                rollup = self._rollup(stores, items, {column: values[in_day] for column, values in rows.items()})
+                self._write_day(day, rollup)
+                built.append(_day_name(day))
+
+            keep = rows["day"] > newest - self.open_days
+            self._open = {column: values[keep] for column, values in rows.items()}
+            self._open["stores"], self._open["items"] = stores, items
+            self._save_open()
+            if self.dsn and built:
+                self.load_postgres(self.dsn, built)
+            return built
+
+    @staticmethod
+    def _latest_per_store(rows: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Keep the last row per (day, store, item)."""
+        sequence = np.arange(len(rows["day"]))
+        order = np.lexsort((sequence, rows["item"], rows["store"], rows["day"]))
+        starts = _group_starts(rows["day"][order], rows["store"][order], rows["item"][order])
+        last = order[np.append(starts[1:], len(order)) - 1]
+        return {column: values[last] for column, values in rows.items()}
+
+    def _rollup(self, stores: np.ndarray, items: np.ndarray, rows: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """One row per (item, chain, sub-chain, city) of one day's store-level rows."""
+        # Stores are few: resolve chain, sub-chain and city per store key, then number the
+        # (chain, sub-chain, city) groups in sorted order.
+        keys = [key.split(":", 2) for key in stores.tolist()]
+        groups = [(chain, sub_chain, self._cities.get(f"{chain}:{store}", "")) for chain, sub_chain, store in keys]
+        group_names = sorted(set(groups))
+        group_numbers = {group: number for number, group in enumerate(group_names)}
+        store_group = np.array([group_numbers[group] for group in groups], dtype=np.int32)
+        store_ids = np.array([store for _, _, store in keys], dtype=str)
+
+        group = store_group[rows["store"]]
+        # Cheapest first within each group, ties to the lowest store key.
+        order = np.lexsort((rows["store"], rows["price"], group, rows["item"]))
+        item, group, price, store = rows["item"][order], group[order], rows["price"][order], rows["store"][order]
+        starts = _group_starts(item, group)
+        first_groups = [group_names[number] for number in group[starts].tolist()]
+        return {
+            "item": items[item[starts]],
+            "chain": np.array([name[0] for name in first_groups], dtype=str),
+            "sub_chain": np.array([name[1] for name in first_groups], dtype=str),
+            "city": np.array([name[2] for name in first_groups], dtype=str),
+            "min_price": price[starts],
+            "max_price": np.maximum.reduceat(price, starts) if len(starts) else price[:0],
+            "price_sum": np.add.reduceat(price, starts) if len(starts) else price[:0],
+            "store_count": np.diff(np.append(starts, len(price))).astype(np.int32),
+            "cheapest_store": store_ids[store[starts]] if len(store_ids) else np.array([], dtype=str),
+        }
+
+    # -- persistence -------------------------------------------------------
+
+    def _save_cities(self) -> None:
+        path = self.directory / "store_cities.json"
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self._cities, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, path)
+        self._cities_changed = False
+
+    def _save_open(self) -> None:
+        tmp = self.directory / "open.tmp.npz"
+        # Working state rewritten on every commit: uncompressed, compression costs more than it saves.
+        np.savez(tmp, **self._open)
+        os.replace(tmp, self.directory / "open.npz")
+
+    def _day_path(self, day: str, format: Optional[str] = None) -> Path:
+        return self.directory / f"day={day}.{format or self.format}"
+
+    def _write_day(self, day: int, rollup: Dict[str, np.ndarray]) -> None:
+        name = _day_name(day)
+        path = self._day_path(name)
+        if self.format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            tmp = path.with_name(path.name + ".tmp")
+            pq.write_table(pa.table(_table_columns(name, rollup)), tmp, compression="zstd")
+        else:
+            tmp = path.with_name(path.name[:-len(".npz")] + ".tmp.npz")
+            np.savez_compressed(tmp, **rollup)
+        os.replace(tmp, path)
+
+    def _read_day(self, day: str) -> Optional[Dict[str, np.ndarray]]:
+        path = self._day_path(day, "npz")
+        if path.exists():
+            with np.load(path) as data:
+                return {column: data[column] for column in _ROLLUP_COLUMNS}
+        path = self._day_path(day, "parquet")
+        if path.exists():
+            import pyarrow.parquet as pq
+
+            table = pq.read_table(path).to_pydict()
+            return {
+                "item": np.array(table["item_code"], dtype=str),
+                "chain": np.array(table["chain_id"], dtype=str),
+                "sub_chain": np.array(table["sub_chain_id"], dtype=str),
+                "city": np.array(table["city"], dtype=str),
+                "min_price": np.rint(np.array(table["min_price"]) * PRICE_SCALE).astype(np.int64),
+                "max_price": np.rint(np.array(table["max_price"]) * PRICE_SCALE).astype(np.int64),
+                "price_sum": np.rint(
+                    np.array(table["mean_price"]) * np.array(table["store_count"]) * PRICE_SCALE
+                ).astype(np.int64),
+                "store_count": np.array(table["store_count"], dtype=np.int32),
+                "cheapest_store": np.array(table["cheapest_store_id"], dtype=str),
+            }
+        return None
+
+    def load_postgres(self, dsn: str, days: Sequence[str]) -> int:
+        """Replace ``days`` in the ``daily_price_rollups`` table; returns rows written."""
+        try:
+            import psycopg
+        except ImportError as exc:
+            raise RuntimeError(
+                "Loading rollups requires psycopg; install with `pip install \"scraper[postgres]\"`"
+            ) from exc
+        written = 0
+        with psycopg.connect(dsn) as conn:
+            for day in days:
+                rollup = self._read_day(day)
+                if rollup is None:
+                    continue
+                columns = _table_columns(day, rollup)
+                conn.execute("DELETE FROM daily_price_rollups WHERE day = %s", (day,))
+                with conn.cursor().copy(
+                    "COPY daily_price_rollups (day, item_code, chain_id, sub_chain_id, city, "
+                    "min_price, max_price, mean_price, store_count, cheapest_store_id) FROM STDIN"
+                ) as copy:
+                    for row in zip(*columns.values()):
+                        copy.write_row(row)
+                written += len(columns["item_code"])
+        return written
+
+    # -- queries -----------------------------------------------------------
+
+    def days(self) -> List[str]:
+        """Days with a rollup, oldest first."""
+        names = {path.name.split("=", 1)[1].split(".", 1)[0] for path in self.directory.glob("day=*")}
+        return sorted(names)
+
+    def rollups(
+        self,
+        day: Union[str, date],
+        item_codes: Optional[Sequence[str]] = None,
+        chain_id: Optional[str] = None,
+        city: Optional[str] = None,
+    ) -> List[DailyRollup]:
+        """Rollup rows of one day, optionally filtered by items, chain and city."""
+        name = str(day)
+        with self._lock:
+            rollup = self._read_day(name)
+        if rollup is None:
+            return []
+        keep = np.ones(len(rollup["item"]), dtype=bool)
+        if item_codes is not None:
+            keep &= np.isin(rollup["item"], list(item_codes))
+        if chain_id is not None:
+            keep &= rollup["chain"] == chain_id
+        if city is not None:
+            keep &= rollup["city"] == city
+        columns = _table_columns(name, {column: values[keep] for column, values in rollup.items()})
+        return [
+            DailyRollup(**dict(zip(columns, row)))
+            for row in zip(*(values.tolist() for values in columns.values()))
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        """Rollup days, open store-level rows and known store cities."""
+        with self._lock:
+            return {
+                "days": len(self.days()),
+                "open_rows": len(self._open["item"]),
+                "pending_files": len(self._pending),
+                "store_cities": len(self._cities),
+            }
+
+
+def _table_columns(day: str, rollup: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Rollup arrays as the ``DailyRollup`` columns, prices in shekels."""
+    count = len(rollup["item"])
+    store_count = rollup["store_count"].astype(np.int64)
+    return {
+        "day": np.full(count, day, dtype=object),
+        "item_code": rollup["item"].astype(str),
+        "chain_id": rollup["chain"].astype(str),
+        "sub_chain_id": rollup["sub_chain"].astype(str),
+        "city": rollup["city"].astype(str),
+        "min_price": rollup["min_price"] / PRICE_SCALE,
+        "max_price": rollup["max_price"] / PRICE_SCALE,
+        "mean_price": np.round(rollup["price_sum"] / np.maximum(store_count, 1) / PRICE_SCALE, 2),
+        "store_count": store_count,
+        "cheapest_store_id": rollup["cheapest_store"].astype(str),
+    }
@@ -0,0 +1,143 @@
+"""
+Spatial index over stores of all chains for k-nearest and radius queries.
+
+Stores are bucketed into a fixed latitude/longitude grid (a geohash-style
+grid with square-ish cells of ``cell_degrees``) and kept sorted by cell, so
+each cell is a slice of the coordinate arrays. A radius query visits only
+the cells overlapping the query's bounding box and computes exact
+great-circle distances for the stores in them; k-nearest widens the radius
+until it holds ``k`` stores. Work therefore grows with the number of stores
+near the query point, not with the total number of stores.
+"""
+import math
+from typing import Dict, Iterable, List, Optional, Tuple, TypedDict
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# ~2.2 km cells: a 5 km radius query touches about 25 cells.
+DEFAULT_CELL_DEGREES = 0.02
+
+
+class NearbyStore(TypedDict):
+    """A store returned by a spatial query."""
+    chain_id: str
+    store_id: str
+    latitude: float
+    longitude: float
+    distance_km: float
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; works on scalars and NumPy arrays."""
+    lat1, lon1, lat2, lon2 = (np.radians(value) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class StoreLocationIndex:
+    """Grid index of store coordinates."""
+
+    def __init__(
+        self,
+        stores: Iterable[Tuple[str, str, float, float]],
+        cell_degrees: float = DEFAULT_CELL_DEGREES,
+    ):
+        """
+        Args:
+            stores: (chain_id, store_id, latitude, longitude) per store
+            cell_degrees: Grid cell size in degrees of latitude and longitude
+        """
+        self.cell_degrees = cell_degrees
+        rows = list(stores)
+        latitudes = np.array([row[2] for row in rows], dtype=np.float64)
+        longitudes = np.array([row[3] for row in rows], dtype=np.float64)
+        cells_lat = np.floor(latitudes / cell_degrees).astype(np.int64)
+        cells_lon = np.floor(longitudes / cell_degrees).astype(np.int64)
+
+        order = np.lexsort((cells_lon, cells_lat))
+        self._keys = [(rows[position][0], rows[position][1]) for position in order.tolist()]
+        self._latitudes = latitudes[order]
+        self._longitudes = longitudes[order]
+
+        self._cells: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        sorted_cells = list(zip(cells_lat[order].tolist(), cells_lon[order].tolist()))
+        start = 0
+        for position in range(1, len(sorted_cells) + 1):
+            if position == len(sorted_cells) or sorted_cells[position] != sorted_cells[start]:
+                self._cells[sorted_cells[start]] = (start, position)
+                start = position
+
+    @classmethod
+    def from_locator(cls, locator, cell_degrees: float = DEFAULT_CELL_DEGREES) -> "StoreLocationIndex":
+        """Index every geocoded store cached by a ``StoreLocator``."""
+        return cls(
+            (
+                (location["chain_id"], location["store_id"], location["latitude"], location["longitude"])
+                for location in locator.locations()
+            ),
+            cell_degrees=cell_degrees,
+        )
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _candidates(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        """Positions of stores in the grid cells overlapping the query's bounding box."""
+        delta_lat = radius_km / KM_PER_DEGREE
+        # Longitude degrees shrink towards the poles; size the box for the widest latitude it spans.
+        widest = min(abs(latitude) + delta_lat, 89.9)
+        delta_lon = min(radius_km / (KM_PER_DEGREE * math.cos(math.radians(widest))), 180.0)
+
+        step = self.cell_degrees
+        lat_range = range(math.floor((latitude - delta_lat) / step), math.floor((latitude + delta_lat) / step) + 1)
+        lon_range = range(math.floor((longitude - delta_lon) / step), math.floor((longitude + delta_lon) / step) + 1)
+        slices = []
+        if len(lat_range) * len(lon_range) > len(self._cells):
+            # Huge radius: walking the occupied cells is cheaper than the box.
+            for (cell_lat, cell_lon), (start, end) in self._cells.items():
+                if cell_lat in lat_range and cell_lon in lon_range:
+                    slices.append(np.arange(start, end))
+        else:
+            for cell_lat in lat_range:
+                for cell_lon in lon_range:
+                    bounds = self._cells.get((cell_lat, cell_lon))
+                    if bounds is not None:
+                        slices.append(np.arange(*bounds))
+        return np.concatenate(slices) if slices else np.zeros(0, dtype=np.int64)
+
+    def _results(self, positions: np.ndarray, distances: np.ndarray) -> List[NearbyStore]:
+        return [
+            NearbyStore(
+                chain_id=self._keys[position][0],
+                store_id=self._keys[position][1],
+                latitude=float(self._latitudes[position]),
+                longitude=float(self._longitudes[position]),
+                distance_km=round(float(distance), 3),
+            )
+            for position, distance in zip(positions.tolist(), distances.tolist())
+        ]
+
+    def within(
+        self, latitude: float, longitude: float, radius_km: float, limit: Optional[int] = None
+    ) -> List[NearbyStore]:
+        """Stores within ``radius_km`` of a point, nearest first."""
+        positions = self._candidates(latitude, longitude, radius_km)
+        distances = haversine_km(latitude, longitude, self._latitudes[positions], self._longitudes[positions])
+        inside = distances <= radius_km
+        positions, distances = positions[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")[:limit]
+        return self._results(positions[order], distances[order])
+
+    def nearest(self, latitude: float, longitude: float, k: int = 5) -> List[NearbyStore]:
+        """The ``k`` stores nearest to a point."""
+        if k <= 0 or not self._keys:
+            return []
+        radius_km = self.cell_degrees * KM_PER_DEGREE
+        while True:
+            found = self.within(latitude, longitude, radius_km, limit=k)
+            # Every store within the radius is found, so once k are inside, they are the k nearest.
+            if len(found) >= k or radius_km > math.pi * EARTH_RADIUS_KM:
+                return found
+            radius_km *= 2
@@ -0,0 +1,84 @@
+"""
+Basket ranking benchmark on a synthetic store x item matrix.
+
+Builds a ``PriceIndex`` with ``--stores`` stores carrying most of
+``--catalog`` items, then times building the basket matrix from the index
+and ranking ``--items``-item baskets.
+
+Usage (from the scraper directory):
+    python benchmarks/basket.py [--stores 3000] [--catalog 2000] [--items 40] [--rounds 50]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analytics.basket import PriceMatrix
+from analytics.price_index import PriceIndex
+from columnar.price_columns import PRICE_SCALE, PriceColumns
+
+
+def _synthetic_file(rng: np.random.Generator, chain_id: str, store_id: str, catalog: int) -> PriceColumns:
+    carried = np.flatnonzero(rng.random(catalog) < 0.9)
+    count = len(carried)
+    return PriceColumns(
+        chain_id=np.full(count, chain_id),
+        sub_chain_id=np.full(count, "1"),
+        store_id=np.full(count, store_id),
+        item_code=np.char.add("729", carried.astype(str)),
+        item_price=(rng.uniform(1, 60, count) * PRICE_SCALE).astype(np.int64),
+        unit_of_measure_price=np.zeros(count, dtype=np.int64),
+        quantity=np.ones(count),
+        qty_in_package=np.ones(count),
+        is_weighted=np.zeros(count, dtype=bool),
+        price_update_date=np.full(count, np.datetime64("2024-05-01T08:00:00", "s")),
+        unit_price=np.ones(count),
+        malformed={},
+        valid=np.ones(count, dtype=bool),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stores", type=int, default=3000)
+    parser.add_argument("--catalog", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    with tempfile.TemporaryDirectory() as directory:
+        index = PriceIndex(directory)
+        started = time.perf_counter()
+        for store in range(args.stores):
+            index.ingest(_synthetic_file(rng, f"72900000000{store % 5}", str(store), args.catalog))
+        index.commit()
+        print(f"index: {len(index)} prices in {time.perf_counter() - started:.1f}s")
+
+        build_ms, rank_ms = [], []
+        for _ in range(args.rounds):
+            codes = ["729" + str(code) for code in rng.choice(args.catalog, args.items, replace=False)]
+            basket = [{"item_code": code, "quantity": float(rng.integers(1, 4))} for code in codes]
+
+            started = time.perf_counter()
+            matrix = PriceMatrix.from_price_index(index, codes)
+            build_ms.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            matrix.rank(basket, top=10)
+            rank_ms.append((time.perf_counter() - started) * 1000)
+
+        print(
+            f"{args.stores} stores x {args.items} items: "
+            f"build p50 {np.median(build_ms):.2f} ms, rank p50 {np.median(rank_ms):.2f} ms "
+            f"(p95 {np.percentile(build_ms, 95):.2f} / {np.percentile(rank_ms, 95):.2f} ms)"
+        )
+
+
+if __name__ == "__main__":
+    main()
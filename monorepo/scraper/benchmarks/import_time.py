@@ -0,0 +1,96 @@
+"""
+Import-time regression check for scraper startup.
+
+Runs each scenario in a fresh interpreter under ``python -X importtime`` and
+reports the total import time and the slowest top-level imports. The check
+fails if a scenario imports a module it should not (e.g. pandas before any
+records are grouped) or exceeds ``--max-ms``.
+
+Usage (from the scraper directory):
+    python benchmarks/import_time.py [--max-ms 400] [--repeat 3] [--top 10]
+"""
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+SCRAPER_DIR = Path(__file__).resolve().parent.parent
+
+# name -> (code to run, modules that must not be imported)
+SCENARIOS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "startup": (
+        "import main",
+        ("pandas", "bs4", "shufersal", "cerberus"),
+    ),
+    "rami_levy_stores": (
+        "import bootstrapper, pipeline_runner; bootstrapper.create_pipelines()['rami_levy_stores']",
+        ("pandas", "bs4", "shufersal.prices"),
+    ),
+    "shufersal_stores": (
+        "import bootstrapper; bootstrapper.create_pipelines()['shufersal_stores']",
+        ("pandas", "bs4", "cerberus"),
+    ),
+}
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)")
+
+
+def measure(code: str) -> Tuple[float, List[Tuple[str, float]], List[str]]:
+    """Return (total ms, top-level imports with cumulative ms, all imported modules)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=SCRAPER_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    top_level: List[Tuple[str, float]] = []
+    modules: List[str] = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        total_us += int(self_us)
+        modules.append(module)
+        if len(indent) == 1:
+            top_level.append((module, int(cumulative_us) / 1000))
+    top_level.sort(key=lambda item: item[1], reverse=True)
+    return total_us / 1000, top_level, modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if a scenario's import time exceeds this")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario; the fastest counts")
+    parser.add_argument("--top", type=int, default=8, help="Slowest top-level imports to show")
+    args = parser.parse_args()
+
+    failed = False
+    for name, (code, forbidden) in SCENARIOS.items():
+        runs = [measure(code) for _ in range(args.repeat)]
+        total_ms, top_level, modules = min(runs, key=lambda run: run[0])
+        print(f"{name}: {total_ms:.1f} ms")
+        for module, cumulative_ms in top_level[: args.top]:
+            print(f"    {cumulative_ms:8.1f} ms  {module}")
+
+        leaked = sorted({
+            module for module in modules
+            for prefix in forbidden
+            if module == prefix or module.startswith(prefix + ".")
+        })
+        if leaked:
+            failed = True
+            print(f"  FAIL: imported {', '.join(leaked)}")
+        if args.max_ms is not None and total_ms > args.max_ms:
+            failed = True
+            print(f"  FAIL: {total_ms:.1f} ms > {args.max_ms:.1f} ms")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
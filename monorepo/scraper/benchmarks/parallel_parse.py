@@ -0,0 +1,80 @@
+"""
+Intra-file parallel parsing benchmark on a synthetic PriceFull file.
+
+Generates a Rami Levy style prices file with ``--items`` items, parses it
+serially and with ``ParallelXmlParser`` for each worker count, checks that
+the records are identical and prints the wall times.
+
+Usage (from the scraper directory):
+    python benchmarks/parallel_parse.py [--items 200000] [--workers 2 4 8] [--rounds 3]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from abstractions.parallel_xml_parser import ParallelXmlParser
+from cerberus.rami_levy.prices.rami_levy_parser import RamiLevyPricesParser
+
+
+def synthetic_prices_file(items: int) -> str:
+    parts = [
+        "﻿<?xml version=\"1.0\" encoding=\"utf-8\"?>\n<Root>\n"
+        "<ChainID>7290058140886</ChainID><SubChainID>001</SubChainID>"
+        "<StoreID>012</StoreID><BikoretNo>5</BikoretNo><DllVerNo>8.0.1.3</DllVerNo>\n"
+        f"<Items Count=\"{items}\">\n"
+    ]
+    for i in range(items):
+        parts.append(
+            "<Item><PriceUpdateDate>2024-05-01 08:00:00</PriceUpdateDate>"
+            f"<ItemCode>729{i:010d}</ItemCode><ItemType>1</ItemType>"
+            f"<ItemName>מוצר {i}</ItemName><ManufacturerName>יצרן</ManufacturerName>"
+            "<ManufactureCountry>IL</ManufactureCountry><UnitQty>גרם</UnitQty>"
+            "<Quantity>500.00</Quantity><UnitOfMeasure>100 גרם</UnitOfMeasure>"
+            f"<bIsWeighted>0</bIsWeighted><QtyInPackage>1</QtyInPackage><ItemPrice>{i % 97 + 0.9:.2f}</ItemPrice>"
+            "<UnitOfMeasurePrice>1.98</UnitOfMeasurePrice><AllowDiscount>1</AllowDiscount>"
+            "<ItemStatus>1</ItemStatus></Item>\n"
+        )
+    parts.append("</Items>\n</Root>\n")
+    return "".join(parts)
+
+
+def _best_of(rounds: int, parse, content: str):
+    best, records = float("inf"), None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        records = parse(content)
+        best = min(best, time.perf_counter() - started)
+    return best, records
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--items", type=int, default=200_000)
+    arg_parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    arg_parser.add_argument("--rounds", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    content = synthetic_prices_file(args.items)
+    print(f"{args.items} items, {len(content.encode('utf-8')) / 1e6:.1f} MB")
+
+    serial_seconds, expected = _best_of(args.rounds, RamiLevyPricesParser().parse, content)
+    print(f"serial     {serial_seconds * 1000:8.0f} ms")
+
+    identical = True
+    for workers in args.workers:
+        parser = ParallelXmlParser(RamiLevyPricesParser(), workers=workers, min_bytes=0)
+        parser.parse(content)  # start the worker processes outside the timing
+        seconds, records = _best_of(args.rounds, parser.parse, content)
+        identical &= records == expected
+        print(
+            f"{workers:2d} workers {seconds * 1000:8.0f} ms  "
+            f"x{serial_seconds / seconds:.2f}  {'identical' if records == expected else 'MISMATCH'}"
+        )
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
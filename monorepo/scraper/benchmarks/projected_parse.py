@@ -0,0 +1,87 @@
+"""
+Projection pushdown benchmark on a synthetic PriceFull file.
+
+Parses a Rami Levy style prices file with ``--items`` items in full, with the
+typed-column fields (``COLUMN_FIELDS``) and with the four fields diffing needs,
+checks that each projection equals the full records restricted to its fields
+and prints the parse time and the memory held by the records. The time of
+``ET.fromstring`` on the whole file is printed first for reference: building
+the element tree is most of a full parse.
+
+Usage (from the scraper directory):
+    python benchmarks/projected_parse.py [--items 200000] [--rounds 3]
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cerberus.rami_levy.prices.rami_levy_parser import RamiLevyPricesParser
+from columnar.price_columns import COLUMN_FIELDS
+from parallel_parse import synthetic_prices_file
+
+PROJECTIONS = {
+    "full": None,
+    "columns": COLUMN_FIELDS,
+    "diff": ("ItemCode", "ItemPrice", "UnitOfMeasurePrice", "PriceUpdateDate"),
+}
+
+
+def _best_of(rounds: int, parse, *args) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        parse(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _records_bytes(parser: RamiLevyPricesParser, content: str, fields):
+    """Parse once and return the records with the memory they still hold."""
+    gc.collect()
+    tracemalloc.start()
+    records = parser.parse(content, fields)
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return records, held
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument("--items", type=int, default=200_000)
+    arg_parser.add_argument("--rounds", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    content = synthetic_prices_file(args.items)
+    parser = RamiLevyPricesParser()
+    print(f"{args.items} items, {len(content.encode('utf-8')) / 1e6:.1f} MB")
+
+    tree_seconds = _best_of(args.rounds, ET.fromstring, content.lstrip("\ufeff"))
+    print(f"tree of the whole file {tree_seconds * 1000:7.0f} ms")
+    # Time every projection before any parsed records are kept alive (they slow the GC down).
+    seconds = {name: _best_of(args.rounds, parser.parse, content, fields) for name, fields in PROJECTIONS.items()}
+
+    full, full_bytes = _records_bytes(parser, content, None)
+    identical = True
+    for name, fields in PROJECTIONS.items():
+        records, held = (full, full_bytes) if fields is None else _records_bytes(parser, content, fields)
+        if fields is not None:
+            expected = [{key: record[key] for key in record if key in fields} for record in full]
+            identical &= records == expected
+        keys = len(records[0]) if records else 0
+        print(
+            f"{name:8s} {keys:2d} keys  {seconds[name] * 1000:7.0f} ms  x{seconds['full'] / seconds[name]:.2f}  "
+            f"{held / 1e6:7.1f} MB  x{full_bytes / max(held, 1):.2f}"
+        )
+        del records
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
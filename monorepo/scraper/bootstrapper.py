@@ -1,49 +1,160 @@
-from typing import Dict
-from abstractions.scraping_pipeline import ScrapingPipeline
-from shufersal.prices.shufersal_pipeline import ShufersalPipeline
-from shufersal.prices.shufersal_link_extractor import ShufersalLinkExtractor
-from shufersal.prices.shufersal_parser import ShufersalParser
-from shufersal.prices.shufersal_downloader import ShufersalDownloader
-
-from shufersal.stores.shufersal_store_pipeline import ShufersalStoresPipeline
-from shufersal.stores.shufersal_store_link_extractor import ShufersalStoresLinkExtractor
-from shufersal.stores.shufersal_store_parser import ShufersalStoresParser
-from shufersal.stores.shufersal_store_downloader import ShufersalStoresDownloader
-
-from cerberus.cerberus_session import CerberusSession
-from cerberus.rami_levy.prices.rami_levy_pipeline import RamiLevyPipeline
-from cerberus.rami_levy.stores.rami_levy_store_pipeline import RamiLevyStoresPipeline
-
-
-def create_pipelines() -> Dict[str, ScrapingPipeline]:
-    """Create and return all available pipelines."""
-    
-    shufersal_pipeline = ShufersalPipeline(
-        ShufersalLinkExtractor(),
-        ShufersalDownloader(),
-        ShufersalParser(),
+import os
+from typing import Dict, List, Optional, Sequence
+from orchestration.registry import PipelineRegistry
+
+# Prices reference stores (price_events -> stores), so each chain's stores run first.
+PIPELINE_DEPENDENCIES: Dict[str, List[str]] = {
+    "shufersal": ["shufersal_stores"],
+    "rami_levy": ["rami_levy_stores"],
+}
+
+# Pipeline name -> "module:factory". Chain modules are imported only when the pipeline is used.
+PIPELINE_FACTORIES: Dict[str, str] = {
+    "shufersal": "bootstrapper:create_shufersal_pipeline",
+    "shufersal_stores": "bootstrapper:create_shufersal_stores_pipeline",
+    "rami_levy": "bootstrapper:create_rami_levy_pipeline",
+    "rami_levy_stores": "bootstrapper:create_rami_levy_stores_pipeline",
+}
+
+
+def _shufersal_session(registry: PipelineRegistry):
+    """One HTTP session per chain host so repeated runs reuse pooled connections."""
+    import requests
+    from networking.host_limiter import mount_host_limits
+
+    return registry.shared("shufersal_session", lambda: mount_host_limits(requests.Session()))
+
+
+def _cerberus_session_cache():
+    """Login cache shared by the Cerberus sessions if ``SCRAPER_SESSION_CACHE`` (a JSON path) is set."""
+    path = os.environ.get("SCRAPER_SESSION_CACHE")
+    if not path:
+        return None
+    from cerberus.session_cache import CerberusSessionCache
+
+    return CerberusSessionCache(path)
+
+
+def _rami_levy_session(registry: PipelineRegistry):
+    # Rami Levy — Cerberus server (reuses government-standard XML parsers)
+    from cerberus.cerberus_session import CerberusSession
+
+    return registry.shared(
+        "rami_levy_session",
+        lambda: CerberusSession(
+            base_url="https://url.publishedprices.co.il",
+            username="RamiLevi",
+            password="",
+            cache=_cerberus_session_cache(),
+        ),
     )
 
-    shufersal_store_pipeline = ShufersalStoresPipeline(
-        ShufersalStoresLinkExtractor(),
-        ShufersalStoresDownloader(),
-        ShufersalStoresParser(),
+
+def _price_parser(parser):
+    """Wrap ``parser`` to split large files across ``SCRAPER_PARSE_PROCESSES`` processes, if set."""
+    processes = os.environ.get("SCRAPER_PARSE_PROCESSES")
+    if not processes or int(processes) < 2:
+        return parser
+    from abstractions.parallel_xml_parser import ParallelXmlParser
+
+    return ParallelXmlParser(parser, workers=int(processes))
+
+
+def _shufersal_price_link_extractor(session):
+    """
+    Targeted per-category listing if ``SCRAPER_SHUFERSAL_WATERMARKS`` (a JSON path) is set,
+    restricted to ``SCRAPER_SHUFERSAL_STORE_IDS`` (comma-separated) if given.
+    """
+    watermarks_path = os.environ.get("SCRAPER_SHUFERSAL_WATERMARKS")
+    if not watermarks_path:
+        return None
+    from shufersal.prices.shufersal_category_link_extractor import ShufersalCategoryLinkExtractor
+    from shufersal.prices.shufersal_watermarks import ShufersalWatermarks
+
+    store_ids = os.environ.get("SCRAPER_SHUFERSAL_STORE_IDS", "")
+    return ShufersalCategoryLinkExtractor(
+        session,
+        store_ids=[int(store_id) for store_id in store_ids.split(",") if store_id.strip()],
+        watermarks=ShufersalWatermarks(watermarks_path),
     )
 
-    # Rami Levy — Cerberus server (reuses government-standard XML parsers)
-    rami_levy_session = CerberusSession(
-        base_url="https://url.publishedprices.co.il",
-        username="RamiLevi",
-        password="",
+
+def create_shufersal_pipeline(registry: PipelineRegistry):
+    from shufersal.prices.shufersal_pipeline import ShufersalPipeline
+    from shufersal.prices.shufersal_link_extractor import ShufersalLinkExtractor
+    from shufersal.prices.shufersal_parser import ShufersalParser
+    from shufersal.prices.shufersal_downloader import ShufersalDownloader
+
+    session = _shufersal_session(registry)
+    return ShufersalPipeline(
+        _shufersal_price_link_extractor(session) or ShufersalLinkExtractor(session),
+        ShufersalDownloader(session=session),
+        _price_parser(ShufersalParser()),
     )
 
-    rami_levy_pipeline = RamiLevyPipeline(rami_levy_session)
 
-    rami_levy_stores_pipeline = RamiLevyStoresPipeline(rami_levy_session)
+def create_shufersal_stores_pipeline(registry: PipelineRegistry):
+    from shufersal.stores.shufersal_store_pipeline import ShufersalStoresPipeline
+    from shufersal.stores.shufersal_store_link_extractor import ShufersalStoresLinkExtractor
+    from shufersal.stores.shufersal_store_parser import ShufersalStoresParser
+    from shufersal.stores.shufersal_store_downloader import ShufersalStoresDownloader
+
+    session = _shufersal_session(registry)
+    return ShufersalStoresPipeline(
+        ShufersalStoresLinkExtractor(session),
+        ShufersalStoresDownloader(session=session),
+        ShufersalStoresParser(),
+    )
+
+
+def create_rami_levy_pipeline(registry: PipelineRegistry):
+    from cerberus.rami_levy.prices.rami_levy_pipeline import RamiLevyPipeline
+    from cerberus.rami_levy.prices.rami_levy_parser import RamiLevyPricesParser
+
+    return RamiLevyPipeline(_rami_levy_session(registry), parser=_price_parser(RamiLevyPricesParser()))
 
-    return {
-        "shufersal": shufersal_pipeline,
-        "shufersal_stores": shufersal_store_pipeline,
-        "rami_levy": rami_levy_pipeline,
-        "rami_levy_stores": rami_levy_stores_pipeline,
-    }
+
+def create_rami_levy_stores_pipeline(registry: PipelineRegistry):
+    from cerberus.rami_levy.stores.rami_levy_store_pipeline import RamiLevyStoresPipeline
+
+    return RamiLevyStoresPipeline(_rami_levy_session(registry))
+
+
+def create_pipelines(names: Optional[Sequence[str]] = None) -> PipelineRegistry:
+    """
+    Return a registry of the available pipelines (or only ``names``).
+
+    Pipelines are constructed on first lookup, so only the ones a run uses are
+    imported and built.
+    """
+    factories = PIPELINE_FACTORIES
+    if names is not None:
+        factories = {name: PIPELINE_FACTORIES[name] for name in names}
+    return PipelineRegistry(factories)
+
+
+def create_runner(pipelines=None):
+    """
+    ``PipelineRunner`` over ``pipelines`` (default: every pipeline) configured from the
+    ``SCRAPER_*`` environment variables documented in ``main.py``, with stores before prices.
+    """
+    from dashboards.superset_warmup import dashboard_warmup_from_env
+    from pipeline_runner import PipelineRunner
+
+    metrics_port = os.environ.get("SCRAPER_METRICS_PORT")
+    memory_budget_mb = os.environ.get("SCRAPER_MEMORY_BUDGET_MB")
+    return PipelineRunner(
+        pipelines if pipelines is not None else create_pipelines(),
+        metrics_port=int(metrics_port) if metrics_port else None,
+        summary_dir=os.environ.get("SCRAPER_SUMMARY_DIR"),
+        profile_dir=os.environ.get("SCRAPER_PROFILE_DIR"),
+        dependencies=PIPELINE_DEPENDENCIES,
+        limits={"memory_bytes": int(memory_budget_mb) * 1024 * 1024} if memory_budget_mb else None,
+        gazetteer_path=os.environ.get("SCRAPER_GAZETTEER_PATH"),
+        bulk_load_dsn=os.environ.get("SCRAPER_BULK_LOAD_DSN"),
+        price_rollups_dir=os.environ.get("SCRAPER_ROLLUPS_DIR"),
+        price_rollups_format=os.environ.get("SCRAPER_ROLLUPS_FORMAT", "npz"),
+        price_rollups_dsn=os.environ.get("SCRAPER_AGGREGATES_DSN"),
+        outbox_path=os.environ.get("SCRAPER_OUTBOX_PATH"),
+        dashboard_warmup=dashboard_warmup_from_env(),
+    )
@@ -9,6 +9,7 @@ import gzip
 from abstractions.file_downloader import FileDownloader
 from abstractions.link_extractor import Link
 from cerberus.cerberus_session import CerberusSession
+from observability import metrics
 
 
 class CerberusDownloader(FileDownloader):
@@ -20,17 +21,20 @@ class CerberusDownloader(FileDownloader):
     def download_and_extract(self, file_meta: Link) -> str:
         """Download a file by name and decompress if gzipped."""
         fname = file_meta["file_name"]
-        raw = self.session.download_file(fname)
-
-        if fname.lower().endswith(".xml"):
-            return self._decode(raw)
-
-        try:
-            decompressed = gzip.decompress(raw)
-        except OSError:
-            decompressed = raw
-
-        return self._decode(decompressed)
+        with metrics.stage("download"):
+            raw = self.session.download_file(fname, expected_size=file_meta.get("size"))
+        metrics.count(metrics.DOWNLOADED_BYTES, len(raw))
+
+        with metrics.stage("decompress"):
+            if fname.lower().endswith(".xml"):
+                decompressed = raw
+            else:
+                try:
+                    decompressed = gzip.decompress(raw)
+                except OSError:
+                    decompressed = raw
+            metrics.count(metrics.DECOMPRESSED_BYTES, len(decompressed))
+            return self._decode(decompressed)
 
     @staticmethod
     def _decode(data: bytes) -> str:
@@ -30,6 +30,15 @@ def _parse_date(raw: str) -> Optional[datetime]:
     return None
 
 
+def _parse_size(raw) -> Optional[int]:
+    """Listing sizes are byte counts (int or digit string); anything else is unknown."""
+    if isinstance(raw, int):
+        return raw
+    if isinstance(raw, str) and raw.strip().isdigit():
+        return int(raw.strip())
+    return None
+
+
 class CerberusLinkExtractor(LinkExtractor):
     """Filters the Cerberus file listing by regex and recency."""
 
@@ -68,13 +77,15 @@ class CerberusLinkExtractor(LinkExtractor):
             if stop_date and parsed_date and parsed_date < stop_date:
                 continue
 
-            links.append(
-                Link(
-                    url=f"{self.session.base_url}/file/d/{fname}",
-                    date=raw_date,
-                    file_name=fname,
-                )
+            link = Link(
+                url=f"{self.session.base_url}/file/d/{fname}",
+                date=raw_date,
+                file_name=fname,
             )
+            size = _parse_size(f.get("size"))
+            if size is not None:
+                link["size"] = size
+            links.append(link)
 
         # Sort newest first so max_links keeps the most recent files
         links.sort(key=lambda l: _parse_date(l["date"]) or datetime.min.replace(tzinfo=timezone.utc), reverse=True)
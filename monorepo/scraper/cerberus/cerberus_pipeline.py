@@ -9,13 +9,15 @@ from datetime import datetime, timedelta, timezone
 from typing import List, Optional
 
 from abstractions.file_downloader import FileDownloader
-from abstractions.link_extractor import LinkExtractor
-from abstractions.parser import Parser
+from abstractions.link_extractor import Link, LinkExtractor
+from abstractions.parser import Parser, Projection
 from abstractions.scraping_pipeline import (
     ExtractedFile,
     PipelineType,
     ScrapingPipeline,
 )
+from observability import metrics
+from orchestration.budgets import PARSE_BUDGET
 
 
 class CerberusPipeline(ScrapingPipeline):
@@ -36,27 +38,32 @@ class CerberusPipeline(ScrapingPipeline):
     def pipeline_type(self) -> PipelineType:
         return self._type
 
-    def extract(
+    def list_files(
         self,
         time_back: timedelta = None,
         max_links: Optional[int] = None,
-    ) -> List[ExtractedFile]:
-        files = self.scraper.fetch(time_back=time_back, max_links=max_links)
-        downloaded = self.fetcher.download_and_extract_all(files)
-
-        results: List[ExtractedFile] = []
-        for file_meta, text in downloaded:
-            records = self.parser.parse(text)
-            results.append(
-                ExtractedFile(
-                    source={
-                        "file_name": file_meta["file_name"],
-                        "source_url": file_meta["url"],
-                        "published_at": file_meta["date"],
-                        "scraped_at": datetime.now(timezone.utc).isoformat(),
-                    },
-                    records=records,
-                )
-            )
-
-        return results
+    ) -> List[Link]:
+        with metrics.stage("listing"):
+            return self.scraper.fetch(time_back=time_back, max_links=max_links)
+
+    def extract_file(self, file_meta: Link, fields: Optional[Projection] = None) -> Optional[ExtractedFile]:
+        try:
+            text = self.fetcher.download_and_extract(file_meta)
+        except Exception:
+            return None
+        if not text:
+            return None
+
+        with PARSE_BUDGET.slot(), metrics.stage("parse"):
+            records = self.parser.parse(text, fields)
+        metrics.count(metrics.RECORDS_PARSED, len(records))
+
+        return ExtractedFile(
+            source={
+                "file_name": file_meta["file_name"],
+                "source_url": file_meta["url"],
+                "published_at": file_meta["date"],
+                "scraped_at": datetime.now(timezone.utc).isoformat(),
+            },
+            records=records,
+        )
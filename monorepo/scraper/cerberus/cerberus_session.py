@@ -4,27 +4,58 @@ Authenticated session for Cerberus (publishedprices.co.il) servers.
 Handles CSRF token extraction, login, file listing, and file download.
 One session instance should be shared across link extractor and downloader
 for the same chain to avoid redundant logins.
+
+With a ``CerberusSessionCache``, the cookies and CSRF token of the last login
+are restored in new processes and validated with a single ``GET /file/d/``
+(which also yields the listing's CSRF token); the full login runs only if the
+server no longer accepts them.
 """
 import re
-from typing import Any, Dict, List
+import threading
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
 
 import requests
 import urllib3
 
+from cerberus.session_cache import CerberusSessionCache, dump_cookies, load_cookies
+from networking.host_limiter import mount_host_limits
+from networking.resumable_download import download_with_resume
+from observability import metrics
+from observability.log import get_logger
+
 # Suppress InsecureRequestWarning for verify=False (same pattern as existing scrapers)
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+_log = get_logger(__name__)
+
+SESSION_AUTHENTICATIONS = metrics.REGISTRY.counter(
+    "scraper_cerberus_authentications_total",
+    "Cerberus authentications: full logins, cached sessions restored and cached sessions rejected.",
+    ("pipeline", "result"),
+)
+
 
 class CerberusSession:
     """Manages an authenticated requests.Session against a Cerberus server."""
 
-    def __init__(self, base_url: str, username: str, password: str = ""):
+    def __init__(
+        self,
+        base_url: str,
+        username: str,
+        password: str = "",
+        cache: Optional[CerberusSessionCache] = None,
+    ):
         self.base_url = base_url.rstrip("/")
         self.username = username
         self.password = password
-        self._session = requests.Session()
+        self.cache = cache
+        self._session = mount_host_limits(requests.Session())
         self._session.verify = False
         self._logged_in = False
+        # CSRF token of the file browsing page for the current login ("" until fetched).
+        self._csrf_token = ""
+        self._login_lock = threading.Lock()
 
     def _extract_csrf(self, html: str) -> str:
         """Extract CSRF token from a <meta name="csrftoken" content="..."> tag."""
@@ -50,57 +81,118 @@ class CerberusSession:
         )
         response.raise_for_status()
         self._logged_in = True
+        self._csrf_token = ""
+        metrics.count(SESSION_AUTHENTICATIONS, result="login")
+        self._save_to_cache()
+
+    def _file_page_csrf(self) -> Optional[str]:
+        """CSRF token of the file browsing page, or None if the server sent us to the login page."""
+        file_page = self._session.get(f"{self.base_url}/file/d/")
+        file_page.raise_for_status()
+        if urlsplit(file_page.url).path.rstrip("/").endswith("/login"):
+            return None
+        return self._extract_csrf(file_page.text)
+
+    def _save_to_cache(self) -> None:
+        if self.cache is not None:
+            self.cache.put(self.base_url, self.username, dump_cookies(self._session.cookies), self._csrf_token)
+
+    def _restore_from_cache(self) -> bool:
+        """Restore the cached login and check it with one request; False if it is gone or rejected."""
+        cached = self.cache.get(self.base_url, self.username)
+        if cached is None or not load_cookies(self._session.cookies, cached["cookies"]):
+            return False
+        csrf_token = self._file_page_csrf()
+        if csrf_token is None:
+            self._session.cookies.clear()
+            self.cache.discard(self.base_url, self.username)
+            metrics.count(SESSION_AUTHENTICATIONS, result="rejected")
+            _log.info("cached session rejected, logging in", extra={"url": self.base_url})
+            return False
+        self._csrf_token = csrf_token or cached["csrf_token"]
+        self._logged_in = True
+        metrics.count(SESSION_AUTHENTICATIONS, result="restored")
+        self._save_to_cache()
+        return True
 
     def _ensure_logged_in(self) -> None:
-        """Lazy login: authenticate on the first API call."""
-        if not self._logged_in:
+        """Lazy login: authenticate (or restore a cached login) on the first API call."""
+        if self._logged_in:
+            return
+        with self._login_lock:
+            if self._logged_in:
+                return
+            if self.cache is not None and self._restore_from_cache():
+                return
             self.login()
 
-    def fetch_file_list(self) -> List[Dict[str, Any]]:
-        """
-        Fetch the full file listing from the Cerberus JSON API.
-
-        Returns a list of file dicts, each containing at least:
-          - fname: file name
-          - ftime: last-modified / publication timestamp string
-          - size: file size
-        """
-        self._ensure_logged_in()
-
-        # Get a fresh CSRF token from the file browsing page
-        file_page = self._session.get(f"{self.base_url}/file/d/")
-        file_page.raise_for_status()
-        csrf_token = self._extract_csrf(file_page.text)
+    def _relogin(self) -> None:
+        """Drop the current (expired) login and authenticate again."""
+        with self._login_lock:
+            self._session.cookies.clear()
+            self._logged_in = False
+            if self.cache is not None:
+                self.cache.discard(self.base_url, self.username)
+            self.login()
 
+    def _post_file_list(self) -> requests.Response:
+        # The token from the cache probe (or an earlier listing) is reused; a stale one
+        # makes the listing fail, which triggers a new login.
+        if not self._csrf_token:
+            self._csrf_token = self._file_page_csrf() or ""
         params = {
             "sEcho": "1",
             "iDisplayStart": "0",
             "iDisplayLength": "100000",
-            "csrftoken": csrf_token,
+            "csrftoken": self._csrf_token,
         }
         response = self._session.post(
             f"{self.base_url}/file/json/dir",
             data=params,
         )
         response.raise_for_status()
+        return response
+
+    def fetch_file_list(self) -> List[Dict[str, Any]]:
+        """
+        Fetch the full file listing from the Cerberus JSON API.
+
+        Returns a list of file dicts, each containing at least:
+          - fname: file name
+          - ftime: last-modified / publication timestamp string
+          - size: file size
+        """
+        self._ensure_logged_in()
+        response = self._post_file_list()
 
         content_type = response.headers.get("Content-Type", "")
+        if "application/json" not in content_type:
+            # Expired session or stale token: log in once more before giving up.
+            self._relogin()
+            response = self._post_file_list()
+            content_type = response.headers.get("Content-Type", "")
         if "application/json" not in content_type:
             raise RuntimeError(
                 f"Cerberus file listing returned non-JSON response "
                 f"(Content-Type: {content_type}). Login may have failed."
             )
 
+        self._save_to_cache()
         data = response.json()
         files = data.get("aaData") or data.get("data") or data.get("files") or []
         return files
 
-    def download_file(self, fname: str) -> bytes:
-        """Download a single file by name, returning raw bytes."""
+    def download_file(self, fname: str, expected_size: Optional[int] = None) -> bytes:
+        """
+        Download a single file by name, returning raw bytes.
+
+        Interrupted transfers are resumed with HTTP Range requests; when
+        ``expected_size`` (from the listing) is given, the result must match it.
+        """
         self._ensure_logged_in()
-        response = self._session.get(
+        return download_with_resume(
+            self._session,
             f"{self.base_url}/file/d/{fname}",
+            expected_size=expected_size,
             timeout=120,
         )
-        response.raise_for_status()
-        return response.content
@@ -1,4 +1,7 @@
 """Rami Levy specific Cerberus prices pipeline."""
+from typing import Optional
+
+from abstractions.parser import Parser
 
 from cerberus.cerberus_downloader import CerberusDownloader
 from cerberus.cerberus_link_extractor import CerberusLinkExtractor
@@ -10,10 +13,10 @@ from cerberus.rami_levy.prices.rami_levy_parser import RamiLevyPricesParser
 class RamiLevyPipeline(CerberusPipeline):
     """Cerberus prices pipeline for Rami Levy."""
 
-    def __init__(self, session: CerberusSession):
+    def __init__(self, session: CerberusSession, parser: Optional[Parser] = None):
         super().__init__(
             scraper=CerberusLinkExtractor(session, r"Price.*\.gz"),
             fetcher=CerberusDownloader(session),
-            parser=RamiLevyPricesParser(),
+            parser=parser or RamiLevyPricesParser(),
             type="prices",
         )
\ No newline at end of file
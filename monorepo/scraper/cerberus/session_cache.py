@@ -0,0 +1,131 @@
+"""
+On-disk cache of authenticated Cerberus sessions.
+
+Logging in to a Cerberus server takes several round-trips (``GET /login``,
+``POST /login/user`` and its redirect, then ``GET /file/d/`` for a CSRF
+token). ``CerberusSessionCache`` keeps the session cookies and the last CSRF
+token per (base_url, username) in a JSON file, so a new process can restore
+them and only has to confirm they still work. Entries expire after
+``ttl_seconds`` from the last successful use, or with their cookies.
+
+The file holds live session cookies: it is written with mode 0600 and
+replaced atomically.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, TypedDict
+
+DEFAULT_TTL_SECONDS = 6 * 3600
+
+
+class CachedCookie(TypedDict):
+    name: str
+    value: str
+    domain: str
+    path: str
+    secure: bool
+    expires: Optional[int]
+
+
+class CachedSession(TypedDict):
+    """Cookies and CSRF token of one authenticated (base_url, username)."""
+    cookies: List[CachedCookie]
+    csrf_token: str
+    expires_at: float
+
+
+def dump_cookies(jar) -> List[CachedCookie]:
+    """Serializable copies of the cookies in a ``requests`` cookie jar."""
+    return [
+        CachedCookie(
+            name=cookie.name,
+            value=cookie.value or "",
+            domain=cookie.domain,
+            path=cookie.path,
+            secure=bool(cookie.secure),
+            expires=cookie.expires,
+        )
+        for cookie in jar
+    ]
+
+
+def load_cookies(jar, cookies: List[CachedCookie], now: Optional[float] = None) -> int:
+    """Put unexpired ``cookies`` into ``jar``; returns how many were restored."""
+    now = time.time() if now is None else now
+    restored = 0
+    for cookie in cookies:
+        if cookie["expires"] is not None and cookie["expires"] <= now:
+            continue
+        jar.set(
+            cookie["name"],
+            cookie["value"],
+            domain=cookie["domain"],
+            path=cookie["path"],
+            secure=cookie["secure"],
+            expires=cookie["expires"],
+        )
+        restored += 1
+    return restored
+
+
+class CerberusSessionCache:
+    """JSON file of ``"<base_url>|<username>" -> CachedSession``."""
+
+    def __init__(self, path: str, ttl_seconds: float = DEFAULT_TTL_SECONDS) -> None:
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(base_url: str, username: str) -> str:
+        return f"{base_url.rstrip('/')}|{username}"
+
+    def _read(self) -> Dict[str, CachedSession]:
+        try:
+            with self.path.open(encoding="utf-8") as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            # A corrupt cache only costs a login.
+            return {}
+
+    def _write(self, entries: Dict[str, CachedSession]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        descriptor = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, "w", encoding="utf-8") as handle:
+            json.dump(entries, handle)
+        os.replace(tmp, self.path)
+
+    def get(self, base_url: str, username: str) -> Optional[CachedSession]:
+        """The cached session, or None if there is none or it has expired."""
+        with self._lock:
+            entry = self._read().get(self.key(base_url, username))
+        if entry is None or entry["expires_at"] <= time.time():
+            return None
+        return entry
+
+    def put(self, base_url: str, username: str, cookies: List[CachedCookie], csrf_token: str) -> None:
+        """Store (or refresh) a session that was just confirmed to work."""
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        cookie_expiry = [cookie["expires"] for cookie in cookies if cookie["expires"] is not None]
+        if cookie_expiry:
+            expires_at = min(expires_at, min(cookie_expiry))
+        with self._lock:
+            entries = {key: entry for key, entry in self._read().items() if entry["expires_at"] > now}
+            entries[self.key(base_url, username)] = CachedSession(
+                cookies=cookies, csrf_token=csrf_token, expires_at=expires_at
+            )
+            self._write(entries)
+
+    def discard(self, base_url: str, username: str) -> None:
+        """Forget a session the server no longer accepts."""
+        with self._lock:
+            entries = self._read()
+            if entries.pop(self.key(base_url, username), None) is not None:
+                self._write(entries)
@@ -0,0 +1,149 @@
+"""
+Typed, column-oriented view of a parsed price file.
+
+Parsers emit every field as a string. ``to_price_columns`` converts a whole
+file's records at once into NumPy arrays, so the diff, aggregation and
+Parquet paths work on typed columns instead of re-parsing strings record by
+record:
+
+- prices as fixed-point ``int64`` in thousandths of a shekel (``PRICE_SCALE``)
+- quantities as ``float64``
+- ``bIsWeighted`` as ``bool``
+- ``PriceUpdateDate`` as ``datetime64[s]``
+
+Values that are present but cannot be parsed are recorded per field in
+``malformed``; ``valid`` marks the rows that have an item code and a usable
+price. Parsed values of malformed or missing fields are 0 / NaN / NaT.
+"""
+from typing import Dict, List, Optional, TypedDict
+
+import numpy as np
+
+from observability import metrics
+
+# Fixed-point scale for prices: 1 shekel == 1000.
+PRICE_SCALE = 1000
+
+PRICE_FIELDS = ("ItemPrice", "UnitOfMeasurePrice")
+QUANTITY_FIELDS = ("Quantity", "QtyInPackage")
+KEY_FIELDS = ("ChainId", "SubChainId", "StoreId", "ItemCode")
+# Every record field ``to_price_columns`` reads: a projection for runs that only need typed columns.
+COLUMN_FIELDS = KEY_FIELDS + PRICE_FIELDS + QUANTITY_FIELDS + ("bIsWeighted", "PriceUpdateDate")
+
+_TRUE = ("1", "true", "True", "TRUE")
+_FALSE = ("0", "false", "False", "FALSE", "")
+
+
+MALFORMED_VALUES = metrics.REGISTRY.counter(
+    "scraper_malformed_values_total",
+    "Price field values that could not be parsed in the typed stage.",
+    ("pipeline", "field"),
+)
+
+
+class PriceColumns(TypedDict):
+    """Typed columns for one price file; all arrays have one entry per record."""
+    chain_id: np.ndarray            # str
+    sub_chain_id: np.ndarray        # str
+    store_id: np.ndarray            # str, normalized like the uploader ("001" -> "1")
+    item_code: np.ndarray           # str
+    item_price: np.ndarray          # int64, PRICE_SCALE fixed point
+    unit_of_measure_price: np.ndarray  # int64, PRICE_SCALE fixed point
+    quantity: np.ndarray            # float64
+    qty_in_package: np.ndarray      # float64
+    is_weighted: np.ndarray         # bool
+    price_update_date: np.ndarray   # datetime64[s]
+    unit_price: np.ndarray          # float64, shekels per unit of Quantity (NaN if unknown)
+    malformed: Dict[str, np.ndarray]  # field -> bool, present but unparseable
+    valid: np.ndarray               # bool
+
+
+def _strings(records: List[Dict[str, str]], field: str) -> np.ndarray:
+    return np.array([(record.get(field) or "").strip() for record in records], dtype=object)
+
+
+def _to_float(values: np.ndarray) -> np.ndarray:
+    # pandas' C converter parses the whole column at once; malformed values become NaN.
+    import pandas as pd
+
+    return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+
+
+def _to_fixed_point(parsed: np.ndarray) -> np.ndarray:
+    return np.where(np.isnan(parsed), 0, np.rint(parsed * PRICE_SCALE)).astype(np.int64)
+
+
+def _to_datetime(values: np.ndarray) -> np.ndarray:
+    import pandas as pd
+
+    # Chains use both "2024-05-01 08:00:00" and "2024-05-01T08:00:00".
+    parsed = pd.to_datetime(pd.Series(values, dtype=object), errors="coerce", format="ISO8601")
+    return parsed.to_numpy(dtype="datetime64[s]")
+
+
+def _normalize_store_ids(values: np.ndarray) -> np.ndarray:
+    values = values.astype(str)
+    stripped = np.char.lstrip(values, "0")
+    return np.where((stripped == "") & (values != ""), "0", stripped)
+
+
+def to_price_columns(records: List[Dict[str, str]]) -> PriceColumns:
+    """Convert one file's price records into typed NumPy columns."""
+    raw = {field: _strings(records, field) for field in COLUMN_FIELDS}
+    malformed: Dict[str, np.ndarray] = {}
+
+    parsed: Dict[str, np.ndarray] = {}
+    for field in PRICE_FIELDS + QUANTITY_FIELDS:
+        values = _to_float(raw[field])
+        malformed[field] = np.isnan(values) & (raw[field] != "")
+        parsed[field] = values
+
+    weighted = raw["bIsWeighted"]
+    is_weighted = np.isin(weighted, _TRUE)
+    malformed["bIsWeighted"] = ~(is_weighted | np.isin(weighted, _FALSE))
+
+    price_update_date = _to_datetime(raw["PriceUpdateDate"])
+    malformed["PriceUpdateDate"] = np.isnat(price_update_date) & (raw["PriceUpdateDate"] != "")
+
+    item_price = parsed["ItemPrice"]
+    quantity = parsed["Quantity"]
+    # Weighted items are priced per unit already; packaged items are priced per package.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        unit_price = np.where(is_weighted, item_price, item_price / quantity)
+    unit_price[~np.isfinite(unit_price) | (~is_weighted & ~(quantity > 0))] = np.nan
+
+    valid = (raw["ItemCode"] != "") & ~np.isnan(item_price) & (item_price >= 0)
+
+    return PriceColumns(
+        chain_id=raw["ChainId"].astype(str),
+        sub_chain_id=raw["SubChainId"].astype(str),
+        store_id=_normalize_store_ids(raw["StoreId"]),
+        item_code=raw["ItemCode"].astype(str),
+        item_price=_to_fixed_point(item_price),
+        unit_of_measure_price=_to_fixed_point(parsed["UnitOfMeasurePrice"]),
+        quantity=quantity,
+        qty_in_package=parsed["QtyInPackage"],
+        is_weighted=is_weighted,
+        price_update_date=price_update_date,
+        unit_price=unit_price,
+        malformed=malformed,
+        valid=valid,
+    )
+
+
+def unit_price_per(columns: PriceColumns, base_quantity: float) -> np.ndarray:
+    """Unit price in shekels for ``base_quantity`` units (e.g. 100 for "per 100 grams")."""
+    return columns["unit_price"] * base_quantity
+
+
+def malformed_counts(columns: PriceColumns) -> Dict[str, int]:
+    """Number of malformed values per field (fields without any are omitted)."""
+    return {field: int(mask.sum()) for field, mask in columns["malformed"].items() if mask.any()}
+
+
+def price_in_shekels(fixed_point: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """Convert fixed-point prices back to float shekels, NaN where ``mask`` is False."""
+    shekels = fixed_point / PRICE_SCALE
+    if mask is not None:
+        shekels = np.where(mask, shekels, np.nan)
+    return shekels
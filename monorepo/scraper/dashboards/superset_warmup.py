@@ -0,0 +1,202 @@
+"""
+Post-ingestion refresh of dashboard aggregates and Superset chart caches.
+
+After price files are ingested, the comparison dashboards would otherwise
+serve their first viewers from cold caches. ``warm_up_dashboards`` runs at
+the end of an ingestion run and:
+
+1. refreshes the pre-computed aggregate tables the charts read
+   (``refresh_price_aggregates()`` in ``databases/schema.sql``), if a DSN is set
+2. logs into Superset and calls ``PUT /api/v1/chart/warm_up_cache`` for every
+   configured chart and every chart on the configured dashboards, which
+   re-runs each query with ``force`` and stores the fresh result in the cache
+
+Superset's data cache timeout is set to the ingestion cadence in
+``databases/superset/superset_config.py``, so the warmed entries live until
+the next run replaces them.
+"""
+import os
+from typing import List, Optional, Set, Tuple, TypedDict
+
+import requests
+
+from observability import metrics
+
+DEFAULT_TIMEOUT_SECONDS = 300
+
+WARMED_CHARTS = metrics.REGISTRY.counter(
+    "scraper_dashboard_warmups_total",
+    "Superset charts warmed after ingestion, by result (ok/failed).",
+    ("pipeline", "result"),
+)
+
+
+class _RequiredDashboardWarmup(TypedDict):
+    superset_url: str
+    username: str
+    password: str
+
+
+class DashboardWarmup(_RequiredDashboardWarmup, total=False):
+    """What to refresh after ingestion."""
+    chart_ids: List[int]
+    dashboard_ids: List[int]
+    # Database holding the aggregate tables (skipped if unset).
+    aggregates_dsn: str
+    # Per-request timeout; warming re-runs the chart's query.
+    timeout: float
+
+
+class WarmupResult(TypedDict):
+    """Outcome of one warm-up."""
+    aggregates_refreshed: bool
+    warmed: int
+    failed: List[str]
+
+
+def _ids(value: Optional[str]) -> List[int]:
+    return [int(part) for part in (value or "").split(",") if part.strip()]
+
+
+def dashboard_warmup_from_env() -> Optional[DashboardWarmup]:
+    """
+    Warm-up config from ``SUPERSET_URL``, ``SUPERSET_WARMUP_CHARTS``,
+    ``SUPERSET_WARMUP_DASHBOARDS`` (comma-separated ids), ``SUPERSET_ADMIN_USERNAME``/
+    ``SUPERSET_ADMIN_PASSWORD`` and ``SCRAPER_AGGREGATES_DSN``; None without ``SUPERSET_URL``.
+    """
+    superset_url = os.environ.get("SUPERSET_URL")
+    if not superset_url:
+        return None
+    warmup = DashboardWarmup(
+        superset_url=superset_url,
+        username=os.environ.get("SUPERSET_ADMIN_USERNAME", "admin"),
+        password=os.environ.get("SUPERSET_ADMIN_PASSWORD", "admin"),
+        chart_ids=_ids(os.environ.get("SUPERSET_WARMUP_CHARTS")),
+        dashboard_ids=_ids(os.environ.get("SUPERSET_WARMUP_DASHBOARDS")),
+    )
+    if os.environ.get("SCRAPER_AGGREGATES_DSN"):
+        warmup["aggregates_dsn"] = os.environ["SCRAPER_AGGREGATES_DSN"]
+    return warmup
+
+
+def refresh_aggregates(dsn: str) -> None:
+    """Rebuild the dashboard aggregate tables from ``latest_prices``."""
+    try:
+        import psycopg
+    except ImportError as exc:
+        raise ImportError(
+            "Refreshing aggregates requires psycopg; install with `pip install \"scraper[postgres]\"`"
+        ) from exc
+    with psycopg.connect(dsn) as conn:
+        conn.execute("SELECT refresh_price_aggregates()")
+
+
+class SupersetClient:
+    """Minimal Superset REST client: login, dashboard charts and cache warm-up."""
+
+    def __init__(self, base_url: str, username: str, password: str, timeout: float = DEFAULT_TIMEOUT_SECONDS):
+        self.base_url = base_url.rstrip("/")
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def login(self) -> None:
+        response = self.session.post(
+            f"{self.base_url}/api/v1/security/login",
+            json={
+                "username": self.username,
+                "password": self.password,
+                "provider": "db",
+                "refresh": False,
+            },
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        self.session.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        # Mutating API calls also need a CSRF token bound to the session cookie.
+        response = self.session.get(f"{self.base_url}/api/v1/security/csrf_token/", timeout=self.timeout)
+        response.raise_for_status()
+        self.session.headers["X-CSRFToken"] = response.json()["result"]
+        self.session.headers["Referer"] = self.base_url
+
+    def dashboard_chart_ids(self, dashboard_id: int) -> List[int]:
+        response = self.session.get(
+            f"{self.base_url}/api/v1/dashboard/{dashboard_id}/charts", timeout=self.timeout
+        )
+        response.raise_for_status()
+        return [chart["id"] for chart in response.json()["result"]]
+
+    def warm_up_chart(self, chart_id: int, dashboard_id: Optional[int] = None) -> None:
+        payload = {"chart_id": chart_id}
+        if dashboard_id is not None:
+            # Applies the dashboard's default filters, so the cached result is the one viewers get.
+            payload["dashboard_id"] = dashboard_id
+        response = self.session.put(
+            f"{self.base_url}/api/v1/chart/warm_up_cache", json=payload, timeout=self.timeout
+        )
+        response.raise_for_status()
+        for result in response.json().get("result", []):
+            if result.get("viz_error"):
+                raise RuntimeError(result["viz_error"])
+
+
+def _targets(client: SupersetClient, warmup: DashboardWarmup, failed: List[str]) -> List[Tuple[int, Optional[int]]]:
+    """(chart_id, dashboard_id) pairs to warm, each chart once per dashboard it is on."""
+    targets: List[Tuple[int, Optional[int]]] = []
+    seen: Set[Tuple[int, Optional[int]]] = set()
+
+    def add(chart_id: int, dashboard_id: Optional[int]) -> None:
+        if (chart_id, dashboard_id) not in seen:
+            seen.add((chart_id, dashboard_id))
+            targets.append((chart_id, dashboard_id))
+
+    for dashboard_id in warmup.get("dashboard_ids", []):
+        try:
+            for chart_id in client.dashboard_chart_ids(dashboard_id):
+                add(chart_id, dashboard_id)
+        except requests.RequestException as exc:
+            failed.append(f"dashboard {dashboard_id}: {exc}")
+    for chart_id in warmup.get("chart_ids", []):
+        add(chart_id, None)
+    return targets
+
+
+def warm_up_dashboards(warmup: DashboardWarmup) -> WarmupResult:
+    """
+    Refresh aggregates, then warm every configured chart.
+
+    Failures are collected in the result instead of raised, so a Superset outage
+    never fails the ingestion run that triggered the warm-up.
+    """
+    result = WarmupResult(aggregates_refreshed=False, warmed=0, failed=[])
+    with metrics.stage("warmup"):
+        if warmup.get("aggregates_dsn"):
+            try:
+                refresh_aggregates(warmup["aggregates_dsn"])
+                result["aggregates_refreshed"] = True
+            except Exception as exc:  # noqa: BLE001 - reported, not fatal
+                result["failed"].append(f"aggregates: {exc}")
+
+        client = SupersetClient(
+            warmup["superset_url"],
+            warmup["username"],
+            warmup["password"],
+            timeout=warmup.get("timeout", DEFAULT_TIMEOUT_SECONDS),
+        )
+        try:
+            client.login()
+        except (requests.RequestException, KeyError, ValueError) as exc:
+            result["failed"].append(f"login: {exc}")
+            return result
+
+        for chart_id, dashboard_id in _targets(client, warmup, result["failed"]):
+            try:
+                client.warm_up_chart(chart_id, dashboard_id)
+            except (requests.RequestException, RuntimeError, ValueError) as exc:
+                metrics.count(WARMED_CHARTS, result="failed")
+                result["failed"].append(f"chart {chart_id}: {exc}")
+                continue
+            metrics.count(WARMED_CHARTS, result="ok")
+            result["warmed"] += 1
+    return result
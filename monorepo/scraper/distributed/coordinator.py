@@ -0,0 +1,80 @@
+"""
+Coordinator side of a distributed crawl.
+
+Runs link extraction for each pipeline (through its existing ``LinkExtractor``)
+and enqueues the resulting links for workers to download, parse and upload.
+
+Usage:
+    SCRAPER_QUEUE_URL=sqlite:///scraper_queue.db python -m distributed.coordinator [pipeline ...]
+"""
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from abstractions.scraping_pipeline import ScrapingPipeline
+from distributed.link_queue import LinkQueue, open_link_queue
+from observability import metrics
+from observability.log import get_logger
+
+DEFAULT_QUEUE_URL = "sqlite:///scraper_queue.db"
+
+_log = get_logger(__name__)
+
+
+class Coordinator:
+    """Lists files for a set of pipelines and enqueues them as one run."""
+
+    def __init__(self, pipelines: Dict[str, ScrapingPipeline], queue: LinkQueue):
+        self.pipelines = pipelines
+        self.queue = queue
+
+    def enqueue_run(
+        self,
+        pipeline_names: Optional[List[str]] = None,
+        time_back: Optional[timedelta] = None,
+        max_links: Optional[int] = None,
+        run_id: Optional[str] = None,
+    ) -> str:
+        """
+        Enqueue links for the given pipelines (default: all) and return the run id.
+
+        Raises:
+            KeyError: If a pipeline name is not found
+        """
+        names = pipeline_names or list(self.pipelines)
+        missing = [name for name in names if name not in self.pipelines]
+        if missing:
+            raise KeyError(f"Pipeline(s) not found: {', '.join(missing)}")
+
+        run_id = run_id or f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{uuid.uuid4().hex[:8]}"
+        time_back = time_back or timedelta(days=120)
+
+        for name in names:
+            with metrics.pipeline_scope(name):
+                links = self.pipelines[name].list_files(time_back=time_back, max_links=max_links)
+            added = self.queue.enqueue(run_id, name, links)
+            # The queue now owns the links, so the listing can move past them.
+            self.pipelines[name].commit_files(links)
+            _log.info("links enqueued", extra={"pipeline": name, "added": added, "links": len(links), "run": run_id})
+
+        return run_id
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+    from bootstrapper import create_pipelines
+    from observability.log import configure_logging
+
+    load_dotenv(Path(__file__).parent.parent.parent.parent / ".env")
+    configure_logging()
+    queue = open_link_queue(os.environ.get("SCRAPER_QUEUE_URL", DEFAULT_QUEUE_URL))
+    coordinator = Coordinator(create_pipelines(), queue)
+    run_id = coordinator.enqueue_run(sys.argv[1:] or None)
+    _log.info("run enqueued", extra={"run": run_id, **queue.stats(run_id)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Durable lease-based queue of file links shared by a coordinator and workers.
+
+A coordinator enqueues the ``Link``s produced by each pipeline's link
+extractor; workers lease one link at a time, process it, then mark it done or
+failed. A lease that is not completed before it expires (worker crashed or
+lost connectivity) becomes available again, giving at-least-once processing.
+Links that fail ``max_attempts`` times are parked in the ``failed`` state,
+including links whose lease expired on their final attempt: those are marked
+failed when the next lease is taken, or by ``expire_leases``/``stats``.
+
+Two backends share the same SQL:
+
+- ``SQLiteLinkQueue``: a local file, for tests and single-host runs
+- ``PostgresLinkQueue``: for several hosts; needs the optional ``psycopg``
+  dependency (``pip install "scraper[postgres]"``)
+
+Use ``open_link_queue("sqlite:///path.db")`` or ``open_link_queue("postgresql://...")``.
+"""
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence, TypedDict
+
+from abstractions.link_extractor import Link
+
+DEFAULT_MAX_ATTEMPTS = 5
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS scraper_link_queue (
+    id {id_type},
+    run_id TEXT NOT NULL,
+    pipeline_name TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    link TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires_at DOUBLE PRECISION,
+    last_error TEXT,
+    enqueued_at DOUBLE PRECISION NOT NULL,
+    updated_at DOUBLE PRECISION NOT NULL,
+    UNIQUE (run_id, pipeline_name, file_name)
+)
+"""
+_CREATE_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_scraper_link_queue_status
+    ON scraper_link_queue (status, lease_expires_at)
+"""
+
+
+class LeasedLink(TypedDict):
+    """A link currently leased by a worker."""
+    id: int
+    run_id: str
+    pipeline_name: str
+    link: Link
+    attempts: int
+
+
+class LinkQueue(ABC):
+    """Backend-independent queue operations; subclasses provide connections and locking."""
+
+    placeholder = "?"
+
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+
+    @abstractmethod
+    def _execute(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        """Run one statement in its own transaction and return any fetched rows."""
+
+    @abstractmethod
+    def _lease_one(self, worker_id: str, lease_seconds: float, pipelines: Optional[Sequence[str]]) -> Optional[tuple]:
+        """Atomically claim one available row and return it."""
+
+    def _sql(self, sql: str) -> str:
+        return sql.replace("?", self.placeholder)
+
+    def enqueue(self, run_id: str, pipeline_name: str, links: List[Link]) -> int:
+        """Add links for a run; links already enqueued for the same run are ignored."""
+        now = time.time()
+        added = 0
+        for link in links:
+            rows = self._execute(
+                self._sql(
+                    "INSERT INTO scraper_link_queue "
+                    "(run_id, pipeline_name, file_name, link, enqueued_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (run_id, pipeline_name, file_name) DO NOTHING RETURNING id"
+                ),
+                (run_id, pipeline_name, link["file_name"], json.dumps(link, ensure_ascii=False), now, now),
+            )
+            added += len(rows)
+        return added
+
+    def lease(
+        self,
+        worker_id: str,
+        lease_seconds: float,
+        pipelines: Optional[Sequence[str]] = None,
+    ) -> Optional[LeasedLink]:
+        """Claim the oldest pending (or lease-expired) link, optionally restricted to some pipelines."""
+        row = self._lease_one(worker_id, lease_seconds, pipelines)
+        if row is None:
+            return None
+        row_id, run_id, pipeline_name, link, attempts = row
+        return LeasedLink(
+            id=row_id,
+            run_id=run_id,
+            pipeline_name=pipeline_name,
+            link=json.loads(link),
+            attempts=attempts,
+        )
+
+    def _lease_candidates_sql(self, pipelines: Optional[Sequence[str]]) -> str:
+        sql = (
+            "SELECT id FROM scraper_link_queue "
+            "WHERE attempts < ? AND (status = 'pending' OR (status = 'leased' AND lease_expires_at < ?))"
+        )
+        if pipelines:
+            sql += f" AND pipeline_name IN ({', '.join('?' for _ in pipelines)})"
+        return sql + " ORDER BY id LIMIT 1"
+
+    def _expire_sql(self) -> str:
+        """Park links whose lease expired on their final attempt; they will never be leased again."""
+        return (
+            "UPDATE scraper_link_queue SET status = 'failed', lease_owner = NULL, "
+            "lease_expires_at = NULL, last_error = 'lease expired on the final attempt', updated_at = ? "
+            "WHERE status = 'leased' AND lease_expires_at < ? AND attempts >= ?"
+        )
+
+    def _claim_sql(self) -> str:
+        return (
+            "UPDATE scraper_link_queue SET status = 'leased', lease_owner = ?, "
+            "lease_expires_at = ?, attempts = attempts + 1, updated_at = ? "
+            "WHERE id = ? RETURNING id, run_id, pipeline_name, link, attempts"
+        )
+
+    def extend_lease(self, item_id: int, worker_id: str, lease_seconds: float) -> bool:
+        """Push the lease deadline forward; False if the lease was lost to another worker."""
+        now = time.time()
+        rows = self._execute(
+            self._sql(
+                "UPDATE scraper_link_queue SET lease_expires_at = ?, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'leased' RETURNING id"
+            ),
+            (now + lease_seconds, now, item_id, worker_id),
+        )
+        return bool(rows)
+
+    def complete(self, item_id: int, worker_id: str) -> bool:
+        """Mark a leased link as done."""
+        rows = self._execute(
+            self._sql(
+                "UPDATE scraper_link_queue SET status = 'done', lease_owner = NULL, "
+                "lease_expires_at = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? RETURNING id"
+            ),
+            (time.time(), item_id, worker_id),
+        )
+        return bool(rows)
+
+    def fail(self, item_id: int, worker_id: str, error: str) -> bool:
+        """Release a leased link for retry, or park it as failed once attempts are exhausted."""
+        rows = self._execute(
+            self._sql(
+                "UPDATE scraper_link_queue SET "
+                "status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "lease_owner = NULL, lease_expires_at = NULL, last_error = ?, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? RETURNING id"
+            ),
+            (self.max_attempts, error[:2000], time.time(), item_id, worker_id),
+        )
+        return bool(rows)
+
+    def expire_leases(self) -> int:
+        """Mark links whose lease expired with no attempts left as failed; returns how many."""
+        now = time.time()
+        rows = self._execute(self._sql(self._expire_sql() + " RETURNING id"), (now, now, self.max_attempts))
+        return len(rows)
+
+    def stats(self, run_id: Optional[str] = None) -> Dict[str, int]:
+        """Count links per status, optionally for one run (after expiring abandoned final leases)."""
+        self.expire_leases()
+        sql = "SELECT status, COUNT(*) FROM scraper_link_queue"
+        params: tuple = ()
+        if run_id is not None:
+            sql += " WHERE run_id = ?"
+            params = (run_id,)
+        rows = self._execute(self._sql(sql + " GROUP BY status"), params)
+        return {status: count for status, count in rows}
+
+
+class SQLiteLinkQueue(LinkQueue):
+    """Link queue stored in a local SQLite file (WAL mode, one connection per thread)."""
+
+    def __init__(self, path: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        super().__init__(max_attempts)
+        self.path = path
+        self._local = threading.local()
+        self._execute(_CREATE_TABLE.format(id_type="INTEGER PRIMARY KEY AUTOINCREMENT"))
+        self._execute(_CREATE_INDEX)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _execute(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(sql, params).fetchall()
+            conn.execute("COMMIT")
+            return rows
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _lease_one(self, worker_id, lease_seconds, pipelines):
+        now = time.time()
+        conn = self._connection()
+        # BEGIN IMMEDIATE takes the write lock up front, so select + claim is atomic across processes.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(self._expire_sql(), (now, now, self.max_attempts))
+            candidate = conn.execute(
+                self._lease_candidates_sql(pipelines),
+                (self.max_attempts, now, *(pipelines or ())),
+            ).fetchone()
+            row = None
+            if candidate is not None:
+                row = conn.execute(
+                    self._claim_sql(), (worker_id, now + lease_seconds, now, candidate[0])
+                ).fetchone()
+            conn.execute("COMMIT")
+            return row
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class PostgresLinkQueue(LinkQueue):
+    """Link queue in Postgres; concurrent workers claim rows with FOR UPDATE SKIP LOCKED."""
+
+    placeholder = "%s"
+
+    def __init__(self, dsn: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        try:
+            import psycopg
+        except ImportError as exc:
+            raise ImportError(
+                "PostgresLinkQueue requires psycopg; install with `pip install \"scraper[postgres]\"`"
+            ) from exc
+        super().__init__(max_attempts)
+        self._psycopg = psycopg
+        self.dsn = dsn
+        self._local = threading.local()
+        self._execute(_CREATE_TABLE.format(id_type="BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY"))
+        self._execute(_CREATE_INDEX)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or conn.closed:
+            conn = self._psycopg.connect(self.dsn)
+            self._local.conn = conn
+        return conn
+
+    def _execute(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        conn = self._connection()
+        with conn.transaction():
+            cursor = conn.execute(sql, params)
+            return cursor.fetchall() if cursor.description else []
+
+    def _lease_one(self, worker_id, lease_seconds, pipelines):
+        now = time.time()
+        conn = self._connection()
+        select_sql = self._sql(self._lease_candidates_sql(pipelines)) + " FOR UPDATE SKIP LOCKED"
+        with conn.transaction():
+            conn.execute(self._sql(self._expire_sql()), (now, now, self.max_attempts))
+            candidate = conn.execute(select_sql, (self.max_attempts, now, *(pipelines or ()))).fetchone()
+            if candidate is None:
+                return None
+            return conn.execute(
+                self._sql(self._claim_sql()), (worker_id, now + lease_seconds, now, candidate[0])
+            ).fetchone()
+
+
+def open_link_queue(url: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> LinkQueue:
+    """Open a queue from ``sqlite:///<path>`` or ``postgresql://...`` URLs."""
+    if url.startswith("sqlite:///"):
+        return SQLiteLinkQueue(url[len("sqlite:///"):], max_attempts=max_attempts)
+    if url.startswith(("postgresql://", "postgres://")):
+        return PostgresLinkQueue(url, max_attempts=max_attempts)
+    raise ValueError(f"Unsupported queue URL: {url}")
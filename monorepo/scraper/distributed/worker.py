@@ -0,0 +1,142 @@
+"""
+Worker side of a distributed crawl.
+
+Leases links from the shared queue, downloads and parses them through the
+owning pipeline, and processes and uploads the records with ``PipelineRunner``
+(store coordinates, typed columns and local indexes as in a local run). The lease is
+renewed from a heartbeat thread while a file is being processed; if the worker
+dies, the lease expires and another worker picks the link up again.
+
+Usage:
+    SCRAPER_QUEUE_URL=sqlite:///scraper_queue.db python -m distributed.worker
+"""
+import os
+import socket
+import threading
+import uuid
+from pathlib import Path
+from typing import Optional, Sequence
+
+from distributed.link_queue import LeasedLink, LinkQueue, open_link_queue
+from observability import metrics
+from observability.log import get_logger
+from pipeline_runner import DEFAULT_UPLOAD_BATCH_SIZE, PipelineRunner
+
+DEFAULT_QUEUE_URL = "sqlite:///scraper_queue.db"
+DEFAULT_LEASE_SECONDS = 600.0
+DEFAULT_IDLE_SECONDS = 5.0
+
+_log = get_logger(__name__)
+
+
+class Worker:
+    """Processes leased links until stopped (or until the queue is drained)."""
+
+    def __init__(
+        self,
+        runner: PipelineRunner,
+        queue: LinkQueue,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        pipelines: Optional[Sequence[str]] = None,
+        create_bucket: bool = True,
+        batch_size: int = DEFAULT_UPLOAD_BATCH_SIZE,
+    ):
+        self.runner = runner
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.pipelines = list(pipelines) if pipelines else list(runner.pipelines)
+        missing = [name for name in self.pipelines if name not in runner.pipelines]
+        if missing:
+            raise KeyError(f"Pipeline(s) not found: {', '.join(missing)}")
+        self.create_bucket = create_bucket
+        self.batch_size = batch_size
+
+    def _heartbeat(self, item: LeasedLink, done: threading.Event) -> None:
+        while not done.wait(self.lease_seconds / 3):
+            if not self.queue.extend_lease(item["id"], self.worker_id, self.lease_seconds):
+                _log.warning("lost lease", extra={"worker": self.worker_id, "file": item["link"]["file_name"]})
+                return
+
+    def process(self, item: LeasedLink) -> bool:
+        """Download, parse and upload one leased link, then complete or fail it."""
+        name = item["pipeline_name"]
+        file_name = item["link"]["file_name"]
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(item, done), daemon=True)
+        heartbeat.start()
+        try:
+            with metrics.pipeline_scope(name):
+                extracted = self.runner.pipelines[name].extract_file(item["link"])
+                if extracted is None:
+                    raise RuntimeError("download failed")
+                if not self.runner.process_extracted_file(
+                    name, extracted, create_bucket=self.create_bucket, batch_size=self.batch_size
+                ):
+                    raise RuntimeError("upload failed")
+        except Exception as exc:
+            done.set()
+            self.queue.fail(item["id"], self.worker_id, str(exc))
+            _log.warning(
+                "link failed",
+                extra={
+                    "worker": self.worker_id,
+                    "pipeline": name,
+                    "file": file_name,
+                    "attempt": item["attempts"],
+                    "error": str(exc),
+                },
+            )
+            return False
+        done.set()
+        self.queue.complete(item["id"], self.worker_id)
+        return True
+
+    def run(
+        self,
+        stop_event: Optional[threading.Event] = None,
+        drain: bool = False,
+        idle_seconds: float = DEFAULT_IDLE_SECONDS,
+    ) -> int:
+        """
+        Lease and process links until ``stop_event`` is set.
+
+        Args:
+            stop_event: Event used to stop the loop from another thread
+            drain: Return as soon as no link is available instead of polling
+            idle_seconds: Poll interval while the queue is empty
+
+        Returns:
+            Number of links processed successfully
+        """
+        stop_event = stop_event or threading.Event()
+        processed = 0
+        while not stop_event.is_set():
+            item = self.queue.lease(self.worker_id, self.lease_seconds, self.pipelines)
+            if item is None:
+                if drain:
+                    break
+                stop_event.wait(idle_seconds)
+                continue
+            processed += self.process(item)
+        return processed
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+    from bootstrapper import create_runner
+    from observability.log import configure_logging
+
+    load_dotenv(Path(__file__).parent.parent.parent.parent / ".env")
+    configure_logging()
+    queue = open_link_queue(os.environ.get("SCRAPER_QUEUE_URL", DEFAULT_QUEUE_URL))
+    worker = Worker(create_runner(), queue)
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        _log.info("stopping", extra={"worker": worker.worker_id})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+"""
+Direct bulk loader for price files into Postgres, bypassing the HTTP uploader.
+
+The uploader turns every batch of 20 records into several Drizzle inserts.
+For multi-month backfills this loader writes a whole price file per
+transaction instead:
+
+1. insert the file's ``data_sources`` row
+2. stream the mapped rows into a temporary staging table with ``COPY FROM STDIN``
+3. resolve chains, stores and existing ``product_identifiers`` with joins
+4. insert products and identifiers for new (ItemCode, chain, store) keys,
+   then every ``price_events`` row, then upsert ``latest_prices`` and
+   ``product_specs``
+
+Records are mapped with the same rules as the uploader's price mappers
+(``monorepo/uploader/src/upload/mappers/*/prices``): records missing
+ItemName, ItemCode, ChainId, StoreId or ItemPrice are skipped, StoreId is
+normalized like ``getNumberAsStringField``, and a missing chain or store
+fails the file ("upload stores first"). Unlike the uploader, raw records are
+not copied to object storage.
+
+Each thread loads over its own connection (with its own session-scoped
+staging table), so pipelines running in parallel never share a transaction.
+
+Needs the optional ``psycopg`` dependency (``pip install "scraper[postgres]"``).
+"""
+import json
+import re
+import threading
+from decimal import Decimal
+from typing import Dict, List, Optional, TypedDict
+
+from abstractions.scraping_pipeline import ExtractedFile
+from observability import metrics
+
+BULK_LOADED_ROWS = metrics.REGISTRY.counter(
+    "scraper_bulk_loaded_rows_total",
+    "Rows written by the direct Postgres loader, by table.",
+    ("pipeline", "table"),
+)
+BULK_SKIPPED_RECORDS = metrics.REGISTRY.counter(
+    "scraper_bulk_skipped_records_total",
+    "Price records skipped by the direct Postgres loader for missing required fields.",
+)
+
+# Same spec attributes as the uploader mappers' buildSpecAttributes.
+SPEC_ATTRIBUTES = (
+    ("ManufacturerName", "manufacturer_name"),
+    ("ManufactureCountry", "manufacture_country"),
+    ("ItemType", "item_type"),
+    ("UnitQty", "unit_qty_description"),
+    ("QtyInPackage", "qty_in_package"),
+)
+
+STAGING_COLUMNS = (
+    "ord", "chain_external_id", "store_external_id", "item_code", "item_name", "description",
+    "price", "unit_price", "published_at", "is_weighted", "base_quantity", "base_unit", "attributes",
+)
+
+_CREATE_STAGING = """
+CREATE TEMP TABLE IF NOT EXISTS staging_price_rows (
+    ord INTEGER NOT NULL,
+    chain_external_id TEXT NOT NULL,
+    store_external_id TEXT NOT NULL,
+    item_code TEXT NOT NULL,
+    item_name TEXT NOT NULL,
+    description TEXT NOT NULL,
+    price TEXT NOT NULL,
+    unit_price TEXT,
+    published_at TEXT,
+    is_weighted BOOLEAN NOT NULL,
+    base_quantity TEXT,
+    base_unit TEXT,
+    attributes JSONB NOT NULL,
+    chain_id INTEGER,
+    store_id INTEGER,
+    product_id INTEGER
+) ON COMMIT DELETE ROWS
+"""
+
+_INSERT_DATA_SOURCE = """
+INSERT INTO data_sources (chain_id, file_name, source_url, file_type, published_at, scraped_at)
+SELECT id, %s, %s, 'prices', %s::timestamptz, COALESCE(%s::timestamptz, NOW())
+FROM chains WHERE external_id = %s
+RETURNING id
+"""
+
+_RESOLVE_CHAINS = """
+UPDATE staging_price_rows s SET chain_id = c.id
+FROM chains c WHERE c.external_id = s.chain_external_id
+"""
+
+_RESOLVE_STORES = """
+UPDATE staging_price_rows s SET store_id = st.id
+FROM stores st WHERE st.chain_id = s.chain_id AND st.store_external_id = s.store_external_id
+"""
+
+_MISSING_CHAIN = """
+SELECT chain_external_id FROM staging_price_rows WHERE chain_id IS NULL LIMIT 1
+"""
+
+_MISSING_STORE = """
+SELECT chain_external_id, store_external_id FROM staging_price_rows WHERE store_id IS NULL LIMIT 1
+"""
+
+# Ids are drawn from the products sequence up front, so the new products and
+# their identifiers can be inserted set-based without matching RETURNING rows.
+# The first record of each new key names the product, like the uploader's batch insert.
+_STAGE_NEW_PRODUCTS = """
+CREATE TEMP TABLE staging_new_products ON COMMIT DROP AS
+SELECT nextval(pg_get_serial_sequence('products', 'id'))::INTEGER AS product_id, new_keys.*
+FROM (
+    SELECT DISTINCT ON (item_code, chain_id, store_id)
+        item_code, chain_id, store_id, item_name, description
+    FROM staging_price_rows s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM product_identifiers pi
+        WHERE pi.external_code = s.item_code AND pi.chain_id = s.chain_id AND pi.store_id = s.store_id
+    )
+    ORDER BY item_code, chain_id, store_id, ord
+) new_keys
+"""
+
+_INSERT_PRODUCTS = """
+INSERT INTO products (id, canonical_name)
+SELECT product_id, item_name FROM staging_new_products
+"""
+
+_INSERT_IDENTIFIERS = """
+INSERT INTO product_identifiers (product_id, chain_id, store_id, description, external_code)
+SELECT product_id, chain_id, store_id, description, item_code FROM staging_new_products
+"""
+
+_RESOLVE_PRODUCTS = """
+UPDATE staging_price_rows s SET product_id = pi.product_id
+FROM product_identifiers pi
+WHERE pi.external_code = s.item_code AND pi.chain_id = s.chain_id AND pi.store_id = s.store_id
+"""
+
+_INSERT_PRICE_EVENTS = """
+INSERT INTO price_events (product_id, store_id, source_id, price, unit_price, published_at)
+SELECT product_id, store_id, %s, price::NUMERIC, NULLIF(unit_price, '')::NUMERIC,
+       NULLIF(published_at, '')::timestamptz
+FROM staging_price_rows
+ORDER BY ord
+"""
+
+# Same rule as the uploader repository: newest published_at wins, a missing one counts as now.
+_UPSERT_LATEST_PRICES = """
+INSERT INTO latest_prices (product_id, store_id, source_id, price, unit_price, published_at)
+SELECT DISTINCT ON (product_id, store_id)
+    product_id, store_id, %s, price::NUMERIC, NULLIF(unit_price, '')::NUMERIC,
+    NULLIF(published_at, '')::timestamptz
+FROM staging_price_rows
+ORDER BY product_id, store_id, COALESCE(NULLIF(published_at, '')::timestamptz, NOW()) DESC, ord DESC
+ON CONFLICT (product_id, store_id) DO UPDATE SET
+    source_id = excluded.source_id,
+    price = excluded.price,
+    unit_price = excluded.unit_price,
+    published_at = excluded.published_at,
+    scraped_at = excluded.scraped_at
+WHERE COALESCE(excluded.published_at, excluded.scraped_at)
+    >= COALESCE(latest_prices.published_at, latest_prices.scraped_at)
+"""
+
+# A product can appear more than once in a file; the last record's spec wins.
+_UPSERT_PRODUCT_SPECS = """
+INSERT INTO product_specs (product_id, is_weighted, base_quantity, base_unit, attributes)
+SELECT DISTINCT ON (product_id)
+    product_id, is_weighted, NULLIF(base_quantity, '')::NUMERIC, base_unit, attributes
+FROM staging_price_rows
+ORDER BY product_id, ord DESC
+ON CONFLICT (product_id) DO UPDATE SET
+    is_weighted = excluded.is_weighted,
+    base_quantity = excluded.base_quantity,
+    base_unit = excluded.base_unit,
+    attributes = excluded.attributes,
+    updated_at = NOW()
+"""
+
+
+class LoadError(Exception):
+    """A price file could not be loaded (e.g. its chain or a store is not in the database)."""
+
+
+class LoadResult(TypedDict):
+    """Outcome of loading one price file."""
+    source_id: Optional[int]
+    rows: int              # price_events inserted
+    skipped: int           # records missing required fields
+    new_products: int
+
+
+# JavaScript's StringNumericLiteral: decimal (ASCII digits only) or 0x / 0o / 0b integers.
+_JS_DECIMAL = re.compile(r"[+-]?(?:Infinity|(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?)")
+_JS_NON_DECIMAL = re.compile(r"0(?:[xX][0-9a-fA-F]+|[oO][0-7]+|[bB][01]+)")
+
+
+def _js_number_to_string(number: float) -> str:
+    """``Number.prototype.toString()`` for a finite number (shortest round-trip digits)."""
+    if number == 0:
+        return "0"
+    sign = "-" if number < 0 else ""
+    _, digit_tuple, exponent = Decimal(repr(abs(number))).normalize().as_tuple()
+    digits = "".join(map(str, digit_tuple))
+    k = len(digits)
+    n = exponent + k  # position of the decimal point relative to the digits
+    if k <= n <= 21:
+        return sign + digits + "0" * (n - k)
+    if 0 < n <= 21:
+        return sign + digits[:n] + "." + digits[n:]
+    if -6 < n <= 0:
+        return sign + "0." + "0" * -n + digits
+    mantissa = digits[0] + ("." + digits[1:] if k > 1 else "")
+    return f"{sign}{mantissa}e{'+' if n - 1 >= 0 else '-'}{abs(n - 1)}"
+
+
+def number_as_string(value: str) -> str:
+    """``String(Number(value))`` as in the uploader's ``getNumberAsStringField`` ("001" -> "1")."""
+    text = value.strip()
+    if not text:
+        return "0"
+    if _JS_NON_DECIMAL.fullmatch(text):
+        number = float(int(text, 0))
+    elif _JS_DECIMAL.fullmatch(text):
+        number = float(text.replace("Infinity", "inf"))
+    else:
+        return "NaN"
+    if number in (float("inf"), float("-inf")):
+        return "Infinity" if number > 0 else "-Infinity"
+    return _js_number_to_string(number)
+
+
+def _present(record: Dict[str, str], field: str) -> Optional[str]:
+    value = record.get(field)
+    return value if isinstance(value, str) else None
+
+
+def map_price_record(record: Dict[str, str], position: int) -> Optional[tuple]:
+    """Staging row for one parsed price record, or None if the uploader mappers would skip it."""
+    name = _present(record, "ItemName")
+    item_code = _present(record, "ItemCode")
+    chain_external_id = _present(record, "ChainId")
+    store_id = _present(record, "StoreId")
+    store_external_id = number_as_string(store_id) if store_id is not None else None
+    item_price = _present(record, "ItemPrice")
+    if not name or not item_code or not chain_external_id or not store_external_id or not item_price:
+        return None
+
+    description = _present(record, "ManufacturerItemDescription") or name
+    attributes = {}
+    for field, attribute in SPEC_ATTRIBUTES:
+        value = _present(record, field)
+        if value:
+            attributes[attribute] = [value]
+    return (
+        position,
+        chain_external_id,
+        store_external_id,
+        item_code,
+        name,
+        description,
+        item_price,
+        _present(record, "UnitOfMeasurePrice"),
+        _present(record, "PriceUpdateDate") or None,
+        _present(record, "bIsWeighted") == "1",
+        _present(record, "Quantity"),
+        _present(record, "UnitOfMeasure"),
+        json.dumps(attributes, ensure_ascii=False),
+    )
+
+
+class PostgresBulkLoader:
+    """Loads whole price files into Postgres with COPY and set-based merges."""
+
+    def __init__(self, dsn: str, time_zone: str = "Asia/Jerusalem"):
+        """
+        Args:
+            dsn: Postgres connection string
+            time_zone: Session time zone for PriceUpdateDate values without an offset
+                (the chains publish local times; matches ``databases/schema.sql``)
+        """
+        try:
+            import psycopg
+        except ImportError as exc:
+            raise ImportError(
+                "PostgresBulkLoader requires psycopg; install with `pip install \"scraper[postgres]\"`"
+            ) from exc
+        self._psycopg = psycopg
+        # What a single file's load may raise without the loader being unusable for the next file.
+        self.errors = (LoadError, psycopg.Error)
+        self.dsn = dsn
+        self.time_zone = time_zone
+        self._local = threading.local()
+        self._connections: list = []
+        self._connections_lock = threading.Lock()
+
+    def _connection(self):
+        """This thread's connection; the staging table is per session, so it is never shared."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or conn.closed:
+            conn = self._psycopg.connect(self.dsn)
+            with conn.transaction():
+                conn.execute("SELECT set_config('TimeZone', %s, false)", (self.time_zone,))
+                conn.execute(_CREATE_STAGING)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections = [known for known in self._connections if not known.closed]
+                self._connections.append(conn)
+        return conn
+
+    def close(self) -> None:
+        """Close the connections of every thread."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+
+    def __enter__(self) -> "PostgresBulkLoader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def load_prices(self, extracted_file: ExtractedFile) -> LoadResult:
+        """Load one parsed price file in a single transaction."""
+        records = extracted_file['records']
+        rows: List[tuple] = []
+        for position, record in enumerate(records):
+            row = map_price_record(record, position)
+            if row is not None:
+                rows.append(row)
+        skipped = len(records) - len(rows)
+        if skipped:
+            metrics.count(BULK_SKIPPED_RECORDS, skipped)
+        if not records:
+            return LoadResult(source_id=None, rows=0, skipped=0, new_products=0)
+
+        source = extracted_file['source']
+        # Like the uploader, the file's chain is taken from its first record.
+        chain_external_id = str(records[0].get("ChainId") or "")
+        conn = self._connection()
+        with conn.transaction():
+            source_row = conn.execute(
+                _INSERT_DATA_SOURCE,
+                (
+                    source["file_name"],
+                    source.get("source_url"),
+                    source.get("published_at") or None,
+                    source.get("scraped_at") or None,
+                    chain_external_id,
+                ),
+            ).fetchone()
+            if source_row is None:
+                raise LoadError(
+                    f"Chain not found for ChainId={chain_external_id}. "
+                    "Insert the chain before tracking data sources."
+                )
+            source_id = source_row[0]
+            if not rows:
+                return LoadResult(source_id=source_id, rows=0, skipped=skipped, new_products=0)
+
+            with conn.cursor() as cursor:
+                with cursor.copy(f"COPY staging_price_rows ({', '.join(STAGING_COLUMNS)}) FROM STDIN") as copy:
+                    for row in rows:
+                        copy.write_row(row)
+
+                cursor.execute(_RESOLVE_CHAINS)
+                cursor.execute(_RESOLVE_STORES)
+                missing = cursor.execute(_MISSING_CHAIN).fetchone()
+                if missing is not None:
+                    raise LoadError(
+                        f"Chain not found for ChainId={missing[0]}. "
+                        "Insert stores for this chain before uploading prices."
+                    )
+                missing = cursor.execute(_MISSING_STORE).fetchone()
+                if missing is not None:
+                    raise LoadError(
+                        f"Store not found for ChainId={missing[0]} and StoreId={missing[1]}. Upload stores first."
+                    )
+
+                cursor.execute(_STAGE_NEW_PRODUCTS)
+                new_products = cursor.rowcount
+                cursor.execute(_INSERT_PRODUCTS)
+                cursor.execute(_INSERT_IDENTIFIERS)
+                cursor.execute(_RESOLVE_PRODUCTS)
+                cursor.execute(_INSERT_PRICE_EVENTS, (source_id,))
+                price_events = cursor.rowcount
+                cursor.execute(_UPSERT_LATEST_PRICES, (source_id,))
+                cursor.execute(_UPSERT_PRODUCT_SPECS)
+
+        metrics.count(BULK_LOADED_ROWS, 1, table="data_sources")
+        metrics.count(BULK_LOADED_ROWS, new_products, table="products")
+        metrics.count(BULK_LOADED_ROWS, price_events, table="price_events")
+        return LoadResult(source_id=source_id, rows=price_events, skipped=skipped, new_products=new_products)
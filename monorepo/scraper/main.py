@@ -1,8 +1,8 @@
 from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
-from bootstrapper import create_pipelines
-from pipeline_runner import PipelineRunner
+from bootstrapper import create_runner
+from observability.log import configure_logging
 import urllib3
 
 # Load environment variables from root .env file
@@ -11,8 +11,22 @@ load_dotenv(Path(__file__).parent.parent.parent / ".env")
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 def main():
-    pipelines = create_pipelines()
-    runner = PipelineRunner(pipelines)
+    # Set SCRAPER_LOG_LEVEL (default INFO) and SCRAPER_LOG_FORMAT=json to change log output.
+    configure_logging()
+    # Set SCRAPER_METRICS_PORT to serve Prometheus metrics, SCRAPER_SUMMARY_DIR for JSON run summaries.
+    # Set SCRAPER_PROFILE_DIR to write CPU/allocation reports for this run.
+    # Set SCRAPER_MEMORY_BUDGET_MB to bound memory held by in-flight files.
+    # Set SCRAPER_GAZETTEER_PATH to add coordinates to stores records from a local gazetteer.
+    # Set SCRAPER_PARSE_PROCESSES to parse large price files across several processes.
+    # Set SCRAPER_SHUFERSAL_WATERMARKS to list only new Shufersal files per category/store.
+    # Set SCRAPER_ROLLUPS_DIR to keep daily price rollups per item, chain and city
+    # (also written to Postgres when SCRAPER_AGGREGATES_DSN is set).
+    # Set SCRAPER_SESSION_CACHE to reuse Cerberus logins across processes.
+    # Set SCRAPER_OUTBOX_PATH to queue uploads in a durable local outbox drained in the background.
+    # Set SCRAPER_BULK_LOAD_DSN to load price files straight into Postgres (backfills).
+    # Set SUPERSET_URL (and SUPERSET_WARMUP_CHARTS / SUPERSET_WARMUP_DASHBOARDS) to warm
+    # dashboard caches after price runs.
+    runner = create_runner()
 
     # parsed_records = runner.run_and_upload(
     #     pipeline_name="shufersal_stores",
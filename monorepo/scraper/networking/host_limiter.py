@@ -0,0 +1,172 @@
+"""
+Per-host rate and concurrency limits for chain servers.
+
+``LimitedHTTPAdapter`` is mounted on the shared ``requests.Session`` objects
+(Shufersal and Cerberus), so every request to a host, listings and downloads
+alike, first takes a token from the host's ``TokenBucket`` and then holds one
+of its concurrency slots until the body has been read (for streamed
+responses, until the response is closed). The number of slots is
+tuned per host by an ``AimdController`` from the observed responses, up to
+``max_connections``; the live limits are exported as the
+``scraper_host_concurrency_limit`` gauge and via ``HostLimiter.limits()``.
+"""
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from networking.rate_limiter import AimdController, TokenBucket
+from observability import metrics
+from orchestration.budgets import Budget
+
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 16
+DEFAULT_INITIAL_CONNECTIONS_PER_HOST = 2
+DEFAULT_REQUESTS_PER_SECOND = 10.0
+
+HOST_CONCURRENCY_LIMIT = metrics.REGISTRY.gauge(
+    "scraper_host_concurrency_limit",
+    "Current adaptive concurrency limit per chain host.",
+    ("host",),
+)
+
+
+class HostState:
+    """Rate limiter, concurrency budget and AIMD controller for one host."""
+
+    def __init__(self, host: str, max_connections: int, requests_per_second: Optional[float]):
+        self.host = host
+        self.bucket = TokenBucket(requests_per_second, burst=requests_per_second or 1.0)
+        self.budget = Budget()
+        self.controller = AimdController(
+            self.budget,
+            initial_limit=DEFAULT_INITIAL_CONNECTIONS_PER_HOST,
+            max_limit=max_connections,
+            on_change=lambda limit: HOST_CONCURRENCY_LIMIT.set(limit, host=host),
+        )
+
+
+class HostLimiter:
+    """Creates a ``HostState`` per host on first use with the current defaults."""
+
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS_PER_HOST,
+        requests_per_second: Optional[float] = DEFAULT_REQUESTS_PER_SECOND,
+    ):
+        self._max_connections = max_connections
+        self._requests_per_second = requests_per_second
+        self._hosts: Dict[str, HostState] = {}
+        self._lock = threading.Lock()
+
+    def set_max_connections(self, limit: Optional[int]) -> None:
+        """Cap adaptive concurrency for every host (``None`` restores the default cap)."""
+        limit = limit or DEFAULT_MAX_CONNECTIONS_PER_HOST
+        with self._lock:
+            self._max_connections = limit
+            states = list(self._hosts.values())
+        for state in states:
+            state.controller.set_max_limit(limit)
+
+    def set_requests_per_second(self, rate: Optional[float]) -> None:
+        """Change the request rate for every host (``None`` disables rate limiting)."""
+        with self._lock:
+            self._requests_per_second = rate
+            states = list(self._hosts.values())
+        for state in states:
+            state.bucket.set_rate(rate, burst=rate or 1.0)
+
+    def host(self, host: str) -> HostState:
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = HostState(
+                    host, self._max_connections, self._requests_per_second
+                )
+            return state
+
+    def limits(self) -> Dict[str, int]:
+        """Current concurrency limit per host."""
+        with self._lock:
+            return {host: state.controller.limit for host, state in self._hosts.items()}
+
+
+HOST_LIMITER = HostLimiter()
+
+
+def _retry_after_seconds(response: requests.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class LimitedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that rate-limits and adaptively bounds concurrent requests per host."""
+
+    def __init__(self, limiter: HostLimiter = HOST_LIMITER, **kwargs):
+        self.limiter = limiter
+        super().__init__(**kwargs)
+
+    def send(self, request, stream=False, **kwargs):
+        state = self.limiter.host(urlsplit(request.url).netloc)
+        state.bucket.acquire()
+        state.budget.acquire()
+        release_on_close = False
+        try:
+            started = time.monotonic()
+            try:
+                response = super().send(request, stream=stream, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                state.controller.on_congestion()
+                raise
+
+            # Time to response headers: comparable across small listings and large downloads.
+            latency = time.monotonic() - started
+            if response.status_code == 429 or response.status_code >= 500:
+                state.controller.on_congestion()
+                retry_after = _retry_after_seconds(response)
+                if retry_after:
+                    state.bucket.pause(retry_after)
+            else:
+                state.controller.on_success(latency)
+
+            if stream:
+                # Streamed bodies are read by the caller; keep the slot until the response is closed.
+                response.close = _release_after(response.close, state.budget.release)
+                release_on_close = True
+            else:
+                # Read the body while holding the slot; Session.send would otherwise read it later.
+                try:
+                    response.content
+                except requests.RequestException:
+                    state.controller.on_congestion()
+                    raise
+            return response
+        finally:
+            if not release_on_close:
+                state.budget.release()
+
+
+def _release_after(close, release):
+    released = threading.Lock()
+
+    def close_and_release():
+        try:
+            close()
+        finally:
+            if released.acquire(blocking=False):
+                release()
+
+    return close_and_release
+
+
+def mount_host_limits(session: requests.Session, limiter: HostLimiter = HOST_LIMITER) -> requests.Session:
+    """Route all of ``session``'s HTTP(S) traffic through ``limiter``."""
+    adapter = LimitedHTTPAdapter(limiter)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -0,0 +1,122 @@
+"""
+Building blocks for polite, self-tuning access to chain servers.
+
+- ``TokenBucket`` caps the request rate to a host (with bursts), and can be
+  paused when a server answers 429 with ``Retry-After``.
+- ``AimdController`` drives a host's concurrency ``Budget``: the limit grows by
+  one after a full window of healthy responses (latency within
+  ``latency_tolerance`` of the best seen) and is halved on 429, 5xx or
+  timeouts, at most once per ``cooldown`` so a single burst of failures does
+  not collapse it to the minimum.
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+from orchestration.budgets import Budget
+
+
+class TokenBucket:
+    """Blocking token bucket; ``rate=None`` disables rate limiting."""
+
+    def __init__(self, rate: Optional[float], burst: float = 1.0):
+        self._rate = rate
+        self._burst = max(burst, 1.0)
+        self._tokens = self._burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate: Optional[float], burst: Optional[float] = None) -> None:
+        with self._lock:
+            self._rate = rate
+            if burst is not None:
+                self._burst = max(burst, 1.0)
+                self._tokens = min(self._tokens, self._burst)
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the next ``seconds`` (e.g. from a Retry-After header)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._rate is None:
+                    return
+                else:
+                    self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)
+
+
+class AimdController:
+    """Additive-increase / multiplicative-decrease control of a concurrency ``Budget``."""
+
+    def __init__(
+        self,
+        budget: Budget,
+        initial_limit: int = 2,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        latency_tolerance: float = 2.0,
+        cooldown: float = 1.0,
+        on_change: Optional[Callable[[int], None]] = None,
+    ):
+        self.budget = budget
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self._on_change = on_change
+        self._limit = max(min_limit, min(initial_limit, max_limit))
+        self._successes = 0
+        self._best_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self._apply(self._limit)
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    def _apply(self, limit: int) -> None:
+        self._limit = limit
+        self.budget.set_limit(limit)
+        if self._on_change is not None:
+            self._on_change(limit)
+
+    def set_max_limit(self, max_limit: int) -> None:
+        with self._lock:
+            self.max_limit = max(max_limit, self.min_limit)
+            if self._limit > self.max_limit:
+                self._apply(self.max_limit)
+
+    def on_success(self, latency: float) -> None:
+        with self._lock:
+            if self._best_latency is None or latency < self._best_latency:
+                self._best_latency = latency
+            if latency > self._best_latency * self.latency_tolerance:
+                # Slower than usual: hold the limit but don't grow it.
+                self._successes = 0
+                return
+            self._successes += 1
+            if self._successes >= self._limit and self._limit < self.max_limit:
+                self._successes = 0
+                self._apply(self._limit + 1)
+
+    def on_congestion(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._successes = 0
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self._apply(max(self.min_limit, self._limit // 2))
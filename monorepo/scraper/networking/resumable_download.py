@@ -0,0 +1,266 @@
+"""
+Streaming downloads that survive dropped connections.
+
+Files are streamed into a ``.part`` checkpoint file under the download
+directory. If the transfer fails part-way, the next attempt asks for the
+remainder with an HTTP ``Range`` request; servers that ignore ranges simply
+restart from zero. A download is accepted only when its size matches the
+size from the listing (or, failing that, the server's Content-Length /
+Content-Range), and each file gets a bounded number of attempts.
+
+Checkpoints are keyed by URL, so an interrupted process resumes where it left
+off on the next run. A resume is only attempted when the checkpoint recorded
+the response's ``ETag`` (strong) or ``Last-Modified``: the range request
+carries it as ``If-Range``, so a server whose file changed in the meantime
+sends the whole new file instead of the rest of the old one. A checkpoint
+without a validator is resumed only when the listing gave the file size. A
+partial response is appended only if its ``Content-Range`` starts at the
+checkpoint's size; otherwise the checkpoint is dropped and the whole file is
+requested again.
+
+Each checkpoint is held under an exclusive ``flock`` for the whole download.
+A second download of the same URL (another thread, process or a re-leased
+link) does not wait: it downloads into a private file of its own and does not
+resume.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Not POSIX: no shared checkpoints, every download gets a private file.
+    fcntl = None
+
+from observability import metrics
+
+DEFAULT_MAX_ATTEMPTS = 4
+DEFAULT_BACKOFF_SECONDS = 2.0
+CHUNK_SIZE = 64 * 1024
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+
+class DownloadError(Exception):
+    """Raised when a file could not be fully downloaded within its retry budget."""
+
+
+def download_dir() -> Path:
+    """Directory for partial downloads (``SCRAPER_DOWNLOAD_DIR``, default: system temp)."""
+    path = Path(os.environ.get("SCRAPER_DOWNLOAD_DIR") or Path(tempfile.gettempdir()) / "scraper-downloads")
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _expected_total(response: requests.Response, offset: int) -> Optional[int]:
+    if response.status_code == 206:
+        match = _CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+        if match and match.group(3) != "*":
+            return int(match.group(3))
+        return None
+    length = response.headers.get("Content-Length")
+    # Content-Length describes the encoded body; with Content-Encoding it is not the file size.
+    if length and length.isdigit() and not response.headers.get("Content-Encoding"):
+        return int(length)
+    return None
+
+
+def _range_start(response: requests.Response) -> Optional[int]:
+    """First byte position of a 206 response's ``Content-Range``, or None if missing/malformed."""
+    match = _CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+    return int(match.group(1)) if match else None
+
+
+@contextmanager
+def _checkpoint(url: str) -> Iterator[Tuple[Path, bool]]:
+    """
+    Yield ``(part_path, shared)``: the URL's checkpoint while holding its lock, or a
+    private file (``shared`` False) if another download holds it.
+    """
+    directory = download_dir()
+    name = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    lock_handle = None
+    if fcntl is not None:
+        lock_handle = open(directory / f"{name}.lock", "a")
+        try:
+            fcntl.flock(lock_handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_handle.close()
+            lock_handle = None
+    if lock_handle is None:
+        descriptor, private = tempfile.mkstemp(prefix=f"{name}.", suffix=".part", dir=directory)
+        os.close(descriptor)
+        private_path = Path(private)
+        try:
+            yield private_path, False
+        finally:
+            private_path.unlink(missing_ok=True)
+            _validator_path(private_path).unlink(missing_ok=True)
+        return
+    try:
+        yield directory / f"{name}.part", True
+    finally:
+        # The lock file stays: unlinking it would let a waiting process lock a stale inode.
+        lock_handle.close()
+
+
+def _validator_path(part_path: Path) -> Path:
+    return part_path.with_name(part_path.name + ".json")
+
+
+def _response_validator(response: requests.Response) -> Optional[str]:
+    """Value for ``If-Range``: a strong ETag, else Last-Modified (weak ETags are not allowed)."""
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+def _read_validator(part_path: Path) -> Optional[str]:
+    try:
+        with _validator_path(part_path).open(encoding="utf-8") as handle:
+            return json.load(handle).get("if_range")
+    except (OSError, ValueError):
+        return None
+
+
+def _write_validator(part_path: Path, validator: Optional[str]) -> None:
+    path = _validator_path(part_path)
+    if validator is None:
+        path.unlink(missing_ok=True)
+        return
+    record: Dict[str, str] = {"if_range": validator}
+    path.write_text(json.dumps(record), encoding="utf-8")
+
+
+def download_with_resume(
+    session: requests.Session,
+    url: str,
+    expected_size: Optional[int] = None,
+    timeout: float = 120,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    backoff_seconds: float = DEFAULT_BACKOFF_SECONDS,
+    **request_kwargs,
+) -> bytes:
+    """
+    Download ``url`` through ``session``, resuming interrupted transfers.
+
+    Args:
+        session: Session to use (keeps cookies, pooling and host limits)
+        url: File URL
+        expected_size: Size in bytes from the file listing, if known
+        timeout: Connect/read timeout per attempt
+        max_attempts: Total attempts before giving up
+        backoff_seconds: Base of the exponential backoff between attempts
+        **request_kwargs: Extra arguments for ``session.get`` (e.g. ``verify``)
+
+    Returns:
+        The complete file contents
+
+    Raises:
+        DownloadError: If the file could not be downloaded completely
+        requests.HTTPError: On 4xx responses, which are not retried
+    """
+    with _checkpoint(url) as (part_path, _):
+        return _download(
+            session, part_path, url, expected_size, timeout, max_attempts, backoff_seconds, request_kwargs
+        )
+
+
+def _download(
+    session: requests.Session,
+    part_path: Path,
+    url: str,
+    expected_size: Optional[int],
+    timeout: float,
+    max_attempts: int,
+    backoff_seconds: float,
+    request_kwargs: dict,
+) -> bytes:
+    base_headers = dict(request_kwargs.pop("headers", None) or {})
+    last_error: Optional[BaseException] = None
+
+    for attempt in range(max_attempts):
+        if attempt:
+            metrics.count(metrics.RETRIES, stage="download")
+            time.sleep(backoff_seconds * (2 ** (attempt - 1)))
+
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        validator = _read_validator(part_path) if offset else None
+        if offset and (
+            (expected_size is not None and offset > expected_size)
+            or (expected_size is None and validator is None)
+        ):
+            # Too long, or nothing to tell whether the server still has the same file.
+            part_path.unlink()
+            offset = 0
+
+        headers = dict(base_headers)
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            if validator is not None:
+                headers["If-Range"] = validator
+
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout, **request_kwargs) as response:
+                if response.status_code == 416 and offset and offset == expected_size:
+                    break  # Already have the whole file from a previous run.
+                if response.status_code == 416:
+                    part_path.unlink(missing_ok=True)
+                    last_error = DownloadError(f"Range not satisfiable for {url} at offset {offset}")
+                    continue
+                if 400 <= response.status_code < 500:
+                    part_path.unlink(missing_ok=True)
+                response.raise_for_status()
+
+                mode = "ab"
+                if response.status_code != 206:
+                    # Server ignored the range, or If-Range found the file changed; start over.
+                    mode, offset = "wb", 0
+                    _write_validator(part_path, _response_validator(response))
+                elif _range_start(response) != offset:
+                    # A different range than requested (e.g. from a proxy) would corrupt the
+                    # checkpoint; drop it and ask for the whole file.
+                    part_path.unlink(missing_ok=True)
+                    _validator_path(part_path).unlink(missing_ok=True)
+                    last_error = DownloadError(
+                        f"Unexpected Content-Range {response.headers.get('Content-Range')!r} "
+                        f"for {url} at offset {offset}"
+                    )
+                    continue
+                total = expected_size or _expected_total(response, offset)
+
+                with open(part_path, mode) as handle:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        handle.write(chunk)
+        except requests.HTTPError as exc:
+            if exc.response is not None and 400 <= exc.response.status_code < 500:
+                raise
+            last_error = exc
+            continue
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as exc:
+            last_error = exc
+            continue
+
+        size = part_path.stat().st_size
+        if total is not None and size != total:
+            last_error = DownloadError(f"Incomplete download of {url}: {size}/{total} bytes")
+            if size > total:
+                part_path.unlink()
+            continue
+        break
+    else:
+        raise DownloadError(f"Giving up on {url} after {max_attempts} attempts: {last_error}") from last_error
+
+    data = part_path.read_bytes()
+    part_path.unlink()
+    _validator_path(part_path).unlink(missing_ok=True)
+    return data
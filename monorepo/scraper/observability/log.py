@@ -0,0 +1,219 @@
+"""
+Structured, non-blocking logging for the scraper.
+
+Modules log through ``get_logger(__name__)`` with a short message and the
+details as fields (``logger.info("page fetched", extra={"page": 3})``).
+``configure_logging`` routes every ``scraper.*`` logger through a
+``QueueHandler``: the calling thread only filters the record and puts it on a
+queue, and a single ``QueueListener`` thread formats and writes it, so
+concurrent pipelines never contend on stdout/stderr.
+
+Repeated messages are rate limited per key (the ``key`` field, or the logger
+name and message template): at most ``burst`` records per key are written in
+every ``interval`` seconds. The next record that gets through carries
+``suppressed=<n>``, and ``flush_suppressed`` (called on shutdown) queues one
+summary record per key that is still being suppressed, e.g.
+``unmapped key ... seen=4812``, behind the records already queued.
+
+Records are queued with their message merged but their exception intact, so
+the output formatter writes a traceback after the fields, not inside the message.
+
+A disabled level costs one ``isEnabledFor`` check: records below the level are
+never created, so nothing reaches the filter or the queue.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional, TextIO, Tuple
+
+ROOT_LOGGER = "scraper"
+DEFAULT_INTERVAL_SECONDS = 60.0
+DEFAULT_BURST = 5
+
+# Attributes every LogRecord has; anything else on a record came from ``extra``.
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["StructuredQueueHandler"] = None
+_rate_limit: Optional["RateLimitFilter"] = None
+_configure_lock = threading.Lock()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the ``scraper`` hierarchy (``get_logger(__name__)`` in modules)."""
+    return logging.getLogger(name if name.startswith(ROOT_LOGGER + ".") else f"{ROOT_LOGGER}.{name}")
+
+
+def _fields(record: logging.LogRecord) -> Dict[str, object]:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class LogfmtFormatter(logging.Formatter):
+    """``time level logger message key=value ...``"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        parts = [
+            time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + "Z",
+            record.levelname,
+            record.name,
+            record.getMessage(),
+        ]
+        for key, value in _fields(record).items():
+            text = str(value)
+            if not text or any(char in text for char in ' ="'):
+                text = json.dumps(text, ensure_ascii=False)
+            parts.append(f"{key}={text}")
+        line = " ".join(parts)
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        if record.stack_info:
+            line += "\n" + self.formatStack(record.stack_info)
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            payload["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """``QueueHandler`` that leaves ``exc_info`` and ``stack_info`` to the output formatter."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The base class folds the traceback into ``msg``, ahead of the fields.
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets at most ``burst`` records per key through in each ``interval``; counts the rest."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL_SECONDS, burst: int = DEFAULT_BURST):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self._lock = threading.Lock()
+        # key -> [window start, passed in window, suppressed since last pass, seen total, last record]
+        self._state: Dict[Tuple[str, str], list] = {}
+
+    @staticmethod
+    def _key(record: logging.LogRecord) -> Tuple[str, str]:
+        key = getattr(record, "key", None)
+        return (record.name, str(key) if key is not None else str(record.msg))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        now = time.monotonic()
+        key = self._key(record)
+        with self._lock:
+            state = self._state.get(key)
+            if state is None:
+                self._state[key] = [now, 1, 0, 1, record]
+                return True
+            state[3] += 1
+            state[4] = record
+            if now - state[0] >= self.interval:
+                state[0], state[1] = now, 0
+            if state[1] >= self.burst:
+                state[2] += 1
+                return False
+            state[1] += 1
+            if state[2]:
+                record.suppressed = state[2]
+                record.seen = state[3]
+                state[2] = 0
+            return True
+
+    def summaries(self) -> list:
+        """One record per key with suppressed repeats since its last written record."""
+        records = []
+        with self._lock:
+            for state in self._state.values():
+                if state[2]:
+                    last = state[4]
+                    summary = logging.makeLogRecord(vars(last))
+                    summary.suppressed = state[2]
+                    summary.seen = state[3]
+                    records.append(summary)
+                    state[2] = 0
+        return records
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    stream: Optional[TextIO] = None,
+    json_format: Optional[bool] = None,
+    interval: float = DEFAULT_INTERVAL_SECONDS,
+    burst: int = DEFAULT_BURST,
+) -> None:
+    """
+    Route ``scraper.*`` logs through a queue to ``stream`` (default: stderr).
+
+    ``level`` defaults to ``SCRAPER_LOG_LEVEL`` (INFO) and ``json_format`` to
+    ``SCRAPER_LOG_FORMAT=json``. Calling it again replaces the previous setup.
+    """
+    global _listener, _queue_handler, _rate_limit
+    with _configure_lock:
+        shutdown_logging()
+        level = level or os.environ.get("SCRAPER_LOG_LEVEL", "INFO")
+        if json_format is None:
+            json_format = os.environ.get("SCRAPER_LOG_FORMAT", "").lower() == "json"
+
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JsonFormatter() if json_format else LogfmtFormatter())
+        records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        _queue_handler = StructuredQueueHandler(records)
+        _rate_limit = RateLimitFilter(interval=interval, burst=burst)
+        _queue_handler.addFilter(_rate_limit)
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.handlers = [_queue_handler]
+        root.setLevel(level.upper())
+        root.propagate = False
+        _listener = logging.handlers.QueueListener(records, output)
+        _listener.start()
+
+
+def flush_suppressed() -> None:
+    """Queue the pending "seen N times" summaries of rate-limited messages behind earlier records."""
+    if _rate_limit is None or _queue_handler is None:
+        return
+    for record in _rate_limit.summaries():
+        # Bypasses the rate limit filter, which would count the summary as another repeat.
+        _queue_handler.enqueue(_queue_handler.prepare(record))
+
+
+def shutdown_logging() -> None:
+    """Queue summaries, drain the queue and stop the listener thread."""
+    global _listener, _queue_handler, _rate_limit
+    if _listener is not None:
+        flush_suppressed()
+        _listener.stop()
+    _listener = None
+    _queue_handler = None
+    _rate_limit = None
+
+
+atexit.register(shutdown_logging)
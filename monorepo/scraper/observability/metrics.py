@@ -0,0 +1,354 @@
+"""
+Per-stage metrics for scraping pipelines.
+
+Counters and latency histograms are labelled by pipeline (and stage where it
+applies) and can be rendered in the Prometheus text exposition format, served
+from an optional local HTTP endpoint, or summarised as JSON at the end of a run.
+
+The active pipeline label is carried in a context variable so that downloaders
+and parsers, which do not know which pipeline they belong to, can still record
+metrics against the right pipeline (including from ``asyncio.to_thread``).
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0,
+)
+
+_current_pipeline: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_pipeline", default="unknown"
+)
+
+# Set by observability.profiling.RunProfiler for the run it profiles (and the threads that run inherits).
+_stage_profiler: contextvars.ContextVar[Optional[object]] = contextvars.ContextVar(
+    "stage_profiler", default=None
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Monotonically increasing counter keyed by label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(labels[name] for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.snapshot().items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Gauge:
+    """Value that can go up and down, keyed by label values."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels: str) -> None:
+        key = tuple(labels[name] for name in self.label_names)
+        with self._lock:
+            self._values[key] = value
+
+    def snapshot(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        for key, value in sorted(self.snapshot().items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str],
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., sum, count]
+        self._values: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(labels[name] for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = state
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def snapshot(self) -> Dict[LabelValues, Tuple[float, float]]:
+        """Return ``(sum, count)`` per label set."""
+        with self._lock:
+            return {key: (state[-2], state[-1]) for key, state in self._values.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            cumulative = 0.0
+            for bound, bucket_count in zip(self.buckets, state):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {state[-1]}")
+            plain = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{plain} {state[-2]}")
+            lines.append(f"{self.name}_count{plain} {state[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds all metrics exposed by the scraper process."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ("pipeline",)) -> Counter:
+        metric = Counter(name, help_text, label_names)
+        self._metrics[name] = metric
+        return metric
+
+    def gauge(self, name: str, help_text: str, label_names: Sequence[str] = ("pipeline",)) -> Gauge:
+        metric = Gauge(name, help_text, label_names)
+        self._metrics[name] = metric
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = ("pipeline", "stage"),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, help_text, label_names, buckets)
+        self._metrics[name] = metric
+        return metric
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Dict[LabelValues, object]]:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "scraper_stage_duration_seconds",
+    "Latency of pipeline stages (listing, download, decompress, parse, group, upload).",
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "scraper_stage_errors_total",
+    "Number of stage executions that raised an exception.",
+    ("pipeline", "stage"),
+)
+DOWNLOADED_BYTES = REGISTRY.counter(
+    "scraper_downloaded_bytes_total", "Raw bytes received from chain servers."
+)
+DECOMPRESSED_BYTES = REGISTRY.counter(
+    "scraper_decompressed_bytes_total", "Bytes produced by decompressing downloaded files."
+)
+RECORDS_PARSED = REGISTRY.counter(
+    "scraper_records_parsed_total", "Records produced by parsers."
+)
+BATCHES_UPLOADED = REGISTRY.counter(
+    "scraper_batches_uploaded_total", "Record batches accepted by the uploader service."
+)
+RETRIES = REGISTRY.counter(
+    "scraper_retries_total", "Retried operations, by stage.", ("pipeline", "stage")
+)
+
+_COUNTERS_BY_PIPELINE = {
+    "downloaded_bytes": DOWNLOADED_BYTES,
+    "decompressed_bytes": DECOMPRESSED_BYTES,
+    "records_parsed": RECORDS_PARSED,
+    "batches_uploaded": BATCHES_UPLOADED,
+}
+
+
+def current_pipeline() -> str:
+    return _current_pipeline.get()
+
+
+@contextmanager
+def pipeline_scope(pipeline_name: str) -> Iterator[None]:
+    """Attribute all metrics recorded inside the block to ``pipeline_name``."""
+    token = _current_pipeline.set(pipeline_name)
+    try:
+        yield
+    finally:
+        _current_pipeline.reset(token)
+
+
+@contextmanager
+def profiler_scope(profiler) -> Iterator[None]:
+    """Wrap every stage run inside the block (in this context only) in ``profiler.profile_stage``."""
+    token = _stage_profiler.set(profiler)
+    try:
+        yield
+    finally:
+        _stage_profiler.reset(token)
+
+
+@contextmanager
+def stage(stage_name: str) -> Iterator[None]:
+    """Time a pipeline stage and record failures against the current pipeline."""
+    pipeline = _current_pipeline.get()
+    profiler = _stage_profiler.get()
+    started = time.perf_counter()
+    try:
+        if profiler is None:
+            yield
+        else:
+            with profiler.profile_stage(pipeline, stage_name):
+                yield
+    except BaseException:
+        STAGE_ERRORS.inc(pipeline=pipeline, stage=stage_name)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, pipeline=pipeline, stage=stage_name)
+
+
+def count(metric: Counter, amount: float = 1, **labels: str) -> None:
+    """Increment ``metric`` for the current pipeline."""
+    metric.inc(amount, pipeline=_current_pipeline.get(), **labels)
+
+
+def run_summary(
+    before: Dict[str, Dict[LabelValues, object]],
+    after: Dict[str, Dict[LabelValues, object]],
+) -> Dict[str, dict]:
+    """
+    Build a per-pipeline JSON-friendly summary of what changed between two snapshots.
+
+    Returns a mapping of pipeline name to counter totals and per-stage
+    ``{"calls", "total_seconds", "errors", "retries"}`` entries.
+    """
+    summary: Dict[str, dict] = {}
+
+    def pipeline_entry(name: str) -> dict:
+        return summary.setdefault(name, {"stages": {}, **{key: 0 for key in _COUNTERS_BY_PIPELINE}})
+
+    def stage_entry(name: str, stage_name: str) -> dict:
+        return pipeline_entry(name)["stages"].setdefault(
+            stage_name, {"calls": 0, "total_seconds": 0.0, "errors": 0, "retries": 0}
+        )
+
+    seconds_before = before.get(STAGE_SECONDS.name, {})
+    for (pipeline, stage_name), (total, calls) in after.get(STAGE_SECONDS.name, {}).items():
+        prev_total, prev_calls = seconds_before.get((pipeline, stage_name), (0.0, 0))
+        if calls - prev_calls:
+            entry = stage_entry(pipeline, stage_name)
+            entry["calls"] = int(calls - prev_calls)
+            entry["total_seconds"] = round(total - prev_total, 6)
+
+    for metric, field in ((STAGE_ERRORS, "errors"), (RETRIES, "retries")):
+        prev = before.get(metric.name, {})
+        for (pipeline, stage_name), value in after.get(metric.name, {}).items():
+            delta = value - prev.get((pipeline, stage_name), 0)
+            if delta:
+                stage_entry(pipeline, stage_name)[field] = int(delta)
+
+    for field, metric in _COUNTERS_BY_PIPELINE.items():
+        prev = before.get(metric.name, {})
+        for (pipeline,), value in after.get(metric.name, {}).items():
+            delta = value - prev.get((pipeline,), 0)
+            if delta:
+                pipeline_entry(pipeline)[field] = int(delta)
+
+    return summary
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self) -> None:  # noqa: N802 (http.server naming)
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # Scrapes every few seconds would otherwise flood stderr.
+        pass
+
+
+def start_metrics_server(
+    port: int,
+    host: str = "127.0.0.1",
+    registry: Optional[MetricsRegistry] = None,
+) -> ThreadingHTTPServer:
+    """Serve ``/metrics`` from a daemon thread; call ``shutdown()`` on the result to stop."""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry or REGISTRY})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
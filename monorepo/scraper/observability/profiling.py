@@ -0,0 +1,245 @@
+"""
+Opt-in CPU and allocation profiling for pipeline runs.
+
+While a ``RunProfiler`` is active, every ``metrics.stage(...)`` block runs
+under a cProfile profiler keyed by (pipeline, stage), and tracemalloc keeps a
+snapshot of the allocations at the highest memory watermark seen at a stage
+boundary. When the run finishes the profiler writes, into its run directory:
+
+- ``<pipeline>.<stage>.prof``: raw pstats dumps (snakeviz / ``python -m pstats``)
+- ``<pipeline>.txt``: all stages merged, then each stage, sorted by cumulative time
+- ``allocations.txt``: top allocation sites of the peak snapshot
+
+cProfile cannot nest profilers on one thread, so the per-pipeline profile is
+the merge of its stage profiles rather than a separate outer profile. When no
+profiler is active the only cost is a ``None`` check in ``metrics.stage``.
+
+The profiler is scoped to its run through a context variable (see
+``metrics.profiler_scope``), so concurrent runs each profile their own stages.
+From Python 3.12 only one cProfile profiler can be enabled per process: a
+stage that starts while another one is being profiled, or while an outside
+profiler is active, is timed as usual but not profiled, and is counted as
+skipped in the report.
+
+tracemalloc is process-wide too. Profilers share it: it is started by the
+first one (unless something else already traces) and stopped when the last
+one stops, so a run's peak is its own only if it started tracing itself. When
+runs overlap, or an outside tool was already tracing, the report marks the peak
+as process-wide.
+"""
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from observability import metrics
+
+DEFAULT_TOP_N = 60
+TRACEMALLOC_FRAMES = 10
+# Only re-snapshot when memory grew by this fraction over the last snapshot.
+SNAPSHOT_GROWTH_RATIO = 1.05
+# cProfile runs on sys.monitoring from 3.12, which admits a single profiler per process.
+_PROCESS_WIDE_PROFILER = sys.version_info >= (3, 12)
+_process_profiler_lock = threading.Lock()
+# Active profilers using tracemalloc, and whether they started it (so the last one stops it).
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users: Set["RunProfiler"] = set()
+_tracemalloc_owned = False
+
+
+def _acquire_tracemalloc(profiler: "RunProfiler") -> None:
+    """Start tracing for ``profiler``; every profiler it overlaps gets a process-wide peak."""
+    global _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users:
+            for user in (*_tracemalloc_users, profiler):
+                user._traced_alone = False
+        else:
+            # An outside tracer's peak is not ours to reset; the report calls it process-wide.
+            _tracemalloc_owned = not tracemalloc.is_tracing()
+            if _tracemalloc_owned:
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                tracemalloc.reset_peak()
+            profiler._traced_alone = _tracemalloc_owned
+        _tracemalloc_users.add(profiler)
+
+
+def _release_tracemalloc(profiler: "RunProfiler") -> None:
+    global _tracemalloc_owned
+    with _tracemalloc_lock:
+        _tracemalloc_users.discard(profiler)
+        if not _tracemalloc_users and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+
+
+class RunProfiler:
+    """Collects per-(pipeline, stage) CPU profiles and a peak allocation snapshot."""
+
+    def __init__(self, output_dir: str, run_name: str = "run", top_n: int = DEFAULT_TOP_N):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.run_dir = Path(output_dir) / f"{run_name}-{stamp}"
+        self.top_n = top_n
+        self._profiles: Dict[Tuple[str, str, int], cProfile.Profile] = {}
+        # (pipeline, stage) -> stages that ran unprofiled because a profiler was already active.
+        self._skipped: Dict[Tuple[str, str], int] = {}
+        self._scope = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._tracing = False
+        self._traced_alone = True
+        self._peak_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._peak_snapshot_bytes = 0
+        self._peak_label = ""
+        self._traced_peak = 0
+
+    def __enter__(self) -> "RunProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+        self.write_reports()
+
+    def start(self) -> None:
+        if not self._tracing:
+            self._tracing = True
+            _acquire_tracemalloc(self)
+        self._scope = metrics.profiler_scope(self)
+        self._scope.__enter__()
+
+    def stop(self) -> None:
+        if self._scope is not None:
+            self._scope.__exit__(None, None, None)
+            self._scope = None
+        if not self._tracing:
+            return
+        self._maybe_snapshot("end of run")
+        self._traced_peak = tracemalloc.get_traced_memory()[1]
+        self._tracing = False
+        _release_tracemalloc(self)
+
+    @contextmanager
+    def profile_stage(self, pipeline: str, stage: str) -> Iterator[None]:
+        """Profile the enclosed block unless this thread is already inside a profiled stage or the profiler is taken."""
+        if getattr(self._local, "active", False):
+            yield
+            return
+
+        if _PROCESS_WIDE_PROFILER and not _process_profiler_lock.acquire(blocking=False):
+            self._skip(pipeline, stage)
+            yield
+            return
+
+        try:
+            key = (pipeline, stage, threading.get_ident())
+            with self._lock:
+                profile = self._profiles.get(key)
+                if profile is None:
+                    profile = self._profiles[key] = cProfile.Profile()
+            try:
+                profile.enable()
+                enabled = True
+            except ValueError:
+                # Another profiling tool (a debugger, an outer cProfile) owns the process.
+                enabled = False
+            if not enabled:
+                self._skip(pipeline, stage)
+                yield
+                return
+
+            self._local.active = True
+            try:
+                yield
+            finally:
+                profile.disable()
+                self._local.active = False
+                self._maybe_snapshot(f"{pipeline}/{stage}")
+        finally:
+            if _PROCESS_WIDE_PROFILER:
+                _process_profiler_lock.release()
+
+    def _skip(self, pipeline: str, stage: str) -> None:
+        with self._lock:
+            self._skipped[(pipeline, stage)] = self._skipped.get((pipeline, stage), 0) + 1
+
+    def _maybe_snapshot(self, label: str) -> None:
+        if not tracemalloc.is_tracing():
+            return
+        current, _ = tracemalloc.get_traced_memory()
+        with self._lock:
+            if current <= self._peak_snapshot_bytes * SNAPSHOT_GROWTH_RATIO:
+                return
+            self._peak_snapshot_bytes = current
+            self._peak_label = label
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),)
+        )
+        with self._lock:
+            self._peak_snapshot = snapshot
+
+    def _stage_stats(self) -> Dict[str, Dict[str, pstats.Stats]]:
+        """Merge per-thread profiles into ``{pipeline: {stage: Stats}}``."""
+        merged: Dict[str, Dict[str, pstats.Stats]] = {}
+        with self._lock:
+            items = list(self._profiles.items())
+        for (pipeline, stage, _), profile in items:
+            stages = merged.setdefault(pipeline, {})
+            if stage in stages:
+                stages[stage].add(profile)
+            else:
+                stages[stage] = pstats.Stats(profile)
+        return merged
+
+    def _format_stats(self, stats: pstats.Stats, sort_key: str) -> str:
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats(sort_key).print_stats(self.top_n)
+        return stream.getvalue()
+
+    def write_reports(self) -> Path:
+        """Write CPU and allocation reports into ``run_dir`` and return it."""
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+
+        stage_stats = self._stage_stats()
+        for pipeline, _ in self._skipped:
+            stage_stats.setdefault(pipeline, {})
+        for pipeline, stages in stage_stats.items():
+            sections: List[str] = []
+            combined = pstats.Stats()
+            for stage, stats in sorted(stages.items()):
+                stats.dump_stats(str(self.run_dir / f"{pipeline}.{stage}.prof"))
+                combined.add(stats)
+                sections.append(f"== stage: {stage} (sorted by cumulative time) ==\n")
+                sections.append(self._format_stats(stats, "cumulative"))
+
+            header = "== all stages (sorted by cumulative time) ==\n" + self._format_stats(combined, "cumulative")
+            skipped = sorted((stage, calls) for (name, stage), calls in self._skipped.items() if name == pipeline)
+            if skipped:
+                header = (
+                    "== not profiled (another stage held the profiler) ==\n"
+                    + "".join(f"{stage}: {calls} call(s)\n" for stage, calls in skipped)
+                    + "\n"
+                    + header
+                )
+            (self.run_dir / f"{pipeline}.txt").write_text(header + "".join(sections), encoding="utf-8")
+
+        lines = [f"Traced peak: {self._traced_peak / 1024 / 1024:.1f} MiB"]
+        if not self._traced_alone:
+            lines[0] += " (process-wide: other profiled runs or an outside tracer were active)"
+        if self._peak_snapshot is not None:
+            lines.append(
+                f"Snapshot at {self._peak_label}: {self._peak_snapshot_bytes / 1024 / 1024:.1f} MiB"
+            )
+            lines.append("")
+            for stat in self._peak_snapshot.statistics("lineno")[: self.top_n]:
+                lines.append(str(stat))
+        (self.run_dir / "allocations.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+        return self.run_dir
@@ -0,0 +1,82 @@
+"""
+Process-wide concurrency budgets shared by all running pipelines.
+
+Each budget is a counting semaphore whose limit can be changed at runtime
+(``None`` means unlimited). The runner applies ``ConcurrencyLimits`` once,
+and every pipeline then competes for the same parse and upload slots; HTTP
+connections and request rate per host are limited by ``networking.host_limiter``,
+and memory held by in-flight files by ``orchestration.memory_budget``.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional, TypedDict
+
+
+class ConcurrencyLimits(TypedDict, total=False):
+    """Global limits across all concurrently running pipelines (omit a key for no limit)."""
+    connections_per_host: int
+    requests_per_second_per_host: float
+    parse_workers: int
+    uploads_in_flight: int
+    memory_bytes: int
+
+
+class Budget:
+    """Counting semaphore with a limit that can be raised or lowered while in use."""
+
+    def __init__(self, limit: Optional[int] = None):
+        self._limit = limit
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> Optional[int]:
+        return self._limit
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    def set_limit(self, limit: Optional[int]) -> None:
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be at least 1")
+        with self._cond:
+            self._limit = limit
+            self._cond.notify_all()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._limit is not None and self._in_use >= self._limit:
+                self._cond.wait()
+            self._in_use += 1
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+PARSE_BUDGET = Budget()
+UPLOAD_BUDGET = Budget()
+
+
+def apply_limits(limits: ConcurrencyLimits) -> None:
+    """Configure the global parse, upload, memory and per-host budgets."""
+    from networking.host_limiter import HOST_LIMITER
+    from orchestration.memory_budget import MEMORY_BUDGET
+
+    PARSE_BUDGET.set_limit(limits.get("parse_workers"))
+    UPLOAD_BUDGET.set_limit(limits.get("uploads_in_flight"))
+    MEMORY_BUDGET.set_limit(limits.get("memory_bytes"))
+    # Per-host concurrency adapts on its own; this caps how far it can grow.
+    HOST_LIMITER.set_max_connections(limits.get("connections_per_host"))
+    if "requests_per_second_per_host" in limits:
+        HOST_LIMITER.set_requests_per_second(limits["requests_per_second_per_host"])
@@ -0,0 +1,203 @@
+"""
+Process-wide memory budget for downloaded, decompressed and parsed files.
+
+Each file reserves its estimated in-memory footprint before it is downloaded,
+and is only admitted while the total reservation fits the budget (a single
+file larger than the whole budget is still admitted when nothing else is
+reserved, so it cannot block forever). The estimate is the compressed size
+from the listing multiplied by a compression ratio learned per pipeline from
+the bytes actually downloaded and decompressed, times a factor for the
+decoded text and parsed record dicts.
+
+When uploads fall behind, parsed batches are written to a ``ColumnarSpill``
+file so their reservation can be handed back while they wait for the uploader.
+"""
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from abstractions.link_extractor import Link
+from observability import metrics
+
+# Compressed size assumed for files whose listing has no size (e.g. Shufersal).
+DEFAULT_COMPRESSED_BYTES = 4 * 1024 * 1024
+# Initial gzip ratio for XML price files, until a pipeline has observed its own.
+DEFAULT_COMPRESSION_RATIO = 10.0
+# Decoded str plus parsed record dicts, per decompressed byte.
+PARSED_OVERHEAD = 4.0
+# Weight of the latest file in the learned averages.
+SMOOTHING = 0.3
+
+MEMORY_RESERVED_BYTES = metrics.REGISTRY.gauge(
+    "scraper_memory_reserved_bytes",
+    "Estimated bytes of files currently admitted under the memory budget.",
+    (),
+)
+SPILLED_BATCHES = metrics.REGISTRY.counter(
+    "scraper_spilled_batches_total", "Parsed batches spilled to disk while waiting for upload."
+)
+
+
+class MemoryBudget:
+    """Byte-weighted admission control; ``limit=None`` admits everything."""
+
+    def __init__(self, limit: Optional[int] = None):
+        self._limit = limit
+        self._reserved = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> Optional[int]:
+        return self._limit
+
+    @property
+    def reserved(self) -> int:
+        return self._reserved
+
+    @property
+    def waiting(self) -> int:
+        """Number of files waiting for admission."""
+        return self._waiting
+
+    def set_limit(self, limit: Optional[int]) -> None:
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be at least 1 byte")
+        with self._cond:
+            self._limit = limit
+            self._cond.notify_all()
+
+    def acquire(self, nbytes: int) -> None:
+        with self._cond:
+            self._waiting += 1
+            try:
+                while (
+                    self._limit is not None
+                    and self._reserved > 0
+                    and self._reserved + nbytes > self._limit
+                ):
+                    self._cond.wait()
+            finally:
+                self._waiting -= 1
+            self._reserved += nbytes
+            MEMORY_RESERVED_BYTES.set(self._reserved)
+
+    def release(self, nbytes: int) -> None:
+        with self._cond:
+            self._reserved -= nbytes
+            MEMORY_RESERVED_BYTES.set(self._reserved)
+            self._cond.notify_all()
+
+    @contextmanager
+    def reserve(self, nbytes: int) -> Iterator["Reservation"]:
+        reservation = Reservation(self, nbytes)
+        try:
+            yield reservation
+        finally:
+            reservation.release()
+
+
+class Reservation:
+    """An admitted file's share of a ``MemoryBudget``; can be shrunk once data is spilled."""
+
+    def __init__(self, budget: MemoryBudget, nbytes: int):
+        budget.acquire(nbytes)
+        self.budget = budget
+        self.nbytes = nbytes
+
+    def shrink(self, nbytes: int) -> None:
+        nbytes = max(0, nbytes)
+        if nbytes < self.nbytes:
+            self.budget.release(self.nbytes - nbytes)
+            self.nbytes = nbytes
+
+    def release(self) -> None:
+        self.shrink(0)
+
+
+MEMORY_BUDGET = MemoryBudget()
+
+
+class FootprintEstimator:
+    """Estimates a file's in-memory footprint, learning sizes and ratios per pipeline."""
+
+    def __init__(self) -> None:
+        self._compressed: Dict[str, float] = {}
+        self._ratio: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def estimate(self, pipeline_name: str, file_meta: Link) -> int:
+        with self._lock:
+            compressed = file_meta.get("size") or self._compressed.get(pipeline_name, DEFAULT_COMPRESSED_BYTES)
+            if file_meta["file_name"].lower().endswith(".xml"):
+                ratio = 1.0
+            else:
+                ratio = self._ratio.get(pipeline_name, DEFAULT_COMPRESSION_RATIO)
+        return int(compressed * ratio * PARSED_OVERHEAD)
+
+    def observe(self, pipeline_name: str, compressed: float, decompressed: float) -> None:
+        """Record the bytes actually downloaded and decompressed for one file."""
+        if compressed <= 0 or decompressed <= 0:
+            return
+        with self._lock:
+            for values, sample in (
+                (self._compressed, compressed),
+                (self._ratio, decompressed / compressed),
+            ):
+                previous = values.get(pipeline_name)
+                values[pipeline_name] = sample if previous is None else (
+                    SMOOTHING * sample + (1 - SMOOTHING) * previous
+                )
+
+
+class ColumnarSpill:
+    """
+    Temporary on-disk store for parsed batches, one columnar segment per batch.
+
+    A segment is a JSON header line (row count and column names) followed by
+    one JSON line per column holding that column's values, so a batch is
+    rebuilt from a few large lists rather than thousands of small dicts.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        handle, self.path = tempfile.mkstemp(prefix="scraper-spill-", suffix=".spill", dir=directory)
+        self._file = os.fdopen(handle, "w+", encoding="utf-8")
+        self.batches = 0
+        self.largest_batch_bytes = 0
+
+    def write_batch(self, records: List[dict]) -> None:
+        columns: List[str] = []
+        seen = set()
+        for record in records:
+            for key in record:
+                if key not in seen:
+                    seen.add(key)
+                    columns.append(key)
+        start = self._file.tell()
+        self._file.write(json.dumps({"rows": len(records), "columns": columns}, ensure_ascii=False) + "\n")
+        for column in columns:
+            self._file.write(json.dumps([record.get(column) for record in records], ensure_ascii=False) + "\n")
+        self.largest_batch_bytes = max(self.largest_batch_bytes, self._file.tell() - start)
+        self.batches += 1
+        metrics.count(SPILLED_BATCHES)
+
+    def iter_batches(self) -> Iterator[List[dict]]:
+        self._file.flush()
+        self._file.seek(0)
+        for _ in range(self.batches):
+            header = json.loads(self._file.readline())
+            values = [json.loads(self._file.readline()) for _ in header["columns"]]
+            yield [dict(zip(header["columns"], row)) for row in zip(*values)]
+
+    def close(self) -> None:
+        self._file.close()
+        os.unlink(self.path)
+
+    def __enter__(self) -> "ColumnarSpill":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
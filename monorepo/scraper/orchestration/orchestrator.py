@@ -0,0 +1,120 @@
+"""
+Dependency-aware execution of several pipelines.
+
+Pipelines are started as soon as every pipeline they depend on has finished
+successfully (e.g. ``rami_levy_stores`` before ``rami_levy``, because
+``price_events`` reference ``stores``), so independent chains run in
+parallel up to ``max_parallel``. If a pipeline fails, everything that depends
+on it, directly or transitively, is skipped.
+
+Each pipeline runs in a copy of the caller's context, so context-scoped
+state such as the run's profiler (``metrics.profiler_scope``) follows it
+into the worker thread.
+"""
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Set
+
+from observability.log import get_logger
+
+_log = get_logger(__name__)
+
+PipelineDependencies = Mapping[str, Sequence[str]]
+
+
+def topological_order(names: Sequence[str], dependencies: PipelineDependencies) -> List[str]:
+    """
+    Order ``names`` so that dependencies come first (stable for independent pipelines).
+
+    Dependencies on pipelines outside ``names`` are ignored.
+
+    Raises:
+        ValueError: If the dependencies contain a cycle
+    """
+    selected = set(names)
+    ordered: List[str] = []
+    state: Dict[str, int] = {}  # 1 = visiting, 2 = done
+
+    def visit(name: str, path: List[str]) -> None:
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise ValueError(f"Pipeline dependency cycle: {' -> '.join(path + [name])}")
+        state[name] = 1
+        for dependency in dependencies.get(name, ()):
+            if dependency in selected:
+                visit(dependency, path + [name])
+        state[name] = 2
+        ordered.append(name)
+
+    for name in names:
+        visit(name, [])
+    return ordered
+
+
+class PipelineOrchestrator:
+    """Runs pipelines respecting a dependency graph with bounded parallelism."""
+
+    def __init__(self, dependencies: Optional[PipelineDependencies] = None, max_parallel: int = 1):
+        if max_parallel < 1:
+            raise ValueError("max_parallel must be at least 1")
+        self.dependencies: PipelineDependencies = dependencies or {}
+        self.max_parallel = max_parallel
+
+    def _dependents(self, failed: str, names: Set[str]) -> Set[str]:
+        blocked: Set[str] = set()
+        frontier = [failed]
+        while frontier:
+            current = frontier.pop()
+            for name in names:
+                if name not in blocked and current in self.dependencies.get(name, ()):
+                    blocked.add(name)
+                    frontier.append(name)
+        return blocked
+
+    def run(self, pipeline_names: Sequence[str], run_one: Callable[[str], list]) -> Dict[str, list]:
+        """
+        Run ``run_one(name)`` for every pipeline, dependencies first.
+
+        Returns:
+            Dictionary mapping successfully completed pipeline names to their records
+        """
+        order = topological_order(pipeline_names, self.dependencies)
+        selected = set(order)
+        remaining = {
+            name: {dep for dep in self.dependencies.get(name, ()) if dep in selected}
+            for name in order
+        }
+        results: Dict[str, list] = {}
+        running: Dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="pipeline") as executor:
+            while remaining or running:
+                for name in [n for n in order if n in remaining and not remaining[n]]:
+                    if len(running) >= self.max_parallel:
+                        break
+                    del remaining[name]
+                    running[executor.submit(contextvars.copy_context().run, run_one, name)] = name
+
+                if not running:
+                    # Everything left is blocked on pipelines that failed.
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                        _log.info("pipeline completed", extra={"pipeline": name})
+                    except Exception as exc:
+                        _log.error(
+                            "pipeline failed", extra={"pipeline": name, "error": str(exc)}, exc_info=exc
+                        )
+                        for blocked in self._dependents(name, set(remaining)):
+                            _log.warning("pipeline skipped", extra={"pipeline": blocked, "failed_dependency": name})
+                            remaining.pop(blocked, None)
+                        continue
+                    for deps in remaining.values():
+                        deps.discard(name)
+
+        return results
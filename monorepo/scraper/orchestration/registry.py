@@ -0,0 +1,69 @@
+"""
+Lazy registry of pipeline factories.
+
+``PipelineRegistry`` is a read-only mapping of pipeline name to pipeline. A
+pipeline is only constructed, and its chain modules only imported, when it is
+first looked up, so a run of ``rami_levy_stores`` never imports the Shufersal
+scrapers. Objects shared between pipelines (e.g. one HTTP session per chain
+host) are created once through ``shared``.
+"""
+import importlib
+import threading
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional, Union
+
+from abstractions.scraping_pipeline import ScrapingPipeline
+
+PipelineFactory = Callable[["PipelineRegistry"], ScrapingPipeline]
+
+
+def _resolve(factory: Union[str, PipelineFactory]) -> PipelineFactory:
+    """Accept a factory callable or a ``"module:function"`` reference."""
+    if callable(factory):
+        return factory
+    module_name, _, attribute = factory.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+class PipelineRegistry(Mapping[str, ScrapingPipeline]):
+    """Mapping that builds each pipeline on first access from its registered factory."""
+
+    def __init__(self, factories: Optional[Mapping[str, Union[str, PipelineFactory]]] = None):
+        self._factories: Dict[str, Union[str, PipelineFactory]] = dict(factories or {})
+        self._pipelines: Dict[str, ScrapingPipeline] = {}
+        self._shared: Dict[str, Any] = {}
+        # Reentrant: factories call ``shared`` while the registry is building them.
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Union[str, PipelineFactory]) -> None:
+        with self._lock:
+            self._factories[name] = factory
+            self._pipelines.pop(name, None)
+
+    def shared(self, key: str, factory: Callable[[], Any]) -> Any:
+        """Return the object stored under ``key``, creating it with ``factory`` once."""
+        with self._lock:
+            if key not in self._shared:
+                self._shared[key] = factory()
+            return self._shared[key]
+
+    def __getitem__(self, name: str) -> ScrapingPipeline:
+        with self._lock:
+            pipeline = self._pipelines.get(name)
+            if pipeline is None:
+                factory = self._factories[name]
+                pipeline = self._pipelines[name] = _resolve(factory)(self)
+            return pipeline
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._factories
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._factories)
+
+    def __len__(self) -> int:
+        return len(self._factories)
+
+    def loaded(self) -> Dict[str, ScrapingPipeline]:
+        """Pipelines constructed so far."""
+        with self._lock:
+            return dict(self._pipelines)
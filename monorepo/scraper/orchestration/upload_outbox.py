@@ -0,0 +1,360 @@
+"""
+Durable outbox between scraping and the uploader service.
+
+With an outbox, parsed upload chunks are written to a local SQLite file and the
+scraping thread moves on; an ``OutboxDrainer`` thread (or a separate
+``python -m orchestration.upload_outbox`` process) delivers them to
+``/upload/prices`` and ``/upload/stores``. A slow or unavailable uploader then
+only delays delivery, and chunks survive restarts until they are accepted.
+
+Every chunk carries an idempotency key, ``<file name>|<group key>|<chunk index>``.
+The uploader records the keys it has processed (``upload_receipts``) and answers
+a replayed key without writing ``data_sources``/``price_events`` again, so
+redelivery after a timeout or crash never duplicates rows. Chunks rejected with
+a 4xx, or still failing after ``max_attempts``, are parked as ``failed``.
+
+Chunks are delivered in dependency order: a chunk is not claimed while a chunk
+of a pipeline it depends on (e.g. the chain's stores for its prices), enqueued
+before it, is still pending. A price chunk the uploader rejects because its
+store is not there yet ("Upload stores first") is retried rather than parked.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Mapping, Optional, Sequence, TypedDict
+
+import requests
+
+from observability import metrics
+from orchestration.budgets import UPLOAD_BUDGET
+
+DEFAULT_MAX_ATTEMPTS = 8
+DEFAULT_UPLOAD_TIMEOUT_SECONDS = 120
+RETRY_BACKOFF_SECONDS = 2.0
+MAX_RETRY_BACKOFF_SECONDS = 300.0
+
+OUTBOX_CHUNKS = metrics.REGISTRY.counter(
+    "scraper_outbox_chunks_total",
+    "Upload chunks written to / delivered from the outbox, by event (enqueued/delivered/retried/failed).",
+    ("pipeline", "event"),
+)
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS upload_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    pipeline_name TEXT NOT NULL,
+    pipeline_type TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at DOUBLE PRECISION NOT NULL,
+    last_error TEXT,
+    enqueued_at DOUBLE PRECISION NOT NULL,
+    updated_at DOUBLE PRECISION NOT NULL
+)
+"""
+_CREATE_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_upload_outbox_due ON upload_outbox (status, next_attempt_at)
+"""
+
+
+class OutboxEntry(TypedDict):
+    """A chunk claimed for delivery."""
+    id: int
+    idempotency_key: str
+    pipeline_name: str
+    pipeline_type: str
+    payload: Dict[str, Any]
+    attempts: int
+
+
+def idempotency_key(file_name: str, group_key: str, chunk_index: int) -> str:
+    return f"{file_name}|{group_key}|{chunk_index}"
+
+
+def uploader_endpoint(pipeline_type: str) -> str:
+    uploader_url = os.environ.get("UPLOADER_URL", "http://localhost:8000")
+    if pipeline_type == "stores":
+        return uploader_url + "/upload/stores"
+    if pipeline_type == "prices":
+        return uploader_url + "/upload/prices"
+    return uploader_url
+
+
+def uploader_headers() -> Dict[str, str]:
+    api_key = os.environ.get("UPLOADER_API_KEY", "dev-key")
+    return {"Authorization": f"Bearer {api_key}"}
+
+
+# Uploader 400s for prices whose chain or store has not been uploaded yet; they succeed once it is.
+_MISSING_DEPENDENCY_ERRORS = ("Upload stores first", "Insert stores for this chain before uploading prices")
+
+
+def _is_permanent(exc: requests.RequestException) -> bool:
+    """4xx responses will not succeed on replay (except missing stores); anything else is retried."""
+    response = getattr(exc, "response", None)
+    if response is None or not 400 <= response.status_code < 500:
+        return False
+    return not any(message in response.text for message in _MISSING_DEPENDENCY_ERRORS)
+
+
+class UploadOutbox:
+    """Upload chunks in a local SQLite file (WAL mode, one connection per thread)."""
+
+    def __init__(
+        self,
+        path: str,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        dependencies: Optional[Mapping[str, Sequence[str]]] = None,
+    ):
+        """
+        Args:
+            path: SQLite file
+            max_attempts: Deliveries before a chunk is parked as failed
+            dependencies: Pipelines whose earlier chunks must be delivered first,
+                e.g. {"rami_levy": ["rami_levy_stores"]} (optional)
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.dependencies = dependencies or {}
+        self._local = threading.local()
+        self._changed = threading.Condition()
+        self._execute(_CREATE_TABLE)
+        self._execute(_CREATE_INDEX)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _execute(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(sql, params).fetchall()
+            conn.execute("COMMIT")
+            return rows
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _notify(self) -> None:
+        with self._changed:
+            self._changed.notify_all()
+
+    def enqueue(
+        self,
+        key: str,
+        pipeline_name: str,
+        pipeline_type: str,
+        payload: Dict[str, Any],
+    ) -> bool:
+        """
+        Store one chunk for delivery; False if the key is already waiting in the outbox.
+
+        A chunk that was parked as failed is reset to pending with the new payload.
+        """
+        now = time.time()
+        blob = zlib.compress(json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8"), 1)
+        rows = self._execute(
+            "INSERT INTO upload_outbox "
+            "(idempotency_key, pipeline_name, pipeline_type, payload, next_attempt_at, enqueued_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (idempotency_key) DO UPDATE SET "
+            "payload = excluded.payload, status = 'pending', attempts = 0, "
+            "next_attempt_at = excluded.next_attempt_at, last_error = NULL, updated_at = excluded.updated_at "
+            "WHERE upload_outbox.status = 'failed' RETURNING id",
+            (key, pipeline_name, pipeline_type, blob, now, now, now),
+        )
+        if rows:
+            OUTBOX_CHUNKS.inc(pipeline=pipeline_name, event="enqueued")
+            self._notify()
+        return bool(rows)
+
+    def claim(self, lease_seconds: float) -> Optional[OutboxEntry]:
+        """Claim the oldest due chunk; it becomes due again after ``lease_seconds`` unless settled."""
+        now = time.time()
+        conn = self._connection()
+        # BEGIN IMMEDIATE takes the write lock up front, so select + claim is atomic across processes.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._next_due(conn, now)
+            if row is not None:
+                conn.execute(
+                    "UPDATE upload_outbox SET attempts = attempts + 1, next_attempt_at = ?, updated_at = ? "
+                    "WHERE id = ?",
+                    (now + lease_seconds, now, row[0]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        row_id, key, pipeline_name, pipeline_type, blob, attempts = row
+        return OutboxEntry(
+            id=row_id,
+            idempotency_key=key,
+            pipeline_name=pipeline_name,
+            pipeline_type=pipeline_type,
+            payload=json.loads(zlib.decompress(blob)),
+            attempts=attempts + 1,
+        )
+
+    def _next_due(self, conn: sqlite3.Connection, now: float) -> Optional[tuple]:
+        """Oldest due chunk none of whose dependencies has an older chunk still pending."""
+        oldest_pending: Dict[str, int] = {}
+        if self.dependencies:
+            oldest_pending = dict(
+                conn.execute(
+                    "SELECT pipeline_name, MIN(id) FROM upload_outbox WHERE status = 'pending' GROUP BY pipeline_name"
+                ).fetchall()
+            )
+        due = conn.execute(
+            "SELECT id, idempotency_key, pipeline_name, pipeline_type, payload, attempts "
+            "FROM upload_outbox WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id",
+            (now,),
+        )
+        for row in due:
+            if not any(
+                oldest_pending.get(dependency, row[0]) < row[0]
+                for dependency in self.dependencies.get(row[2], ())
+            ):
+                return row
+        return None
+
+    def delivered(self, entry: OutboxEntry) -> None:
+        # The uploader keeps the receipt, so the local copy is no longer needed.
+        self._execute("DELETE FROM upload_outbox WHERE id = ?", (entry["id"],))
+        OUTBOX_CHUNKS.inc(pipeline=entry["pipeline_name"], event="delivered")
+        self._notify()
+
+    def retry_later(self, entry: OutboxEntry, error: str, permanent: bool = False) -> None:
+        """Back off exponentially, or park the chunk as failed."""
+        failed = permanent or entry["attempts"] >= self.max_attempts
+        delay = min(RETRY_BACKOFF_SECONDS * (2 ** (entry["attempts"] - 1)), MAX_RETRY_BACKOFF_SECONDS)
+        now = time.time()
+        self._execute(
+            "UPDATE upload_outbox SET status = ?, next_attempt_at = ?, last_error = ?, updated_at = ? "
+            "WHERE id = ?",
+            ("failed" if failed else "pending", now + delay, error[:2000], now, entry["id"]),
+        )
+        OUTBOX_CHUNKS.inc(pipeline=entry["pipeline_name"], event="failed" if failed else "retried")
+        self._notify()
+
+    def pending(self) -> int:
+        return self._execute("SELECT COUNT(*) FROM upload_outbox WHERE status = 'pending'")[0][0]
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._execute("SELECT status, COUNT(*) FROM upload_outbox GROUP BY status")
+        return {status: count for status, count in rows}
+
+    def wait_until_empty(self, timeout: Optional[float] = None) -> bool:
+        """Block until no chunk is pending (failed ones do not count); False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            with self._changed:
+                self._changed.wait(1.0 if remaining is None else min(remaining, 1.0))
+        return True
+
+
+def deliver(entry: OutboxEntry, timeout: float = DEFAULT_UPLOAD_TIMEOUT_SECONDS) -> None:
+    """POST one chunk to the uploader; raises ``requests.RequestException`` on failure."""
+    payload = dict(entry["payload"], idempotency_key=entry["idempotency_key"])
+    with UPLOAD_BUDGET.slot(), metrics.pipeline_scope(entry["pipeline_name"]), metrics.stage("upload"):
+        response = requests.post(
+            uploader_endpoint(entry["pipeline_type"]),
+            json=payload,
+            headers=uploader_headers(),
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        metrics.count(metrics.BATCHES_UPLOADED)
+
+
+class OutboxDrainer:
+    """Background threads delivering outbox chunks until stopped."""
+
+    def __init__(
+        self,
+        outbox: UploadOutbox,
+        workers: int = 2,
+        timeout: float = DEFAULT_UPLOAD_TIMEOUT_SECONDS,
+        idle_seconds: float = 1.0,
+    ):
+        self.outbox = outbox
+        self.workers = workers
+        self.timeout = timeout
+        self.idle_seconds = idle_seconds
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def drain_once(self) -> bool:
+        """Deliver one due chunk; False if none was due."""
+        # The lease outlives the request timeout, so a slow delivery is not claimed twice.
+        entry = self.outbox.claim(lease_seconds=self.timeout * 2)
+        if entry is None:
+            return False
+        try:
+            deliver(entry, timeout=self.timeout)
+        except requests.RequestException as exc:
+            self.outbox.retry_later(entry, str(exc), permanent=_is_permanent(exc))
+            return True
+        self.outbox.delivered(entry)
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if not self.drain_once():
+                self._stop.wait(self.idle_seconds)
+
+    def start(self) -> "OutboxDrainer":
+        if not self._threads:
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._run, name=f"outbox-drainer-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+
+def main() -> None:
+    """Drain ``SCRAPER_OUTBOX_PATH`` until interrupted (for a drainer running apart from the scraper)."""
+    from pathlib import Path
+    from dotenv import load_dotenv
+    from observability.log import configure_logging
+
+    load_dotenv(Path(__file__).parent.parent.parent.parent / ".env")
+    configure_logging()
+    from bootstrapper import PIPELINE_DEPENDENCIES
+
+    outbox = UploadOutbox(os.environ.get("SCRAPER_OUTBOX_PATH", "upload_outbox.db"), dependencies=PIPELINE_DEPENDENCIES)
+    drainer = OutboxDrainer(outbox).start()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        drainer.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,37 @@
 """
 Pipeline runner for orchestrating data extraction and upload to MinIO.
 """
-import asyncio
-import os
-from datetime import timedelta
-from typing import Dict, List, Optional
-import pandas as pd
+import json
+import time
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 import requests
-from abstractions.scraping_pipeline import ScrapingPipeline
+from abstractions.link_extractor import Link
+from abstractions.scraping_pipeline import ExtractedFile, ScrapingPipeline
+from observability import metrics
+from observability.log import get_logger
+from observability.profiling import RunProfiler
+from orchestration.budgets import UPLOAD_BUDGET, ConcurrencyLimits, apply_limits
+from orchestration.memory_budget import (
+    MEMORY_BUDGET,
+    PARSED_OVERHEAD,
+    ColumnarSpill,
+    FootprintEstimator,
+)
+from orchestration.orchestrator import PipelineDependencies, PipelineOrchestrator
+from orchestration.upload_outbox import idempotency_key, uploader_endpoint, uploader_headers
 
+if TYPE_CHECKING:
+    from dashboards.superset_warmup import DashboardWarmup
+
+
+_log = get_logger(__name__)
 
 DEFAULT_UPLOAD_BATCH_SIZE = 20
+DEFAULT_UPLOAD_RETRIES = 2
+UPLOAD_RETRY_BACKOFF_SECONDS = 1.0
 
 
 def _chunk_records(records: list, batch_size: int) -> List[list]:
@@ -18,51 +39,195 @@ def _chunk_records(records: list, batch_size: int) -> List[list]:
     return [records[i:i + batch_size] for i in range(0, len(records), batch_size)]
 
 
-def upload_data_to_uploader(self, records: list, pipeline_name: str, create_bucket: bool, source_metadata: Optional[dict] = None) -> None:
-    """Upload records to the uploader service. Key is auto-generated by the uploader."""
+def _is_retryable(exc: requests.RequestException) -> bool:
+    """Connection problems, timeouts and 5xx responses are worth retrying; 4xx are not."""
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    response = getattr(exc, "response", None)
+    return response is not None and response.status_code >= 500
+
+
+def _transferred_bytes(pipeline_name: str) -> Tuple[float, float]:
+    """Bytes downloaded and decompressed so far by ``pipeline_name``."""
+    key = (pipeline_name,)
+    return (
+        metrics.DOWNLOADED_BYTES.snapshot().get(key, 0),
+        metrics.DECOMPRESSED_BYTES.snapshot().get(key, 0),
+    )
+
+
+def _uploads_behind() -> bool:
+    """True when every upload slot is busy or other files are waiting for memory."""
+    upload_limit = UPLOAD_BUDGET.limit
+    return (upload_limit is not None and UPLOAD_BUDGET.in_use >= upload_limit) or MEMORY_BUDGET.waiting > 0
+
+
+def upload_data_to_uploader(
+    self,
+    records: list,
+    pipeline_name: str,
+    create_bucket: bool,
+    source_metadata: Optional[dict] = None,
+    max_retries: int = DEFAULT_UPLOAD_RETRIES,
+) -> bool:
+    """
+    Upload records to the uploader service. Key is auto-generated by the uploader.
+
+    Returns True if the uploader accepted the batch, False if it was dropped.
+    """
     pipeline = self.pipelines[pipeline_name]
     pipeline_type = pipeline.pipeline_type()
-    uploader_url = os.environ.get("UPLOADER_URL", "http://localhost:8000")
-    if pipeline_type == "stores":
-        uploader_url = uploader_url + "/upload/stores"
-    elif pipeline_type == "prices":
-        uploader_url = uploader_url + "/upload/prices"
-    
-    api_key = os.environ.get("UPLOADER_API_KEY", "dev-key")
-    headers = {"Authorization": f"Bearer {api_key}"}
+    uploader_url = uploader_endpoint(pipeline_type)
+    headers = uploader_headers()
     payload = {"pipeline_name": pipeline_name, "records": records, "create_bucket": create_bucket}
 
     if source_metadata is not None:
         payload["source_metadata"] = source_metadata
 
-    try:
-        response = requests.post(uploader_url, json=payload, headers=headers, timeout=120)
-        response.raise_for_status()
-    except requests.RequestException as exc:
-        # TODO: Replace prints with proper structured logging.
-        error_message = str(exc)
-        if hasattr(exc, 'response') and exc.response is not None:
-            try:
-                error_data = exc.response.json()
-                error_message = error_data.get('message', str(exc))
-            except Exception:
-                error_message = str(exc)
-        print(
-            f"Upload failed for pipeline '{pipeline_name}' to '{uploader_url}' "
-            f"for {len(records)} records: {error_message}"
-        )
+    for attempt in range(max_retries + 1):
+        try:
+            with UPLOAD_BUDGET.slot(), metrics.stage("upload"):
+                response = requests.post(uploader_url, json=payload, headers=headers, timeout=120)
+                response.raise_for_status()
+            metrics.count(metrics.BATCHES_UPLOADED)
+            return True
+        except requests.RequestException as exc:
+            if attempt < max_retries and _is_retryable(exc):
+                metrics.count(metrics.RETRIES, stage="upload")
+                time.sleep(UPLOAD_RETRY_BACKOFF_SECONDS * (2 ** attempt))
+                continue
+            error_message = str(exc)
+            if hasattr(exc, 'response') and exc.response is not None:
+                try:
+                    error_data = exc.response.json()
+                    error_message = error_data.get('message', str(exc))
+                except Exception:
+                    error_message = str(exc)
+            _log.warning(
+                "upload failed",
+                extra={
+                    "pipeline": pipeline_name,
+                    "url": uploader_url,
+                    "records": len(records),
+                    "error": error_message,
+                    "key": f"upload_failed:{pipeline_name}",
+                },
+            )
+            return False
+    return False
 
 
 class PipelineRunner:
     """Handles running pipelines and uploading results to MinIO."""
 
-    def __init__(self, pipelines: Dict[str, ScrapingPipeline]):
+    def __init__(
+        self,
+        pipelines: Dict[str, ScrapingPipeline],
+        metrics_port: Optional[int] = None,
+        summary_dir: Optional[str] = None,
+        profile_dir: Optional[str] = None,
+        dependencies: Optional[PipelineDependencies] = None,
+        limits: Optional[ConcurrencyLimits] = None,
+        typed_columns: bool = False,
+        price_index_dir: Optional[str] = None,
+        price_history_dir: Optional[str] = None,
+        price_rollups_dir: Optional[str] = None,
+        price_rollups_format: str = "npz",
+        price_rollups_dsn: Optional[str] = None,
+        gazetteer_path: Optional[str] = None,
+        geocode_cache_path: Optional[str] = None,
+        bulk_load_dsn: Optional[str] = None,
+        dashboard_warmup: Optional["DashboardWarmup"] = None,
+        outbox_path: Optional[str] = None,
+        outbox_flush_seconds: float = 60.0,
+    ):
         """
         Initialize the pipeline runner with pipelines.
         Args:
             pipelines: Dictionary of pipeline instances keyed by name
+            metrics_port: Serve Prometheus metrics on 127.0.0.1:<port>/metrics (optional)
+            summary_dir: Directory for JSON run summaries written after each run (optional)
+            profile_dir: Enable profiling; CPU and allocation reports are written to a
+                per-run subdirectory (optional)
+            dependencies: Pipelines that must finish before another starts in
+                run_all_and_upload, e.g. {"rami_levy": ["rami_levy_stores"]} (optional)
+            limits: Process-wide limits on connections per host, parse workers,
+                uploads in flight and memory (optional). With ``memory_bytes`` set, files
+                are processed one at a time per pipeline under the memory budget and
+                parsed records are not kept, so runs return empty record lists.
+            typed_columns: Convert each price file's records into typed NumPy columns
+                (``extracted_file["columns"]``) right after parsing (optional)
+            price_index_dir: Keep a local cross-chain price index in this directory,
+                updated from every ingested price file (optional)
+            price_history_dir: Keep a local run-length encoded price history per
+                (chain, store, ItemCode) in this directory (optional)
+            price_rollups_dir: Keep daily min/max/mean price rollups per (ItemCode, chain,
+                sub-chain, city) in this directory; store cities come from stores files (optional)
+            price_rollups_format: ``"npz"`` or ``"parquet"`` (needs pyarrow) for the rollup files
+            price_rollups_dsn: Also replace rebuilt days in this Postgres database's
+                ``daily_price_rollups`` table (optional)
+            gazetteer_path: Local gazetteer CSV; stores records get ``Latitude``/``Longitude``
+                resolved from their address (optional)
+            geocode_cache_path: Where resolved store coordinates are cached
+                (default: next to the gazetteer)
+            bulk_load_dsn: Load price files straight into this Postgres database with COPY
+                instead of sending them to the uploader, e.g. for backfills (optional)
+            dashboard_warmup: After a run that ingested price files, refresh the dashboard
+                aggregates and warm these Superset charts/dashboards (optional)
+            outbox_path: Write upload chunks to this durable SQLite outbox and deliver
+                them from background threads, so scraping never waits on the uploader (optional)
+            outbox_flush_seconds: How long a run waits at its end for the outbox to drain;
+                undelivered chunks stay in the outbox for the next run
         """
         self.pipelines = pipelines
+        self.summary_dir = Path(summary_dir) if summary_dir else None
+        self.profile_dir = profile_dir
+        self.dependencies = dependencies or {}
+        self.footprints = FootprintEstimator()
+        self.typed_columns = typed_columns
+        self.price_index = None
+        if price_index_dir:
+            from analytics.price_index import PriceIndex
+
+            self.price_index = PriceIndex(price_index_dir)
+        self.price_history = None
+        if price_history_dir:
+            from analytics.price_history import PriceHistory
+
+            self.price_history = PriceHistory(price_history_dir)
+        self.price_rollups = None
+        if price_rollups_dir:
+            from analytics.price_rollups import DailyRollups
+
+            self.price_rollups = DailyRollups(
+                price_rollups_dir, format=price_rollups_format, dsn=price_rollups_dsn
+            )
+        self.store_locator = None
+        if gazetteer_path:
+            from analytics.gazetteer import StoreLocator
+
+            self.store_locator = StoreLocator(
+                gazetteer_path, geocode_cache_path or f"{gazetteer_path}.stores-cache.json"
+            )
+        self.dashboard_warmup = dashboard_warmup
+        self.bulk_loader = None
+        if bulk_load_dsn:
+            from loading.postgres_loader import PostgresBulkLoader
+
+            self.bulk_loader = PostgresBulkLoader(bulk_load_dsn)
+        self.outbox = None
+        self.outbox_drainer = None
+        self.outbox_flush_seconds = outbox_flush_seconds
+        if outbox_path:
+            from orchestration.upload_outbox import OutboxDrainer, UploadOutbox
+
+            self.outbox = UploadOutbox(outbox_path, dependencies=self.dependencies)
+            self.outbox_drainer = OutboxDrainer(self.outbox).start()
+        if limits is not None:
+            apply_limits(limits)
+        self.metrics_server = (
+            metrics.start_metrics_server(metrics_port) if metrics_port is not None else None
+        )
 
     def run_and_upload(
         self,
@@ -88,6 +253,30 @@ class PipelineRunner:
         Raises:
             KeyError: If pipeline_name is not found
         """
+        started_at = datetime.now(timezone.utc)
+        before = metrics.REGISTRY.snapshot()
+        with self._profiling(pipeline_name):
+            records = self._run_pipeline(
+                pipeline_name=pipeline_name,
+                time_back=time_back,
+                max_links=max_links,
+                create_bucket=create_bucket,
+                batch_size=batch_size,
+            )
+        self._flush_outbox()
+        self._warm_up_dashboards(pipeline_name, [pipeline_name])
+        self._write_run_summary(pipeline_name, started_at, before, {pipeline_name: records})
+        return records
+
+    def _run_pipeline(
+        self,
+        pipeline_name: str,
+        time_back: Optional[timedelta],
+        max_links: Optional[int],
+        create_bucket: bool,
+        batch_size: int,
+    ) -> list:
+        """Extract, group and upload a single pipeline, recording per-stage metrics."""
         if pipeline_name not in self.pipelines:
             raise KeyError(f"Pipeline '{pipeline_name}' not found")
         if batch_size <= 0:
@@ -96,39 +285,336 @@ class PipelineRunner:
         time_back = time_back or timedelta(days=120)
         pipeline = self.pipelines[pipeline_name]
 
-        # Extract data — returns List[ExtractedFile], one per source file
-        extracted_files = pipeline.extract(time_back=time_back, max_links=max_links)
+        with metrics.pipeline_scope(pipeline_name):
+            if MEMORY_BUDGET.limit is not None:
+                processed = self._run_files_within_memory_budget(
+                    pipeline_name, time_back, max_links, create_bucket, batch_size
+                )
+                self._commit_local_indexes(pipeline)
+                pipeline.commit_files(processed)
+                return []
 
-        all_records = []
-        for extracted_file in extracted_files:
-            source_metadata = extracted_file['source']
-            records = extracted_file['records']
-            if not records:
-                continue
+            all_records = []
+            # Links whose file was uploaded (or loaded/queued); only these may be skipped by later listings.
+            processed: List[Link] = []
+            for file_meta in pipeline.list_files(time_back=time_back, max_links=max_links):
+                extracted_file = pipeline.extract_file(file_meta)
+                if extracted_file is None:
+                    continue
+                self._process_parsed_file(pipeline, extracted_file)
+                all_records.extend(extracted_file['records'])
+                if self.upload_extracted_file(
+                    pipeline_name,
+                    extracted_file,
+                    create_bucket=create_bucket,
+                    batch_size=batch_size,
+                ):
+                    processed.append(file_meta)
+            self._commit_local_indexes(pipeline)
+            pipeline.commit_files(processed)
+
+        return all_records
+
+    def upload_extracted_file(
+        self,
+        pipeline_name: str,
+        extracted_file: ExtractedFile,
+        create_bucket: bool = True,
+        batch_size: int = DEFAULT_UPLOAD_BATCH_SIZE,
+    ) -> bool:
+        """
+        Group one extracted file's records and upload them in chunks.
+
+        Returns True if every chunk was accepted by the uploader (or there was nothing to upload).
+        """
+        pipeline = self.pipelines[pipeline_name]
+        source_metadata = extracted_file['source']
+        records = extracted_file['records']
+        if not records:
+            return True
+        loaded = self._bulk_load(pipeline, extracted_file)
+        if loaded is not None:
+            return loaded
+
+        upload_batches = self._group_records(pipeline, records)
+        return self._upload_batches(
+            pipeline_name, upload_batches, source_metadata, create_bucket, batch_size
+        )
+
+    def process_extracted_file(
+        self,
+        pipeline_name: str,
+        extracted_file: ExtractedFile,
+        create_bucket: bool = True,
+        batch_size: int = DEFAULT_UPLOAD_BATCH_SIZE,
+    ) -> bool:
+        """
+        Process one file outside a pipeline run (e.g. in a distributed worker): run the
+        parsed-file stages, persist the local indexes, then upload it.
+
+        Returns True if the file was uploaded (or loaded/queued).
+        """
+        pipeline = self.pipelines[pipeline_name]
+        self._process_parsed_file(pipeline, extracted_file)
+        self._commit_local_indexes(pipeline)
+        return self.upload_extracted_file(
+            pipeline_name, extracted_file, create_bucket=create_bucket, batch_size=batch_size
+        )
+
+    def _process_parsed_file(self, pipeline: ScrapingPipeline, extracted_file: ExtractedFile) -> None:
+        """
+        Optional stages for a parsed file: store coordinates and cities for stores files; typed
+        columns, the local price index, the price history and the daily rollups for price files.
+        """
+        if not extracted_file['records']:
+            return
+        if pipeline.pipeline_type() == "stores":
+            if self.store_locator is not None:
+                with metrics.stage("geocode"):
+                    self.store_locator.enrich(extracted_file['records'])
+            if self.price_rollups is not None:
+                self.price_rollups.observe_stores(extracted_file['records'])
+            return
+        if pipeline.pipeline_type() != "prices":
+            return
+        if (
+            self.typed_columns
+            or self.price_index is not None
+            or self.price_history is not None
+            or self.price_rollups is not None
+        ):
+            self._add_typed_columns(extracted_file)
+        if self.price_index is not None:
+            with metrics.stage("index"):
+                self.price_index.ingest(extracted_file['columns'])
+        if self.price_history is not None:
+            with metrics.stage("history"):
+                self.price_history.ingest(extracted_file['columns'], extracted_file['source']['scraped_at'])
+        if self.price_rollups is not None:
+            with metrics.stage("rollup"):
+                self.price_rollups.ingest(extracted_file['columns'], extracted_file['source']['scraped_at'])
 
-            all_records.extend(records)
+    def _commit_local_indexes(self, pipeline: ScrapingPipeline) -> None:
+        """Persist the price index / price history / rollups / store coordinate cache after a pipeline run."""
+        if self.price_index is not None and pipeline.pipeline_type() == "prices":
+            with metrics.stage("index"):
+                self.price_index.commit()
+        if self.price_history is not None and pipeline.pipeline_type() == "prices":
+            with metrics.stage("history"):
+                self.price_history.commit()
+        if self.price_rollups is not None:
+            # Stores runs only save the learned store cities.
+            with metrics.stage("rollup"):
+                self.price_rollups.commit()
+        if self.store_locator is not None and pipeline.pipeline_type() == "stores":
+            self.store_locator.save()
+
+    def _add_typed_columns(self, extracted_file: ExtractedFile) -> None:
+        """Attach typed NumPy columns to a price file."""
+        from columnar.price_columns import MALFORMED_VALUES, malformed_counts, to_price_columns
+
+        with metrics.stage("typing"):
+            columns = to_price_columns(extracted_file['records'])
+        for field, malformed in malformed_counts(columns).items():
+            metrics.count(MALFORMED_VALUES, malformed, field=field)
+        extracted_file['columns'] = columns
+
+    def _bulk_load(self, pipeline: ScrapingPipeline, extracted_file: ExtractedFile) -> Optional[bool]:
+        """
+        Load a price file directly into Postgres if a bulk loader is configured.
+
+        Returns None if the file is not bulk loaded, else whether it was loaded. A file that
+        fails to load (e.g. its stores are not in the database yet) fails alone, like a
+        rejected HTTP upload, and is listed again on the next run.
+        """
+        if self.bulk_loader is None or pipeline.pipeline_type() != "prices":
+            return None
+        try:
+            with metrics.stage("load"):
+                self.bulk_loader.load_prices(extracted_file)
+        except self.bulk_loader.errors as exc:
+            _log.warning(
+                "bulk load failed",
+                extra={
+                    "file": extracted_file['source']['file_name'],
+                    "records": len(extracted_file['records']),
+                    "error": str(exc),
+                    "key": "bulk_load_failed",
+                },
+            )
+            return False
+        return True
+
+    def _group_records(self, pipeline: ScrapingPipeline, records: list) -> List[list]:
+        """Split one file's records into the batches the uploader expects."""
+        # pandas dominates startup time; import it only once there is something to group.
+        import pandas as pd
+
+        with metrics.stage("group"):
             df = pd.DataFrame(records)
 
             # Prices are uploaded in grouped batches, while other pipelines are uploaded as a single batch.
             if pipeline.pipeline_type() == "prices":
                 grouped_df = df.groupby(["SubChainId", "StoreId", "BikoretNo"], dropna=False)
-                upload_batches: List[list] = [group.to_dict("records") for _, group in grouped_df]
+                return [group.to_dict("records") for _, group in grouped_df]
             elif pipeline.pipeline_type() == "stores":
-                upload_batches = [df.to_dict("records")]
+                return [df.to_dict("records")]
             else:
                 raise ValueError(f"Unsupported pipeline type: {pipeline.pipeline_type()}")
 
-            for batch in upload_batches:
-                for records_chunk in _chunk_records(batch, batch_size):
-                    upload_data_to_uploader(
-                        self,
-                        records=records_chunk,
-                        pipeline_name=pipeline_name,
-                        create_bucket=create_bucket,
-                        source_metadata=source_metadata,
-                    )
+    def _upload_batches(
+        self,
+        pipeline_name: str,
+        upload_batches: Iterable[list],
+        source_metadata: dict,
+        create_bucket: bool,
+        batch_size: int,
+    ) -> bool:
+        if self.outbox is not None:
+            self._enqueue_batches(pipeline_name, upload_batches, source_metadata, create_bucket, batch_size)
+            return True
+        uploaded = True
+        for batch in upload_batches:
+            for records_chunk in _chunk_records(batch, batch_size):
+                uploaded &= upload_data_to_uploader(
+                    self,
+                    records=records_chunk,
+                    pipeline_name=pipeline_name,
+                    create_bucket=create_bucket,
+                    source_metadata=source_metadata,
+                )
+        return uploaded
 
-        return all_records
+    def _enqueue_batches(
+        self,
+        pipeline_name: str,
+        upload_batches: Iterable[list],
+        source_metadata: dict,
+        create_bucket: bool,
+        batch_size: int,
+    ) -> None:
+        """Write upload chunks to the outbox, keyed by file name, group and chunk index."""
+        pipeline_type = self.pipelines[pipeline_name].pipeline_type()
+        for batch in upload_batches:
+            if not batch:
+                continue
+            group_key = pipeline_type
+            if pipeline_type == "prices":
+                first = batch[0]
+                group_key = "-".join(str(first.get(column)) for column in ("SubChainId", "StoreId", "BikoretNo"))
+            for chunk_index, records_chunk in enumerate(_chunk_records(batch, batch_size)):
+                payload = {
+                    "pipeline_name": pipeline_name,
+                    "records": records_chunk,
+                    "create_bucket": create_bucket,
+                    "source_metadata": source_metadata,
+                }
+                self.outbox.enqueue(
+                    idempotency_key(source_metadata["file_name"], group_key, chunk_index),
+                    pipeline_name,
+                    pipeline_type,
+                    payload,
+                )
+
+    def _flush_outbox(self) -> None:
+        """Give the drainer up to ``outbox_flush_seconds`` to deliver this run's chunks."""
+        if self.outbox is None:
+            return
+        if not self.outbox.wait_until_empty(timeout=self.outbox_flush_seconds):
+            _log.warning("outbox not drained; pending chunks will be delivered later", extra={"pending": self.outbox.pending()})
+
+    def _run_files_within_memory_budget(
+        self,
+        pipeline_name: str,
+        time_back: timedelta,
+        max_links: Optional[int],
+        create_bucket: bool,
+        batch_size: int,
+    ) -> List[Link]:
+        """
+        Download, parse and upload files one by one, each admitted under MEMORY_BUDGET.
+
+        If uploads fall behind, the grouped batches are spilled to disk and the
+        file's reservation shrinks to a single batch while it waits for the uploader.
+
+        Returns the links whose files were uploaded (or loaded/queued).
+        """
+        pipeline = self.pipelines[pipeline_name]
+        processed: List[Link] = []
+        for file_meta in pipeline.list_files(time_back=time_back, max_links=max_links):
+            estimate = self.footprints.estimate(pipeline_name, file_meta)
+            with MEMORY_BUDGET.reserve(estimate) as reservation:
+                downloaded, decompressed = _transferred_bytes(pipeline_name)
+                extracted_file = pipeline.extract_file(file_meta)
+                downloaded_after, decompressed_after = _transferred_bytes(pipeline_name)
+                self.footprints.observe(
+                    pipeline_name, downloaded_after - downloaded, decompressed_after - decompressed
+                )
+                if extracted_file is None:
+                    continue
+                if not extracted_file['records']:
+                    processed.append(file_meta)
+                    continue
+                self._process_parsed_file(pipeline, extracted_file)
+                loaded = self._bulk_load(pipeline, extracted_file)
+                if loaded is not None:
+                    if loaded:
+                        processed.append(file_meta)
+                    continue
+
+                source_metadata = extracted_file['source']
+                upload_batches = self._group_records(pipeline, extracted_file['records'])
+                del extracted_file
+
+                if not _uploads_behind():
+                    if self._upload_batches(
+                        pipeline_name, upload_batches, source_metadata, create_bucket, batch_size
+                    ):
+                        processed.append(file_meta)
+                    continue
+
+                with ColumnarSpill() as spill:
+                    for batch in upload_batches:
+                        spill.write_batch(batch)
+                    del upload_batches
+                    reservation.shrink(int(spill.largest_batch_bytes * PARSED_OVERHEAD))
+                    if self._upload_batches(
+                        pipeline_name, spill.iter_batches(), source_metadata, create_bucket, batch_size
+                    ):
+                        processed.append(file_meta)
+        return processed
+
+    def _profiling(self, run_name: str):
+        """Return a RunProfiler for this run, or a no-op context when profiling is off."""
+        if self.profile_dir is None:
+            return nullcontext()
+        return RunProfiler(self.profile_dir, run_name=run_name)
+
+    def _write_run_summary(
+        self,
+        run_name: str,
+        started_at: datetime,
+        before: dict,
+        results: Dict[str, list],
+    ) -> Optional[Path]:
+        """Write a JSON summary of the metrics recorded since ``before`` (if summary_dir is set)."""
+        if self.summary_dir is None:
+            return None
+
+        finished_at = datetime.now(timezone.utc)
+        summary = {
+            "run": run_name,
+            "started_at": started_at.isoformat(),
+            "finished_at": finished_at.isoformat(),
+            "duration_seconds": round((finished_at - started_at).total_seconds(), 3),
+            "records": {name: len(records) for name, records in results.items()},
+            "pipelines": metrics.run_summary(before, metrics.REGISTRY.snapshot()),
+        }
+
+        self.summary_dir.mkdir(parents=True, exist_ok=True)
+        path = self.summary_dir / f"{run_name}-{started_at.strftime('%Y%m%dT%H%M%SZ')}.json"
+        path.write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+        return path
 
     def run_all_and_upload(
         self,
@@ -141,6 +627,9 @@ class PipelineRunner:
         """
         Run all pipelines and upload their results to MinIO.
 
+        Pipelines start once the pipelines they depend on (see ``dependencies``) have
+        completed; a failed pipeline causes its dependents to be skipped.
+
         Args:
             time_back: How far back to fetch data (default: 2 hours)
             max_links: Max number of file links to process per pipeline (optional)
@@ -149,67 +638,38 @@ class PipelineRunner:
             max_workers: Maximum number of pipelines to run concurrently (default: 1)
 
         Returns:
-            Dictionary mapping pipeline names to their parsed records
+            Dictionary mapping successfully completed pipeline names to their parsed records
         """
-        if max_workers == 1:
-            # Sequential execution
-            results = {}
-            for pipeline_name in self.pipelines:
-                records = self.run_and_upload(
-                    self,
+        started_at = datetime.now(timezone.utc)
+        before = metrics.REGISTRY.snapshot()
+
+        orchestrator = PipelineOrchestrator(self.dependencies, max_parallel=max_workers)
+        with self._profiling("all"):
+            results = orchestrator.run(
+                list(self.pipelines),
+                lambda pipeline_name: self._run_pipeline(
                     pipeline_name=pipeline_name,
                     time_back=time_back,
                     max_links=max_links,
                     create_bucket=create_bucket,
                     batch_size=batch_size,
-                )
-                results[pipeline_name] = records
-            return results
-        else:
-            # Concurrent execution using asyncio
-            return asyncio.run(
-                self._run_all_concurrent(
-                    time_back=time_back,
-                    max_links=max_links,
-                    create_bucket=create_bucket,
-                    batch_size=batch_size,
-                    max_workers=max_workers,
-                )
+                ),
             )
 
-    async def _run_all_concurrent(
-        self,
-        time_back: Optional[timedelta],
-        max_links: Optional[int],
-        create_bucket: bool,
-        batch_size: int,
-        max_workers: int,
-    ) -> Dict[str, list]:
-        """Internal method for concurrent execution using asyncio."""
-        semaphore = asyncio.Semaphore(max_workers)
-        
-        async def run_with_semaphore(pipeline_name: str):
-            async with semaphore:
-                return pipeline_name, await asyncio.to_thread(
-                    self.run_and_upload,
-                    self,
-                    pipeline_name=pipeline_name,
-                    time_back=time_back,
-                    max_links=max_links,
-                    create_bucket=create_bucket,
-                    batch_size=batch_size,
-                )
-        
-        tasks = [run_with_semaphore(name) for name in self.pipelines]
-        results = {}
-        
-        for coro in asyncio.as_completed(tasks):
-            try:
-                pipeline_name, records = await coro
-                results[pipeline_name] = records
-                print(f"Successfully completed: {pipeline_name}")
-            except Exception as exc:
-                print(f"Error running pipeline: {exc}")
-        
+        self._flush_outbox()
+        self._warm_up_dashboards("all", list(results))
+        self._write_run_summary("all", started_at, before, results)
         return results
 
+    def _warm_up_dashboards(self, run_name: str, completed: List[str]) -> None:
+        """Refresh aggregates and warm dashboard caches once price files were ingested."""
+        if self.dashboard_warmup is None:
+            return
+        if not any(self.pipelines[name].pipeline_type() == "prices" for name in completed):
+            return
+        from dashboards.superset_warmup import warm_up_dashboards
+
+        with metrics.pipeline_scope(run_name):
+            result = warm_up_dashboards(self.dashboard_warmup)
+        for failure in result["failed"]:
+            _log.warning("dashboard warm-up failed", extra={"run": run_name, "error": failure})
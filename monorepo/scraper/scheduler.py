@@ -0,0 +1,195 @@
+"""
+Long-running scheduler that runs each registered pipeline on its own cadence.
+
+Pipelines are created once via ``bootstrapper.create_pipelines`` and reused for
+every tick, so HTTP sessions (and the Cerberus login) stay warm between runs.
+A tick is skipped when the previous run of the same pipeline is still going,
+and first runs are staggered so the chains don't all fire at once.
+
+Pipelines that fall due together run as one batch through
+``PipelineOrchestrator`` with the runner's dependencies, so a chain's stores
+run before its prices (and a failed stores run skips the prices in its batch).
+A pipeline whose dependency is still running from an earlier batch waits for
+it, and at most ``max_parallel`` pipelines run at once across all batches,
+since they share the chains' HTTP sessions.
+
+Usage:
+    python scheduler.py
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, TypedDict
+
+from observability import metrics
+from observability.log import get_logger
+from orchestration.orchestrator import PipelineOrchestrator, topological_order
+from pipeline_runner import PipelineRunner
+
+_log = get_logger(__name__)
+
+
+class PipelineSchedule(TypedDict, total=False):
+    """How often a pipeline runs and how much each run looks back."""
+    interval: timedelta
+    time_back: timedelta
+    max_links: Optional[int]
+
+
+# Stores change rarely; price files are published through the day.
+DEFAULT_SCHEDULES: Dict[str, PipelineSchedule] = {
+    "shufersal_stores": {"interval": timedelta(hours=24), "time_back": timedelta(days=2)},
+    "rami_levy_stores": {"interval": timedelta(hours=24), "time_back": timedelta(days=2)},
+    "shufersal": {"interval": timedelta(hours=1), "time_back": timedelta(hours=2)},
+    "rami_levy": {"interval": timedelta(hours=1), "time_back": timedelta(hours=2)},
+}
+
+SKIPPED_TICKS = metrics.REGISTRY.counter(
+    "scraper_scheduler_skipped_ticks_total",
+    "Ticks skipped because the previous run of the pipeline was still in progress.",
+)
+
+
+class Scheduler:
+    """Runs pipelines on independent intervals using a shared PipelineRunner."""
+
+    def __init__(
+        self,
+        runner: PipelineRunner,
+        schedules: Dict[str, PipelineSchedule],
+        stagger: Optional[timedelta] = None,
+        create_bucket: bool = True,
+        max_parallel: int = 1,
+    ):
+        """
+        Args:
+            runner: Runner holding the (long-lived) pipeline instances and their dependencies
+            schedules: Per-pipeline schedule, keyed by pipeline name
+            stagger: Delay between the first runs of consecutive pipelines
+                (default: shortest interval divided by the number of pipelines)
+            create_bucket: Passed through to run_and_upload
+            max_parallel: Maximum number of pipelines running at once (default: 1)
+        """
+        unknown = [name for name in schedules if name not in runner.pipelines]
+        if unknown:
+            raise KeyError(f"Schedules reference unknown pipelines: {', '.join(unknown)}")
+        for name, schedule in schedules.items():
+            if schedule["interval"].total_seconds() <= 0:
+                raise ValueError(f"Interval for '{name}' must be positive")
+        if max_parallel < 1:
+            raise ValueError("max_parallel must be at least 1")
+
+        self.runner = runner
+        # Dependencies first, so the stagger starts a chain's stores before its prices.
+        self.schedules = {
+            name: schedules[name] for name in topological_order(list(schedules), runner.dependencies)
+        }
+        self.create_bucket = create_bucket
+        self.max_parallel = max_parallel
+        if stagger is None:
+            shortest = min(s["interval"] for s in schedules.values()) if schedules else timedelta(0)
+            stagger = shortest / max(len(schedules), 1)
+        self.stagger = stagger
+        # Pipeline name -> number and future of the batch it last ran in.
+        self._running: Dict[str, Tuple[int, Future]] = {}
+        self._batches = 0
+        self._slots = threading.BoundedSemaphore(max_parallel)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(len(schedules), 1), thread_name_prefix="batch"
+        )
+
+    def _initial_due_times(self, start: float) -> Dict[str, float]:
+        step = self.stagger.total_seconds()
+        return {name: start + index * step for index, name in enumerate(self.schedules)}
+
+    def _run_pipeline(self, name: str, number: int) -> list:
+        """Run one pipeline once its dependencies from earlier batches are done; failures propagate."""
+        for dependency in self.runner.dependencies.get(name, ()):
+            # Only earlier batches are waited for, so batches never wait on each other in a cycle.
+            earlier = self._running.get(dependency)
+            if earlier is not None and earlier[0] < number and not earlier[1].done():
+                _log.info("waiting for dependency", extra={"pipeline": name, "dependency": dependency})
+                wait([earlier[1]])
+
+        schedule = self.schedules[name]
+        with self._slots:
+            started = time.monotonic()
+            records = self.runner.run_and_upload(
+                pipeline_name=name,
+                time_back=schedule.get("time_back"),
+                max_links=schedule.get("max_links"),
+                create_bucket=self.create_bucket,
+            )
+        _log.info(
+            "run completed",
+            extra={"pipeline": name, "records": len(records), "seconds": round(time.monotonic() - started, 1)},
+        )
+        return records
+
+    def _run_batch(self, batch: List[str], number: int) -> None:
+        orchestrator = PipelineOrchestrator(self.runner.dependencies, max_parallel=self.max_parallel)
+        orchestrator.run(batch, lambda name: self._run_pipeline(name, number))
+
+    def _dispatch(self, names: List[str]) -> None:
+        batch: List[str] = []
+        for name in names:
+            previous = self._running.get(name)
+            if previous is not None and not previous[1].done():
+                SKIPPED_TICKS.inc(pipeline=name)
+                _log.warning("previous run still in progress, skipping tick", extra={"pipeline": name})
+                continue
+            batch.append(name)
+        if not batch:
+            return
+        self._batches += 1
+        future = self._executor.submit(self._run_batch, batch, self._batches)
+        for name in batch:
+            self._running[name] = (self._batches, future)
+
+    def run_forever(self, stop_event: Optional[threading.Event] = None) -> None:
+        """Dispatch pipelines as they become due until ``stop_event`` is set."""
+        stop_event = stop_event or threading.Event()
+        due = self._initial_due_times(time.monotonic())
+
+        try:
+            while not stop_event.is_set():
+                now = time.monotonic()
+                ready: List[str] = [name for name, when in due.items() if when <= now]
+                if ready:
+                    self._dispatch(ready)
+                for name in ready:
+                    interval = self.schedules[name]["interval"].total_seconds()
+                    # Advance past `now` so a long pause doesn't trigger a burst of catch-up runs.
+                    while due[name] <= now:
+                        due[name] += interval
+
+                stop_event.wait(max(min(due.values()) - time.monotonic(), 0) if due else None)
+        finally:
+            self._executor.shutdown(wait=True)
+
+
+def main() -> None:
+    from dotenv import load_dotenv
+    import urllib3
+    from bootstrapper import create_runner
+    from observability.log import configure_logging
+
+    load_dotenv(Path(__file__).parent.parent.parent / ".env")
+    configure_logging()
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    runner = create_runner()
+    schedules = {name: s for name, s in DEFAULT_SCHEDULES.items() if name in runner.pipelines}
+    max_parallel = int(os.environ.get("SCRAPER_SCHEDULER_MAX_PARALLEL", "1"))
+
+    try:
+        Scheduler(runner, schedules, max_parallel=max_parallel).run_forever()
+    except KeyboardInterrupt:
+        _log.info("stopping")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+from datetime import timedelta, datetime
+import requests
+from typing import Dict, List, Optional, Sequence, Tuple
+from abstractions.link_extractor import LinkExtractor, Link
+from observability.log import get_logger
+from shufersal.prices.shufersal_watermarks import ShufersalWatermarks, parse_listing_date
+
+_log = get_logger(__name__)
+
+# catID values of https://prices.shufersal.co.il/FileObject/UpdateCategory
+PRICES_CATEGORY = 1
+PRICES_FULL_CATEGORY = 2
+PROMOS_CATEGORY = 3
+CATEGORY_IDS: Dict[str, int] = {
+    "PriceFull": PRICES_FULL_CATEGORY,
+    "Price": PRICES_CATEGORY,
+    "Promo": PROMOS_CATEGORY,
+}
+# storeId=0 lists every store.
+ALL_STORES = 0
+
+
+def _soup(html: str):
+    # bs4 is slow to import; load it on first use rather than at startup.
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(html, 'html.parser')
+
+
+class ShufersalCategoryLinkExtractor(LinkExtractor):
+    """
+    Lists Shufersal files per category (and optionally per store) instead of crawling the root listing.
+
+    With ``watermarks``, each (category, store) listing stops at the first file a previous
+    run processed, so only pages with new files on them are fetched. ``fetch`` does not move
+    the marks: it keeps the complete listings as candidates, and ``commit`` (called by the
+    runner once files were uploaded) moves each mark past the files that were processed,
+    up to the oldest one that was not.
+    """
+
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        categories: Sequence[str] = ("PriceFull", "Price", "Promo"),
+        store_ids: Optional[Sequence[int]] = None,
+        watermarks: Optional[ShufersalWatermarks] = None,
+    ) -> None:
+        self.base_url: str = "https://prices.shufersal.co.il/FileObject/UpdateCategory"
+        self.divider: str = 'page='
+        self.session = session or requests.Session()
+        self.category_ids: List[int] = [CATEGORY_IDS[category] for category in categories]
+        self.store_ids: List[int] = list(store_ids) if store_ids else [ALL_STORES]
+        self.watermarks = watermarks
+        # (category, store) -> files of the last complete listing, waiting for ``commit``.
+        self._candidates: Dict[Tuple[int, int], List[Link]] = {}
+
+    def fetch_category_page(
+        self, category_id: int, store_id: int, page: int
+    ) -> Tuple[Optional[List[Link]], int]:
+        """
+        Return one page of a category listing (newest first) and the listing's page count;
+        the files are None if the page could not be fetched.
+        """
+        try:
+            response = self.session.get(
+                self.base_url,
+                params={'catID': category_id, 'storeId': store_id, 'page': page},
+                verify=False,
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            _log.warning(
+                "category page fetch failed",
+                extra={"category": category_id, "store": store_id, "page": page, "error": str(e)},
+            )
+            return None, 0
+        soup = _soup(response.text)
+
+        file_data: List[Link] = []
+        for row in soup.find_all('tr', class_=['webgrid-row-style', 'webgrid-alternating-row']):
+            tds = row.find_all('td')
+            if len(tds) < 7:
+                continue
+            link_tag = tds[0].find('a')
+            if link_tag and link_tag.get('href') and '.gz' in link_tag['href']:
+                file_data.append({
+                    'url': link_tag['href'],
+                    'date': tds[1].text.strip(),
+                    'file_name': tds[6].text.strip(),
+                })
+
+        pages = [
+            int(a['href'].split(self.divider)[-1])
+            for a in soup.find_all('a', href=True)
+            if self.divider in a['href'] and a['href'].split(self.divider)[-1].isdigit()
+        ]
+        return file_data, max(pages + [page])
+
+    def _list_new_files(
+        self,
+        category_id: int,
+        store_id: int,
+        stop_date: Optional[datetime],
+        max_links: Optional[int],
+    ) -> Tuple[List[Link], bool]:
+        """
+        New files of one (category, store), newest first.
+
+        The flag is False if ``max_links`` or a failed page fetch cut the listing short, in
+        which case the watermark must not move past files that were not returned.
+        """
+        mark = self.watermarks.get(category_id, store_id) if self.watermarks else None
+        files: List[Link] = []
+        page, page_count = 1, 1
+        while page <= page_count:
+            files_metadata, page_count = self.fetch_category_page(category_id, store_id, page)
+            if files_metadata is None:
+                return files, False
+            if not files_metadata:
+                return files, True
+            for file_meta in files_metadata:
+                if self.watermarks is not None and self.watermarks.is_seen(mark, file_meta):
+                    return files, True
+                file_date = parse_listing_date(file_meta['date'])
+                if file_date is None:
+                    continue
+                if stop_date is not None and file_date < stop_date:
+                    return files, True
+                if max_links is not None and len(files) >= max_links:
+                    return files, False
+                files.append(file_meta)
+            page += 1
+        return files, True
+
+    def fetch(self, time_back: timedelta = None, max_links: Optional[int] = None) -> List[Link]:
+        """Fetch new files of every configured category and store; see ``commit`` for the watermarks."""
+        stop_date = datetime.now() - time_back if time_back else None
+        self._candidates = {}
+        if max_links is not None and max_links <= 0:
+            return []
+
+        all_files: List[Link] = []
+        for category_id in self.category_ids:
+            for store_id in self.store_ids:
+                remaining = None if max_links is None else max_links - len(all_files)
+                if remaining is not None and remaining <= 0:
+                    break
+                files, complete = self._list_new_files(category_id, store_id, stop_date, remaining)
+                all_files.extend(files)
+                if complete and files:
+                    self._candidates[(category_id, store_id)] = files
+        return all_files
+
+    def commit(self, processed: List[Link]) -> None:
+        """
+        Advance and save the watermarks of the last ``fetch`` for the ``processed`` files.
+
+        A mark moves past the listed files older than the oldest file that was not processed
+        (all of them if every file was), so failed files are listed again by the next run.
+        """
+        candidates, self._candidates = self._candidates, {}
+        if self.watermarks is None or not candidates:
+            return
+        processed_names = {file_meta['file_name'] for file_meta in processed}
+        for (category_id, store_id), files in candidates.items():
+            failed_dates = [
+                parse_listing_date(file_meta['date'])
+                for file_meta in files
+                if file_meta['file_name'] not in processed_names
+            ]
+            if failed_dates:
+                oldest_failed = min(failed_dates)
+                files = [file_meta for file_meta in files if parse_listing_date(file_meta['date']) < oldest_failed]
+            if files:
+                self.watermarks.advance(category_id, store_id, files)
+        self.watermarks.save()
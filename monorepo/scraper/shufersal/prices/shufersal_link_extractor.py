@@ -2,22 +2,33 @@ from datetime import timedelta, datetime
 import requests
 from typing import List, Optional
 from abstractions.link_extractor import LinkExtractor, Link
-from bs4 import BeautifulSoup
+from observability.log import get_logger
+
+_log = get_logger(__name__)
+
+
+def _soup(html: str):
+    # bs4 is slow to import; load it on first use rather than at startup.
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(html, 'html.parser')
+
 
 class ShufersalLinkExtractor(LinkExtractor):
     """Scraper for Shufersal file links."""
 
-    def __init__(self) -> None:
+    def __init__(self, session: Optional[requests.Session] = None) -> None:
         self.base_url: str = "https://prices.shufersal.co.il/"
         self.divider: str = '/?page='
+        self.session = session or requests.Session()
 
     def fetch_files_metadata(self, page: int) -> Optional[List[Link]]:
         """Fetch file metadata from Shufersal."""
         try:
-            response = requests.get(self.base_url, params={'page': page}, verify=False)
+            response = self.session.get(self.base_url, params={'page': page}, verify=False)
             response.raise_for_status()
             html = response.text
-            soup = BeautifulSoup(html, 'html.parser')
+            soup = _soup(html)
 
             rows = soup.find_all('tr', class_=['webgrid-row-style', 'webgrid-alternating-row'])
 
@@ -35,22 +46,22 @@ class ShufersalLinkExtractor(LinkExtractor):
 
             return file_data if file_data else None
         except requests.RequestException as e:
-            print(f"Error fetching data from {self.base_url}: {e}")
+            _log.warning("listing page fetch failed", extra={"url": self.base_url, "page": page, "error": str(e)})
             return None
 
     def fetch_page_count(self) -> int:
         """Fetch the total number of pages available."""
         try:
-            response = requests.get(self.base_url, verify=False)
+            response = self.session.get(self.base_url, verify=False)
             response.raise_for_status()
             html = response.text
-            soup = BeautifulSoup(html, 'html.parser')
+            soup = _soup(html)
             links = [a['href'] for a in soup.find_all('a', href=True)]
             pages_links = [link for link in links if self.divider in link]
             counts = [int(link.split(self.divider)[-1]) for link in pages_links]
             return max(counts) if counts else -1
         except requests.RequestException as e:
-            print(f"Error fetching page count from {self.base_url}: {e}")
+            _log.warning("page count fetch failed", extra={"url": self.base_url, "error": str(e)})
             return 1
 
     def _is_file_within_time_window(self, file_meta: Link, stop_date: Optional[datetime]) -> bool:
@@ -69,13 +80,12 @@ class ShufersalLinkExtractor(LinkExtractor):
     ) -> List[Link]:
         """Fetch files from pages and filter by time window."""
         all_files: List[Link] = []
-        print(f"Shufersal: Fetching files from {page_count} pages...")
+        stop_reason = "last page"
 
         for page in range(1,  page_count + 1):
-            print(f"Shufersal: Processing page {page}/{page_count}...", end=" ")
             files_metadata = self.fetch_files_metadata(page)
             if not files_metadata:
-                print("No files found")
+                stop_reason = "no files found"
                 break
 
             recent_files = [
@@ -86,22 +96,28 @@ class ShufersalLinkExtractor(LinkExtractor):
             if max_links is not None:
                 remaining = max_links - len(all_files)
                 if remaining <= 0:
-                    print("Shufersal: Reached max links limit, stopping")
+                    stop_reason = "max links"
                     break
                 recent_files = recent_files[:remaining]
 
             all_files.extend(recent_files)
-            print(f"Found {len(recent_files)} files within time window")
+            _log.debug(
+                "listing page processed",
+                extra={"page": page, "pages": page_count, "files": len(recent_files)},
+            )
 
             if max_links is not None and len(all_files) >= max_links:
-                print("Shufersal: Reached max links limit, stopping")
+                stop_reason = "max links"
                 break
 
             if not recent_files:
-                print("Shufersal: No more recent files found, stopping pagination")
+                stop_reason = "no recent files"
                 break
 
-        print(f"Shufersal: Completed. Total files collected: {len(all_files)}")
+        _log.info(
+            "listing completed",
+            extra={"pages": page_count, "files": len(all_files), "stopped": stop_reason},
+        )
         return all_files
 
     def fetch(self, time_back: timedelta = None, max_links: Optional[int] = None) -> List[Link]:
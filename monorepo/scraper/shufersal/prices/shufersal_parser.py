@@ -1,48 +1,20 @@
-import xml.etree.ElementTree as ET
-from typing import Dict, List
-from abstractions.parser import Parser
+from abstractions.xml_schema_parser import RecordStep, XmlSchema, XmlSchemaParser
 
 
-class ShufersalParser(Parser):
+class ShufersalParser(XmlSchemaParser):
     """Parser for Shufersal XML price files."""
 
-    def _text(self, node: ET.Element) -> str:
-        return node.text.strip() if node.text else ""
-
-    def parse(self, content: str) -> List[Dict[str, str]]:
-        """Parse Shufersal XML into item records including header metadata."""
-        try:
-            root = ET.fromstring(content)
-        except ET.ParseError:
-            return []
-
-        # Extract header fields
-        header_keys = [
-            "ChainId",
-            "SubChainId",
-            "StoreId",
-            "BikoretNo",
-            "DllVerNo",
-        ]
-        header: Dict[str, str] = {}
-        for key in header_keys:
-            node = root.find(key)
-            if node is not None:
-                header[key] = self._text(node)
-
-        items_node = root.find("Items")
-        if items_node is None:
-            return []
-
-        item_elements = items_node.findall("Item")
-        records: List[Dict[str, str]] = []
-        for item in item_elements:
-            rec: Dict[str, str] = dict(header)
-            for child in item:
-                rec[child.tag] = self._text(child)
+    SCHEMA = XmlSchema(
+        header={
+            "ChainId": ["ChainId"],
+            "SubChainId": ["SubChainId"],
+            "StoreId": ["StoreId"],
+            "BikoretNo": ["BikoretNo"],
+            "DllVerNo": ["DllVerNo"],
+        },
+        record_paths=[[
             # Include Items@Count if present
-            if "Count" in items_node.attrib:
-                rec["ItemsCount"] = items_node.attrib.get("Count", "")
-            records.append(rec)
-
-        return records
+            RecordStep(tag="Items", attributes={"Count": "ItemsCount"}),
+            RecordStep(tag="Item", repeated=True),
+        ]],
+    )
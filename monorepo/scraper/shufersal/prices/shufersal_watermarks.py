@@ -0,0 +1,90 @@
+"""
+Persisted high-water marks for the targeted Shufersal listing.
+
+Shufersal lists files newest first. For every (category, store) the mark keeps the
+publish time of the newest file already listed and the names of the files published
+at that time, so the next crawl can stop at the first file it has seen before.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, TypedDict
+
+from abstractions.link_extractor import Link
+
+SHUFERSAL_DATE_FORMAT = '%m/%d/%Y %I:%M:%S %p'
+
+
+class Watermark(TypedDict):
+    """Newest listed file for one (category, store)."""
+    date: str
+    files: List[str]
+
+
+def parse_listing_date(value: str) -> Optional[datetime]:
+    try:
+        return datetime.strptime(value, SHUFERSAL_DATE_FORMAT)
+    except ValueError:
+        return None
+
+
+class ShufersalWatermarks:
+    """JSON file of ``"<catID>:<storeId>" -> Watermark``, written atomically on ``save``."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._marks: Dict[str, Watermark] = {}
+        if self.path.exists():
+            with self.path.open(encoding='utf-8') as handle:
+                self._marks = json.load(handle)
+
+    @staticmethod
+    def key(category_id: int, store_id: int) -> str:
+        return f"{category_id}:{store_id}"
+
+    def get(self, category_id: int, store_id: int) -> Optional[Watermark]:
+        with self._lock:
+            return self._marks.get(self.key(category_id, store_id))
+
+    def is_seen(self, mark: Optional[Watermark], file_meta: Link) -> bool:
+        """True if ``file_meta`` is not newer than ``mark`` (always False without a mark)."""
+        if mark is None:
+            return False
+        file_date = parse_listing_date(file_meta['date'])
+        mark_date = parse_listing_date(mark['date'])
+        if file_date is None or mark_date is None:
+            return False
+        if file_date != mark_date:
+            return file_date < mark_date
+        return file_meta['file_name'] in mark['files']
+
+    def advance(self, category_id: int, store_id: int, files: Iterable[Link]) -> None:
+        """Move the mark forward to the newest of ``files``; older files never move it back."""
+        key = self.key(category_id, store_id)
+        with self._lock:
+            mark = self._marks.get(key)
+            newest = parse_listing_date(mark['date']) if mark else None
+            names = set(mark['files']) if mark else set()
+            for file_meta in files:
+                file_date = parse_listing_date(file_meta['date'])
+                if file_date is None:
+                    continue
+                if newest is None or file_date > newest:
+                    newest, names = file_date, {file_meta['file_name']}
+                elif file_date == newest:
+                    names.add(file_meta['file_name'])
+            if newest is not None:
+                self._marks[key] = Watermark(
+                    date=newest.strftime(SHUFERSAL_DATE_FORMAT), files=sorted(names)
+                )
+
+    def save(self) -> None:
+        with self._lock:
+            payload = json.dumps(self._marks, indent=2, sort_keys=True)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        tmp_path.write_text(payload, encoding='utf-8')
+        os.replace(tmp_path, self.path)
@@ -1,25 +1,41 @@
 import gzip
+from typing import Optional
 import requests
 from abstractions.link_extractor import Link
 from abstractions.file_downloader import FileDownloader
+from networking.resumable_download import download_with_resume
+from observability import metrics
 
 
 class ShufersalStoresDownloader(FileDownloader):
     """Fetcher for Shufersal .gz files."""
 
-    def __init__(self, timeout: int = 30, verify_ssl: bool = False) -> None:
+    def __init__(
+        self,
+        timeout: int = 30,
+        verify_ssl: bool = False,
+        session: Optional[requests.Session] = None,
+    ) -> None:
         self.timeout = timeout
         self.verify_ssl = verify_ssl
+        self.session = session or requests.Session()
 
     def download_and_extract(self, file_meta: Link) -> str:
         """Download and extract a Shufersal .gz file."""
-        response = requests.get(file_meta["url"], timeout=self.timeout, verify=self.verify_ssl)
-        response.raise_for_status()
-        content = response.content
+        with metrics.stage("download"):
+            content = download_with_resume(
+                self.session,
+                file_meta["url"],
+                expected_size=file_meta.get("size"),
+                timeout=self.timeout,
+                verify=self.verify_ssl,
+            )
+        metrics.count(metrics.DOWNLOADED_BYTES, len(content))
 
-        try:
-            decompressed = gzip.decompress(content)
-        except OSError:
-            decompressed = content
-
-        return decompressed.decode("utf-8", errors="replace")
+        with metrics.stage("decompress"):
+            try:
+                decompressed = gzip.decompress(content)
+            except OSError:
+                decompressed = content
+            metrics.count(metrics.DECOMPRESSED_BYTES, len(decompressed))
+            return decompressed.decode("utf-8", errors="replace")
@@ -2,22 +2,33 @@ from datetime import timedelta, datetime
 import requests
 from typing import List, Optional
 from abstractions.link_extractor import LinkExtractor, Link
-from bs4 import BeautifulSoup
+from observability.log import get_logger
+
+_log = get_logger(__name__)
+
+
+def _soup(html: str):
+    # bs4 is slow to import; load it on first use rather than at startup.
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(html, 'html.parser')
+
 
 class ShufersalStoresLinkExtractor(LinkExtractor):
     """Scraper for Shufersal file links."""
 
-    def __init__(self) -> None:
+    def __init__(self, session: Optional[requests.Session] = None) -> None:
         self.base_url: str = "https://prices.shufersal.co.il/FileObject/UpdateCategory?catID=5&storeId=0"
         self.divider: str = ''
+        self.session = session or requests.Session()
 
     def fetch_files_metadata(self) -> Optional[List[Link]]:
         """Fetch file metadata from Shufersal."""
         try:
-            response = requests.get(self.base_url, verify=False)
+            response = self.session.get(self.base_url, verify=False)
             response.raise_for_status()
             html = response.text
-            soup = BeautifulSoup(html, 'html.parser')
+            soup = _soup(html)
 
             rows = soup.find_all('tr', class_=['webgrid-row-style'])
 
@@ -33,7 +44,7 @@ class ShufersalStoresLinkExtractor(LinkExtractor):
 
             return file_data if file_data else None
         except requests.RequestException as e:
-            print(f"Error fetching data from {self.base_url}: {e}")
+            _log.warning("stores listing fetch failed", extra={"url": self.base_url, "error": str(e)})
             return None
 
     def fetch(self, time_back: timedelta = None, max_links: Optional[int] = None) -> List[Link]:
@@ -1,9 +1,7 @@
-import xml.etree.ElementTree as ET
-from typing import Dict, List, Optional
-from abstractions.parser import Parser
+from abstractions.xml_schema_parser import RecordStep, XmlSchema, XmlSchemaParser
 
 
-class ShufersalStoresParser(Parser):
+class ShufersalStoresParser(XmlSchemaParser):
     """Parser for Shufersal store XML files."""
 
     KEY_MAP = {
@@ -20,96 +18,30 @@ class ShufersalStoresParser(Parser):
         "ZIPCODE": "ZipCode",
     }
 
-    def _local_name(self, tag: str) -> str:
-        if "}" in tag:
-            return tag.split("}", 1)[1]
-        return tag
-
-    def _normalized_key(self, raw_key: str) -> str:
-        normalized = self.KEY_MAP.get(raw_key.upper())
-        if normalized is None:
-            # Temporary stdout logging; can be swapped for a structured logger later.
-            print(f"[ShufersalStoresParser] Missing key mapping for '{raw_key}', using original key.")
-            return raw_key
-        return normalized
-
-    def _find_child(self, node: ET.Element, child_name: str) -> Optional[ET.Element]:
-        target = child_name.upper()
-        for child in node:
-            if self._local_name(child.tag).upper() == target:
-                return child
-        return None
-
-    def _find_children(self, node: ET.Element, child_name: str) -> List[ET.Element]:
-        target = child_name.upper()
-        return [
-            child
-            for child in node
-            if self._local_name(child.tag).upper() == target
-        ]
-
-    def _text(self, node: ET.Element) -> str:
-        return node.text.strip() if node.text else ""
-
-    def parse(self, content: str) -> List[Dict[str, str]]:
-        """Parse Shufersal stores XML into one record per STORE node."""
-        try:
-            root = ET.fromstring(content)
-        except ET.ParseError:
-            return []
-
+    SCHEMA = XmlSchema(
         # Shufersal stores files are wrapped in ABAP XML: <asx:abap><asx:values>...</asx:values>
-        values_node = root
-        if self._local_name(root.tag).upper() == "ABAP":
-            values_child = self._find_child(root, "values")
-            if values_child is None:
-                return []
-            values_node = values_child
-
-        header: Dict[str, str] = {}
-        chain_node = self._find_child(values_node, "CHAINID")
-        if chain_node is not None:
-            header["ChainId"] = self._text(chain_node)
-        chain_name_node = self._find_child(values_node, "CHAINNAME")
-        if chain_name_node is not None:
-            header["ChainName"] = self._text(chain_name_node)
-        last_update_node = self._find_child(values_node, "LASTUPDATEDATE")
-        if last_update_node is not None:
-            header["LastUpdateDate"] = self._text(last_update_node)
-
-        stores_node = self._find_child(values_node, "STORES")
-        if stores_node is not None:
-            return self._parse_stores(stores_node, header)
-
-        # Cerberus format: Root > SubChains > SubChain > Stores > Store
-        subchains_node = self._find_child(values_node, "SUBCHAINS")
-        if subchains_node is None:
-            return []
-
-        records: List[Dict[str, str]] = []
-        for subchain in self._find_children(subchains_node, "SUBCHAIN"):
-            sc_header = dict(header)
-            sc_id = self._find_child(subchain, "SUBCHAINID")
-            if sc_id is not None:
-                sc_header["SubChainId"] = self._text(sc_id)
-            sc_name = self._find_child(subchain, "SUBCHAINNAME")
-            if sc_name is not None:
-                sc_header["SubChainName"] = self._text(sc_name)
-
-            sc_stores = self._find_child(subchain, "STORES")
-            if sc_stores is not None:
-                records.extend(self._parse_stores(sc_stores, sc_header))
-
-        return records
-
-    def _parse_stores(
-        self, stores_node: ET.Element, header: Dict[str, str]
-    ) -> List[Dict[str, str]]:
-        records: List[Dict[str, str]] = []
-        for store in self._find_children(stores_node, "STORE"):
-            rec: Dict[str, str] = dict(header)
-            for child in store:
-                key = self._normalized_key(self._local_name(child.tag))
-                rec[key] = self._text(child)
-            records.append(rec)
-        return records
+        unwrap={"ABAP": "values"},
+        header={
+            "ChainId": ["CHAINID"],
+            "ChainName": ["CHAINNAME"],
+            "LastUpdateDate": ["LASTUPDATEDATE"],
+        },
+        record_paths=[
+            [RecordStep(tag="STORES"), RecordStep(tag="STORE", repeated=True)],
+            # Cerberus format: Root > SubChains > SubChain > Stores > Store
+            [
+                RecordStep(tag="SUBCHAINS"),
+                RecordStep(
+                    tag="SUBCHAIN",
+                    repeated=True,
+                    header={"SubChainId": ["SUBCHAINID"], "SubChainName": ["SUBCHAINNAME"]},
+                ),
+                RecordStep(tag="STORES"),
+                RecordStep(tag="STORE", repeated=True),
+            ],
+        ],
+        key_map=KEY_MAP,
+        case_insensitive=True,
+        strip_namespaces=True,
+        report_unmapped=True,
+    )
@@ -1,9 +1,11 @@
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
 from abstractions.scraping_pipeline import PipelineType, ScrapingPipeline, ExtractedFile
-from abstractions.link_extractor import LinkExtractor
+from abstractions.link_extractor import Link, LinkExtractor
 from abstractions.file_downloader import FileDownloader
-from abstractions.parser import Parser
+from abstractions.parser import Parser, Projection
+from observability import metrics
+from orchestration.budgets import PARSE_BUDGET
 
 
 class ShufersalStoresPipeline(ScrapingPipeline):
@@ -22,22 +24,30 @@ class ShufersalStoresPipeline(ScrapingPipeline):
     def pipeline_type(self) -> PipelineType:
         return "stores"
 
-    def extract(self, time_back: timedelta = None, max_links: Optional[int] = None) -> List[ExtractedFile]:
-        """Fetch, download, extract, and parse all files."""
-        files = self.scraper.fetch(time_back=time_back, max_links=max_links)
-        downloaded = self.fetcher.download_and_extract_all(files)
+    def list_files(self, time_back: timedelta = None, max_links: Optional[int] = None) -> List[Link]:
+        """Fetch and filter file links."""
+        with metrics.stage("listing"):
+            return self.scraper.fetch(time_back=time_back, max_links=max_links)
 
-        results: List[ExtractedFile] = []
-        for file_meta, text in downloaded:
-            records = self.parser.parse(text)
-            results.append({
-                'source': {
-                    'file_name': file_meta['file_name'],
-                    'source_url': file_meta['url'],
-                    'published_at': file_meta['date'],
-                    'scraped_at': datetime.now(timezone.utc).isoformat(),
-                },
-                'records': records,
-            })
+    def extract_file(self, file_meta: Link, fields: Optional[Projection] = None) -> Optional[ExtractedFile]:
+        """Download, extract, and parse a single file."""
+        try:
+            text = self.fetcher.download_and_extract(file_meta)
+        except Exception:
+            return None
+        if not text:
+            return None
 
-        return results
+        with PARSE_BUDGET.slot(), metrics.stage("parse"):
+            records = self.parser.parse(text, fields)
+        metrics.count(metrics.RECORDS_PARSED, len(records))
+
+        return {
+            'source': {
+                'file_name': file_meta['file_name'],
+                'source_url': file_meta['url'],
+                'published_at': file_meta['date'],
+                'scraped_at': datetime.now(timezone.utc).isoformat(),
+            },
+            'records': records,
+        }
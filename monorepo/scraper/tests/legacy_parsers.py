@@ -0,0 +1,220 @@
+"""
+Chain parsers as they were before the port to ``XmlSchemaParser``.
+
+Kept verbatim (apart from the class names and the stores parser's stdout
+line) as the reference the schema parsers must reproduce.
+"""
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+from abstractions.parser import Parser
+
+
+class LegacyShufersalParser(Parser):
+    """Parser for Shufersal XML price files."""
+
+    def _text(self, node: ET.Element) -> str:
+        return node.text.strip() if node.text else ""
+
+    def parse(self, content: str) -> List[Dict[str, str]]:
+        """Parse Shufersal XML into item records including header metadata."""
+        try:
+            root = ET.fromstring(content)
+        except ET.ParseError:
+            return []
+
+        # Extract header fields
+        header_keys = [
+            "ChainId",
+            "SubChainId",
+            "StoreId",
+            "BikoretNo",
+            "DllVerNo",
+        ]
+        header: Dict[str, str] = {}
+        for key in header_keys:
+            node = root.find(key)
+            if node is not None:
+                header[key] = self._text(node)
+
+        items_node = root.find("Items")
+        if items_node is None:
+            return []
+
+        item_elements = items_node.findall("Item")
+        records: List[Dict[str, str]] = []
+        for item in item_elements:
+            rec: Dict[str, str] = dict(header)
+            for child in item:
+                rec[child.tag] = self._text(child)
+            # Include Items@Count if present
+            if "Count" in items_node.attrib:
+                rec["ItemsCount"] = items_node.attrib.get("Count", "")
+            records.append(rec)
+
+        return records
+
+
+class LegacyRamiLevyPricesParser(Parser):
+    """Parser for Rami Levy prices XML files served via Cerberus."""
+
+    def _text(self, node: ET.Element) -> str:
+        return node.text.strip() if node.text else ""
+
+    def _find_first_text(self, root: ET.Element, tags: List[str]) -> Optional[str]:
+        for tag in tags:
+            node = root.find(tag)
+            if node is not None:
+                return self._text(node)
+        return None
+
+    def parse(self, content: str) -> List[Dict[str, str]]:
+        """Parse Rami Levy prices XML into item records including header metadata."""
+        if not content:
+            return []
+
+        # Rami Levy payloads can start with BOM and use uppercase ID tags (e.g. ChainID).
+        sanitized_content = content.lstrip("\ufeff")
+
+        try:
+            root = ET.fromstring(sanitized_content)
+        except ET.ParseError:
+            return []
+
+        header_candidates = {
+            "ChainId": ["ChainId", "ChainID"],
+            "SubChainId": ["SubChainId", "SubChainID"],
+            "StoreId": ["StoreId", "StoreID"],
+            "BikoretNo": ["BikoretNo"],
+            "DllVerNo": ["DllVerNo", "DllVerNO"],
+        }
+
+        header: Dict[str, str] = {}
+        for key, tags in header_candidates.items():
+            value = self._find_first_text(root, tags)
+            if value is not None:
+                header[key] = value
+
+        items_node = root.find("Items")
+        if items_node is None:
+            return []
+
+        records: List[Dict[str, str]] = []
+        for item in items_node.findall("Item"):
+            rec: Dict[str, str] = dict(header)
+            for child in item:
+                rec[child.tag] = self._text(child)
+            if "Count" in items_node.attrib:
+                rec["ItemsCount"] = items_node.attrib.get("Count", "")
+            records.append(rec)
+
+        return records
+
+
+class LegacyShufersalStoresParser(Parser):
+    """Parser for Shufersal store XML files."""
+
+    KEY_MAP = {
+        "CHAINID": "ChainId",
+        "SUBCHAINID": "SubChainId",
+        "STOREID": "StoreId",
+        "BIKORETNO": "BikoretNo",
+        "STORETYPE": "StoreType",
+        "CHAINNAME": "ChainName",
+        "SUBCHAINNAME": "SubChainName",
+        "STORENAME": "StoreName",
+        "ADDRESS": "Address",
+        "CITY": "City",
+        "ZIPCODE": "ZipCode",
+    }
+
+    def _local_name(self, tag: str) -> str:
+        if "}" in tag:
+            return tag.split("}", 1)[1]
+        return tag
+
+    def _normalized_key(self, raw_key: str) -> str:
+        normalized = self.KEY_MAP.get(raw_key.upper())
+        if normalized is None:
+            return raw_key
+        return normalized
+
+    def _find_child(self, node: ET.Element, child_name: str) -> Optional[ET.Element]:
+        target = child_name.upper()
+        for child in node:
+            if self._local_name(child.tag).upper() == target:
+                return child
+        return None
+
+    def _find_children(self, node: ET.Element, child_name: str) -> List[ET.Element]:
+        target = child_name.upper()
+        return [
+            child
+            for child in node
+            if self._local_name(child.tag).upper() == target
+        ]
+
+    def _text(self, node: ET.Element) -> str:
+        return node.text.strip() if node.text else ""
+
+    def parse(self, content: str) -> List[Dict[str, str]]:
+        """Parse Shufersal stores XML into one record per STORE node."""
+        try:
+            root = ET.fromstring(content)
+        except ET.ParseError:
+            return []
+
+        # Shufersal stores files are wrapped in ABAP XML: <asx:abap><asx:values>...</asx:values>
+        values_node = root
+        if self._local_name(root.tag).upper() == "ABAP":
+            values_child = self._find_child(root, "values")
+            if values_child is None:
+                return []
+            values_node = values_child
+
+        header: Dict[str, str] = {}
+        chain_node = self._find_child(values_node, "CHAINID")
+        if chain_node is not None:
+            header["ChainId"] = self._text(chain_node)
+        chain_name_node = self._find_child(values_node, "CHAINNAME")
+        if chain_name_node is not None:
+            header["ChainName"] = self._text(chain_name_node)
+        last_update_node = self._find_child(values_node, "LASTUPDATEDATE")
+        if last_update_node is not None:
+            header["LastUpdateDate"] = self._text(last_update_node)
+
+        stores_node = self._find_child(values_node, "STORES")
+        if stores_node is not None:
+            return self._parse_stores(stores_node, header)
+
+        # Cerberus format: Root > SubChains > SubChain > Stores > Store
+        subchains_node = self._find_child(values_node, "SUBCHAINS")
+        if subchains_node is None:
+            return []
+
+        records: List[Dict[str, str]] = []
+        for subchain in self._find_children(subchains_node, "SUBCHAIN"):
+            sc_header = dict(header)
+            sc_id = self._find_child(subchain, "SUBCHAINID")
+            if sc_id is not None:
+                sc_header["SubChainId"] = self._text(sc_id)
+            sc_name = self._find_child(subchain, "SUBCHAINNAME")
+            if sc_name is not None:
+                sc_header["SubChainName"] = self._text(sc_name)
+
+            sc_stores = self._find_child(subchain, "STORES")
+            if sc_stores is not None:
+                records.extend(self._parse_stores(sc_stores, sc_header))
+
+        return records
+
+    def _parse_stores(
+        self, stores_node: ET.Element, header: Dict[str, str]
+    ) -> List[Dict[str, str]]:
+        records: List[Dict[str, str]] = []
+        for store in self._find_children(stores_node, "STORE"):
+            rec: Dict[str, str] = dict(header)
+            for child in store:
+                key = self._normalized_key(self._local_name(child.tag))
+                rec[key] = self._text(child)
+            records.append(rec)
+        return records
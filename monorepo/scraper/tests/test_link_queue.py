@@ -0,0 +1,122 @@
+"""Lease lifecycle of the SQLite link queue, and a worker processing one leased link."""
+import pytest
+
+from distributed.link_queue import SQLiteLinkQueue
+from distributed.worker import Worker
+from pipeline_runner import PipelineRunner
+
+LINKS = [{"file_name": f"Stores{i}.xml", "url": f"https://example.invalid/Stores{i}.xml"} for i in range(2)]
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteLinkQueue(str(tmp_path / "queue.db"), max_attempts=2)
+
+
+def test_enqueue_is_idempotent_per_run(queue):
+    assert queue.enqueue("run-1", "rami_levy_stores", LINKS) == 2
+    assert queue.enqueue("run-1", "rami_levy_stores", LINKS) == 0
+    assert queue.enqueue("run-2", "rami_levy_stores", LINKS[:1]) == 1
+    assert queue.stats("run-1") == {"pending": 2}
+
+
+def test_lease_takes_the_oldest_link_once(queue):
+    queue.enqueue("run", "rami_levy_stores", LINKS)
+    first = queue.lease("a", 60)
+    second = queue.lease("b", 60)
+    assert (first["link"], first["attempts"]) == (LINKS[0], 1)
+    assert second["link"] == LINKS[1]
+    assert queue.lease("c", 60) is None
+    assert queue.lease("c", 60, pipelines=["other"]) is None
+
+
+def test_extend_and_complete_need_the_lease_owner(queue):
+    queue.enqueue("run", "rami_levy_stores", LINKS[:1])
+    item = queue.lease("a", 60)
+    assert not queue.extend_lease(item["id"], "b", 60)
+    assert queue.extend_lease(item["id"], "a", 60)
+    assert not queue.complete(item["id"], "b")
+    assert queue.complete(item["id"], "a")
+    assert not queue.extend_lease(item["id"], "a", 60)
+    assert queue.stats() == {"done": 1}
+
+
+def test_fail_retries_until_attempts_are_exhausted(queue):
+    queue.enqueue("run", "rami_levy_stores", LINKS[:1])
+    item = queue.lease("a", 60)
+    assert queue.fail(item["id"], "a", "download failed")
+    assert queue.stats() == {"pending": 1}
+    item = queue.lease("a", 60)
+    assert item["attempts"] == 2
+    assert queue.fail(item["id"], "a", "download failed")
+    assert queue.stats() == {"failed": 1}
+    assert queue.lease("a", 60) is None
+
+
+def test_expired_lease_is_taken_over(queue):
+    queue.enqueue("run", "rami_levy_stores", LINKS[:1])
+    item = queue.lease("a", -1)
+    taken = queue.lease("b", 60)
+    assert (taken["id"], taken["attempts"]) == (item["id"], 2)
+    # The first worker lost its lease and can no longer renew or finish it.
+    assert not queue.extend_lease(item["id"], "a", 60)
+    assert not queue.complete(item["id"], "a")
+    assert queue.complete(item["id"], "b")
+
+
+def test_lease_expired_on_final_attempt_is_failed(queue):
+    queue.enqueue("run", "rami_levy_stores", LINKS[:1])
+    queue.fail(queue.lease("a", 60)["id"], "a", "upload failed")
+    queue.lease("a", -1)
+    assert queue.expire_leases() == 1
+    assert queue.expire_leases() == 0
+    assert queue.stats() == {"failed": 1}
+    assert queue.lease("b", 60) is None
+
+
+def test_lease_expires_final_attempts_before_picking(queue):
+    queue.enqueue("run", "rami_levy_stores", LINKS[:1])
+    queue.fail(queue.lease("a", 60)["id"], "a", "upload failed")
+    queue.lease("a", -1)
+    assert queue.lease("b", 60) is None
+    assert queue._execute("SELECT status, last_error FROM scraper_link_queue") == [
+        ("failed", "lease expired on the final attempt")
+    ]
+
+
+class _StoresPipeline:
+    def pipeline_type(self):
+        return "stores"
+
+    def extract_file(self, file_meta, fields=None):
+        return {"source": {"file_name": file_meta["file_name"]}, "records": [{"StoreId": "1"}]}
+
+
+class _Locator:
+    def __init__(self):
+        self.enriched = []
+        self.saved = 0
+
+    def enrich(self, records):
+        self.enriched.extend(records)
+        for record in records:
+            record["Latitude"] = "32.0"
+
+    def save(self):
+        self.saved += 1
+
+
+def test_worker_runs_the_parsed_file_stages(queue, monkeypatch):
+    runner = PipelineRunner({"rami_levy_stores": _StoresPipeline()})
+    runner.store_locator = _Locator()
+    uploaded = []
+    monkeypatch.setattr(
+        runner, "upload_extracted_file", lambda name, extracted, **kwargs: uploaded.append(extracted) or True
+    )
+    queue.enqueue("run", "rami_levy_stores", LINKS[:1])
+    worker = Worker(runner, queue, worker_id="w")
+
+    assert worker.run(drain=True) == 1
+    assert uploaded[0]["records"] == [{"StoreId": "1", "Latitude": "32.0"}]
+    assert runner.store_locator.saved == 1
+    assert queue.stats() == {"done": 1}
@@ -0,0 +1,74 @@
+"""Queued logging keeps record order and puts tracebacks after the fields."""
+import io
+import json
+
+import pytest
+
+from observability.log import configure_logging, get_logger, shutdown_logging
+from orchestration.orchestrator import PipelineOrchestrator
+
+
+@pytest.fixture
+def stream():
+    output = io.StringIO()
+    yield output
+    shutdown_logging()
+
+
+def test_suppressed_summaries_come_after_earlier_records(stream):
+    configure_logging(level="INFO", stream=stream, burst=1)
+    log = get_logger("tests.log")
+    for code in range(3):
+        log.warning("unmapped key", extra={"key": "k", "code": code})
+    log.info("last record")
+    shutdown_logging()
+
+    lines = stream.getvalue().splitlines()
+    assert [line.split(" ", 3)[3] for line in lines] == [
+        "unmapped key key=k code=0",
+        "last record",
+        "unmapped key key=k code=2 suppressed=2 seen=3",
+    ]
+
+
+def test_traceback_follows_the_fields(stream):
+    configure_logging(level="INFO", stream=stream)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        get_logger("tests.log").exception("parse %s failed", "file.xml", extra={"chain": "rami_levy"})
+    shutdown_logging()
+
+    first, *traceback = stream.getvalue().splitlines()
+    assert first.endswith("parse file.xml failed chain=rami_levy")
+    assert traceback[0] == "Traceback (most recent call last):"
+    assert traceback[-1] == "ValueError: boom"
+
+
+def test_json_keeps_the_exception_separate(stream):
+    configure_logging(level="INFO", stream=stream, json_format=True)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        get_logger("tests.log").exception("parse failed", extra={"chain": "rami_levy"})
+    shutdown_logging()
+
+    payload = json.loads(stream.getvalue())
+    assert payload["message"] == "parse failed"
+    assert payload["chain"] == "rami_levy"
+    assert payload["exception"].endswith("ValueError: boom")
+
+
+def test_failed_pipeline_logs_its_traceback(stream):
+    configure_logging(level="INFO", stream=stream)
+
+    def run_one(name):
+        raise ValueError(f"{name} broke")
+
+    assert PipelineOrchestrator().run(["rami_levy"], run_one) == {}
+    shutdown_logging()
+
+    first, *traceback = stream.getvalue().splitlines()
+    assert first.endswith('pipeline failed pipeline=rami_levy error="rami_levy broke"')
+    assert any("in run_one" in line for line in traceback)
+    assert traceback[-1] == "ValueError: rami_levy broke"
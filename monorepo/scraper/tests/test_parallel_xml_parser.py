@@ -0,0 +1,96 @@
+"""ParallelXmlParser must return exactly what the serial parser returns, whatever the layout."""
+from pathlib import Path
+
+import pytest
+
+from abstractions.parallel_xml_parser import ParallelXmlParser
+from cerberus.rami_levy.prices.rami_levy_parser import RamiLevyPricesParser
+from shufersal.prices.shufersal_parser import ShufersalParser
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+PARSERS = [
+    pytest.param(ShufersalParser, id="shufersal"),
+    pytest.param(RamiLevyPricesParser, id="rami_levy"),
+]
+
+
+def _item(code: str) -> str:
+    return f"<Item><ItemCode>{code}</ItemCode><ItemPrice>1.00</ItemPrice></Item>\n"
+
+
+def _items(*codes: str) -> str:
+    return "".join(_item(code) for code in codes)
+
+
+SPLITTABLE = (
+    "<?xml version='1.0' encoding='utf-8'?>\n<Root><ChainId>1</ChainId><StoreId>2</StoreId>"
+    f"<Items Count='6'>\n{_items('A', 'B', 'C', 'D', 'E', 'F')}</Items></Root>"
+)
+
+UNSPLITTABLE = {
+    "two_items_blocks": (
+        f"<Root><ChainId>1</ChainId><Items>{_items('A', 'B')}</Items><Items>{_items('C', 'D')}</Items></Root>"
+    ),
+    "commented_item": (
+        f"<Root><Items>{_items('A', 'B')}<!-- <Item><ItemCode>X</ItemCode></Item> -->{_items('C', 'D')}</Items></Root>"
+    ),
+    "comment_around_items": f"<Root><Items>{_items('A', 'B')}<!-- {_items('C', 'D')} --></Items></Root>",
+    "cdata_with_item": (
+        f"<Root><Items>{_items('A', 'B')}<Item><ItemCode><![CDATA[</Item><Item>]]></ItemCode></Item>"
+        f"{_items('C', 'D')}</Items></Root>"
+    ),
+    "item_outside_container": f"<Root>{_item('X')}<Items>{_items('A', 'B', 'C')}</Items></Root>",
+    "processing_instruction": f"<Root><Items>{_items('A', 'B')}<?pi <Item>?>{_items('C')}</Items></Root>",
+}
+
+# May be split, but only between whole records.
+ODD_LAYOUTS = {
+    "nested_item": (
+        f"<Root><Items>{_items('A')}<Item><ItemCode>B</ItemCode><Item>x</Item></Item>{_items('C', 'D')}</Items></Root>"
+    ),
+    "malformed": f"<Root><Items>{_items('A', 'B')}<Item><ItemCode>C</Item>{_items('D')}</Items></Root>",
+}
+
+
+@pytest.fixture(params=PARSERS)
+def parsers(request):
+    serial = request.param()
+    return serial, ParallelXmlParser(request.param(), workers=4, min_bytes=0)
+
+
+def test_splittable_file_is_split_and_matches_serial(parsers):
+    serial, parallel = parsers
+    header, ranges, footer = parallel.split(SPLITTABLE)
+    assert len(ranges) == 4
+    assert header + "".join(ranges) + footer == SPLITTABLE
+    assert parallel.parse(SPLITTABLE) == serial.parse(SPLITTABLE)
+    assert len(parallel.parse(SPLITTABLE)) == 6
+
+
+@pytest.mark.parametrize("case", sorted(UNSPLITTABLE))
+def test_unexpected_layouts_fall_back_to_serial(parsers, case):
+    serial, parallel = parsers
+    content = UNSPLITTABLE[case]
+    assert parallel.split(content) is None
+    assert parallel.parse(content) == serial.parse(content)
+
+
+@pytest.mark.parametrize("case", sorted(ODD_LAYOUTS))
+def test_odd_layouts_match_serial(parsers, case):
+    serial, parallel = parsers
+    content = ODD_LAYOUTS[case]
+    assert parallel.parse(content) == serial.parse(content)
+
+
+@pytest.mark.parametrize("fixture", ["shufersal_prices.xml", "rami_levy_prices.xml"])
+def test_fixtures_match_serial(parsers, fixture):
+    serial, parallel = parsers
+    content = (FIXTURES / fixture).read_text(encoding="utf-8")
+    assert parallel.parse(content) == serial.parse(content)
+
+
+def test_projection_matches_serial(parsers):
+    serial, parallel = parsers
+    fields = ["ItemCode"]
+    assert parallel.parse(SPLITTABLE, fields) == serial.parse(SPLITTABLE, fields)
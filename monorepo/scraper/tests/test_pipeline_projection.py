@@ -0,0 +1,31 @@
+"""A projection passed to one extract call must not leak into other calls on the same pipeline."""
+from pathlib import Path
+
+from cerberus.cerberus_pipeline import CerberusPipeline
+from cerberus.rami_levy.prices.rami_levy_parser import RamiLevyPricesParser
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+LINK = {"file_name": "PriceFull.xml", "url": "https://example.invalid/PriceFull.xml", "date": "2024-05-01"}
+
+
+class _Listing:
+    def fetch(self, time_back=None, max_links=None):
+        return [LINK]
+
+
+class _Fixture:
+    def download_and_extract(self, file_meta):
+        return (FIXTURES / "rami_levy_prices.xml").read_text(encoding="utf-8")
+
+
+def test_projection_is_per_call():
+    pipeline = CerberusPipeline(_Listing(), _Fixture(), RamiLevyPricesParser(), "prices")
+    full = pipeline.extract_file(LINK)["records"]
+
+    projected = pipeline.extract(fields=["ItemCode", "ItemPrice"])[0]["records"]
+    assert projected == [{"ItemCode": r["ItemCode"], "ItemPrice": r["ItemPrice"]} for r in full]
+
+    # The runner calls extract_file without fields and must still get full records.
+    assert pipeline.extract_file(LINK)["records"] == full
+    assert len(full[0]) > 2
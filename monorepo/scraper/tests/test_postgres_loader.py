@@ -0,0 +1,133 @@
+"""The bulk loader must map records exactly like the uploader's price mappers, and fail files alone."""
+import json
+
+import pytest
+
+from loading.postgres_loader import LoadError, map_price_record, number_as_string
+from pipeline_runner import PipelineRunner
+
+RECORD = {
+    "ChainId": "7290058140886",
+    "SubChainId": "001",
+    "StoreId": "039",
+    "ItemCode": "7290000000001",
+    "ItemName": "Milk 3%",
+    "ItemPrice": "6.90",
+    "UnitOfMeasurePrice": "0.69",
+    "PriceUpdateDate": "2024-05-01 08:00:00",
+    "bIsWeighted": "0",
+    "Quantity": "1000.00",
+    "UnitOfMeasure": "100 ml",
+    "ManufacturerName": "Tnuva",
+    "ManufactureCountry": "IL",
+    "ItemType": "1",
+    "UnitQty": "ml",
+    "QtyInPackage": "",
+}
+
+
+# String(Number(value)) in JavaScript.
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("039", "39"),
+        ("001", "1"),
+        (" 12 ", "12"),
+        ("", "0"),
+        ("   ", "0"),
+        ("-0", "0"),
+        ("+7", "7"),
+        ("1.50", "1.5"),
+        (".5", "0.5"),
+        ("5.", "5"),
+        ("1e3", "1000"),
+        ("0x1A", "26"),
+        ("0o17", "15"),
+        ("0b101", "5"),
+        ("0.00001", "0.00001"),
+        ("1e-7", "1e-7"),
+        ("1e21", "1e+21"),
+        ("123456789012345678901", "123456789012345680000"),
+        ("Infinity", "Infinity"),
+        ("-Infinity", "-Infinity"),
+        ("1e400", "Infinity"),
+        ("inf", "NaN"),
+        ("nan", "NaN"),
+        ("1_000", "NaN"),
+        ("12abc", "NaN"),
+        ("٣", "NaN"),
+        ("-0x10", "NaN"),
+    ],
+)
+def test_number_as_string_matches_javascript(value, expected):
+    assert number_as_string(value) == expected
+
+
+def test_maps_like_the_uploader():
+    row = map_price_record(RECORD, 4)
+    assert row[:12] == (
+        4, "7290058140886", "39", "7290000000001", "Milk 3%", "Milk 3%",
+        "6.90", "0.69", "2024-05-01 08:00:00", False, "1000.00", "100 ml",
+    )
+    # Empty spec values are left out, like buildSpecAttributes' truthiness checks.
+    assert json.loads(row[12]) == {
+        "manufacturer_name": ["Tnuva"],
+        "manufacture_country": ["IL"],
+        "item_type": ["1"],
+        "unit_qty_description": ["ml"],
+    }
+
+
+def test_description_weighted_and_optional_fields():
+    record = dict(RECORD, ManufacturerItemDescription="Milk 3% 1L", bIsWeighted="1", PriceUpdateDate="")
+    del record["UnitOfMeasurePrice"]
+    row = map_price_record(record, 0)
+    assert row[5] == "Milk 3% 1L"
+    assert row[7] is None
+    assert row[8] is None
+    assert row[9] is True
+
+
+@pytest.mark.parametrize("field", ["ItemName", "ItemCode", "ChainId", "StoreId", "ItemPrice"])
+def test_skips_records_missing_required_fields(field):
+    assert map_price_record({key: value for key, value in RECORD.items() if key != field}, 0) is None
+    if field != "StoreId":
+        # Empty strings are falsy in the mappers too; an empty StoreId becomes "0".
+        assert map_price_record(dict(RECORD, **{field: ""}), 0) is None
+
+
+def test_store_id_is_normalized_not_skipped():
+    assert map_price_record(dict(RECORD, StoreId=""), 0)[2] == "0"
+    assert map_price_record(dict(RECORD, StoreId="abc"), 0)[2] == "NaN"
+
+
+def test_non_string_values_are_missing():
+    assert map_price_record(dict(RECORD, ItemName=None), 0) is None
+
+
+class _PricesPipeline:
+    def pipeline_type(self):
+        return "prices"
+
+
+class _FailingLoader:
+    errors = (LoadError,)
+
+    def __init__(self):
+        self.calls = 0
+
+    def load_prices(self, extracted_file):
+        self.calls += 1
+        raise LoadError("Store not found for ChainId=1 and StoreId=2. Upload stores first.")
+
+
+def test_failed_bulk_load_fails_only_that_file():
+    runner = PipelineRunner({"rami_levy": _PricesPipeline()})
+    runner.bulk_loader = _FailingLoader()
+    extracted = {
+        "source": {"file_name": "PriceFull.xml", "source_url": "", "published_at": "", "scraped_at": ""},
+        "records": [RECORD],
+    }
+    assert runner.upload_extracted_file("rami_levy", extracted) is False
+    assert runner.upload_extracted_file("rami_levy", extracted) is False
+    assert runner.bulk_loader.calls == 2
@@ -0,0 +1,151 @@
+"""Run-length encoded price history: how observations open, extend and close intervals."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from analytics.price_history import PriceHistory
+
+KEY = ("7290027600007", "7290058140886", "1")  # ItemCode, ChainId, StoreId
+
+
+def _record(price, updated="", item_code=KEY[0], store_id=KEY[2]):
+    return {
+        "ChainId": KEY[1],
+        "SubChainId": "001",
+        "StoreId": store_id,
+        "ItemCode": item_code,
+        "ItemPrice": price,
+        "PriceUpdateDate": updated,
+    }
+
+
+@pytest.fixture
+def history(tmp_path):
+    return PriceHistory(str(tmp_path / "history"))
+
+
+def _observe(history, observed_at, *records):
+    history.ingest_records(list(records), observed_at)
+    history.commit()
+
+
+def _intervals(history):
+    return [
+        (interval["price"], interval["valid_from"], interval["valid_to"])
+        for interval in history.history(*KEY)
+    ]
+
+
+def test_repeated_price_extends_last_seen(history):
+    _observe(history, "2024-05-01T08:00:00", _record("5.90"))
+    _observe(history, "2024-05-02T08:00:00", _record("5.90"))
+    assert history.history(*KEY) == [{
+        "price": 5.9,
+        "valid_from": "2024-05-01T08:00:00",
+        "valid_to": None,
+        "last_seen": "2024-05-02T08:00:00",
+    }]
+    assert history.stats()["intervals"] == 1
+    assert history.stats()["segments"] == 0
+
+
+def test_change_takes_effect_at_its_price_update_date(history):
+    _observe(history, "2024-05-01T08:00:00", _record("5.90"))
+    _observe(history, "2024-05-03T08:00:00", _record("6.50", "2024-05-02 14:30:00"))
+    assert _intervals(history) == [
+        (5.9, "2024-05-01T08:00:00", "2024-05-02T14:30:00"),
+        (6.5, "2024-05-02T14:30:00", None),
+    ]
+    assert history.changed_since("2024-05-02T00:00:00") == [{
+        "chain_id": KEY[1],
+        "store_id": KEY[2],
+        "item_code": KEY[0],
+        "old_price": 5.9,
+        "new_price": 6.5,
+        "changed_at": "2024-05-02T14:30:00",
+    }]
+
+
+@pytest.mark.parametrize(
+    "updated",
+    [
+        "",
+        "2024-04-30 10:00:00",  # Before the old price was last seen.
+        "2024-05-04 10:00:00",  # After the observation.
+    ],
+)
+def test_change_without_a_usable_update_date_takes_effect_when_observed(history, updated):
+    _observe(history, "2024-05-01T08:00:00", _record("5.90"))
+    _observe(history, "2024-05-03T08:00:00", _record("6.50", updated))
+    assert _intervals(history) == [
+        (5.9, "2024-05-01T08:00:00", "2024-05-03T08:00:00"),
+        (6.5, "2024-05-03T08:00:00", None),
+    ]
+
+
+def test_several_changes_within_one_commit(history):
+    history.ingest_records([_record("5.90")], "2024-05-01T08:00:00")
+    history.ingest_records([_record("6.50")], "2024-05-02T08:00:00")
+    # A later row of the same file wins.
+    history.ingest_records([_record("9.99"), _record("7.00")], "2024-05-03T08:00:00")
+    history.commit()
+    assert _intervals(history) == [
+        (5.9, "2024-05-01T08:00:00", "2024-05-02T08:00:00"),
+        (6.5, "2024-05-02T08:00:00", "2024-05-03T08:00:00"),
+        (7.0, "2024-05-03T08:00:00", None),
+    ]
+    assert history.stats()["observations"] == 4
+
+
+def test_out_of_order_observations_are_ignored(history):
+    _observe(history, "2024-05-02T08:00:00", _record("6.50"))
+    _observe(history, "2024-05-01T08:00:00", _record("5.90"))
+    _observe(history, "2024-05-02T08:00:00", _record("5.90"))
+    assert history.history(*KEY) == [{
+        "price": 6.5,
+        "valid_from": "2024-05-02T08:00:00",
+        "valid_to": None,
+        "last_seen": "2024-05-02T08:00:00",
+    }]
+
+
+def test_compaction_merges_segments(tmp_path):
+    history = PriceHistory(str(tmp_path / "history"), max_segments=2)
+    for day, price in enumerate(["5.00", "6.00", "7.00", "8.00"], start=1):
+        _observe(history, f"2024-05-0{day}T08:00:00", _record(price))
+    assert history.stats()["segments"] == 1
+    assert [price for price, _, _ in _intervals(history)] == [5.0, 6.0, 7.0, 8.0]
+    assert sorted(path.name for path in (tmp_path / "history").glob("seg-*.npz")) == [
+        history._manifest["segments"][0]["file"]
+    ]
+
+
+def test_compaction_drops_intervals_older_than_retain_days(history):
+    recent = datetime.now().replace(microsecond=0) - timedelta(days=2)
+    _observe(history, "2020-01-01T08:00:00", _record("5.00"))
+    _observe(history, "2020-02-01T08:00:00", _record("6.00"))
+    _observe(history, recent, _record("7.00"))
+    _observe(history, recent + timedelta(days=1), _record("8.00"))
+
+    history.compact(retain_days=30)
+    # 6.00 was replaced two days ago, so it is kept; 5.00 ended in 2020.
+    assert [price for price, _, _ in _intervals(history)] == [6.0, 7.0, 8.0]
+    history.compact(retain_days=0)
+    # The current price is always kept.
+    assert [price for price, _, _ in _intervals(history)] == [8.0]
+    assert history.stats()["segments"] == 0
+
+
+def test_reopening_the_directory(history):
+    _observe(history, "2024-05-01T08:00:00", _record("5.90"), _record("3.00", item_code="7290000000002"))
+    _observe(history, "2024-05-02T08:00:00", _record("6.50"))
+
+    reopened = PriceHistory(str(history.directory))
+    assert reopened.history(*KEY) == history.history(*KEY)
+    assert [store["store_id"] for store in reopened.item_history("7290000000002")] == ["1"]
+
+    # Known series are found again, so a repeat extends the head instead of opening a new series.
+    _observe(reopened, "2024-05-03T08:00:00", _record("6.50"), _record("4.00", store_id="2"))
+    assert reopened.stats()["series"] == 3
+    assert reopened.history(*KEY)[-1]["last_seen"] == "2024-05-03T08:00:00"
+    assert len(reopened.history(*KEY)) == 2
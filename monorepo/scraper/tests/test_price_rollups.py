@@ -0,0 +1,121 @@
+"""Daily rollups: latest price per store, city resolution, closed days and file formats."""
+import numpy as np
+import pytest
+
+from analytics.price_rollups import DailyRollups
+
+CHAIN = "7290058140886"
+ITEM = "7290027600007"
+
+
+def _record(store_id, price, item_code=ITEM):
+    return {
+        "ChainId": CHAIN,
+        "SubChainId": "001",
+        "StoreId": store_id,
+        "ItemCode": item_code,
+        "ItemPrice": price,
+    }
+
+
+def _store(store_id, city):
+    return {"ChainId": CHAIN, "StoreId": store_id, "City": city}
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / "rollups")
+
+
+def _summary(rollups, day, **filters):
+    return [
+        (row["city"], row["min_price"], row["max_price"], row["mean_price"], row["store_count"], row["cheapest_store_id"])
+        for row in rollups.rollups(day, **filters)
+    ]
+
+
+def test_later_file_replaces_the_stores_earlier_price(directory):
+    rollups = DailyRollups(directory)
+    rollups.ingest_records([_record("001", "6.00"), _record("002", "5.00")], "2024-05-01T08:00:00")
+    assert rollups.commit() == ["2024-05-01"]
+    assert _summary(rollups, "2024-05-01") == [("", 5.0, 6.0, 5.5, 2, "2")]
+
+    # A reopened directory still knows the day's store-level prices.
+    rollups = DailyRollups(directory)
+    rollups.ingest_records([_record("1", "4.00")], "2024-05-01T20:00:00")
+    assert rollups.commit() == ["2024-05-01"]
+    assert _summary(rollups, "2024-05-01") == [("", 4.0, 5.0, 4.5, 2, "1")]
+    assert rollups.stats()["open_rows"] == 2
+
+
+def test_cities_resolve_at_rebuild(directory):
+    rollups = DailyRollups(directory)
+    rollups.ingest_records(
+        [_record("1", "6.00"), _record("2", "5.00"), _record("3", "7.00")], "2024-05-01T08:00:00"
+    )
+    # The stores file arrives after the prices but before the commit; store 3 has no city.
+    assert rollups.observe_stores([_store("001", "Haifa"), _store("2", "Haifa"), _store("3", " ")]) == 2
+    rollups.commit()
+    assert _summary(rollups, "2024-05-01") == [
+        ("", 7.0, 7.0, 7.0, 1, "3"),
+        ("Haifa", 5.0, 6.0, 5.5, 2, "2"),
+    ]
+    assert _summary(rollups, "2024-05-01", city="Haifa", chain_id=CHAIN, item_codes=[ITEM]) == [
+        ("Haifa", 5.0, 6.0, 5.5, 2, "2")
+    ]
+    assert DailyRollups(directory).stats()["store_cities"] == 2
+
+
+def test_late_files_for_a_closed_day_are_dropped(directory):
+    rollups = DailyRollups(directory, open_days=2)
+    rollups.ingest_records([_record("1", "6.00")], "2024-05-01T08:00:00")
+    rollups.commit()
+    rollups.ingest_records([_record("1", "6.50")], "2024-05-03T08:00:00")
+    assert rollups.commit() == ["2024-05-03"]
+    assert rollups.stats()["open_rows"] == 1
+
+    rollups.ingest_records([_record("2", "1.00")], "2024-05-01T23:00:00")
+    assert rollups.commit() == []
+    assert _summary(rollups, "2024-05-01") == [("", 6.0, 6.0, 6.0, 1, "1")]
+    assert rollups.days() == ["2024-05-01", "2024-05-03"]
+
+
+def _build_day(directory, format):
+    rollups = DailyRollups(directory, format=format)
+    rollups.observe_stores([_store("1", "Haifa")])
+    rollups.ingest_records(
+        [_record("1", "6.90"), _record("2", "5.49"), _record("3", "5.49"), _record("2", "3.10", "7290000000002")],
+        "2024-05-01T08:00:00",
+    )
+    rollups.commit()
+    return rollups
+
+
+def _assert_round_trip(rollups):
+    day = rollups._read_day("2024-05-01")
+    assert sorted(day) == sorted(
+        ["item", "chain", "sub_chain", "city", "min_price", "max_price", "price_sum", "store_count", "cheapest_store"]
+    )
+    assert day["item"].tolist() == ["7290000000002", ITEM, ITEM]
+    assert day["city"].tolist() == ["", "", "Haifa"]
+    assert day["min_price"].tolist() == [3100, 5490, 6900]
+    assert day["price_sum"].tolist() == [3100, 10980, 6900]
+    assert day["store_count"].tolist() == [1, 2, 1]
+    # Ties go to the lowest store key.
+    assert day["cheapest_store"].tolist() == ["2", "2", "1"]
+
+
+def test_npz_round_trip(directory):
+    rollups = _build_day(directory, "npz")
+    _assert_round_trip(rollups)
+    assert rollups._read_day("2024-05-02") is None
+
+
+def test_parquet_round_trip(directory, tmp_path):
+    pytest.importorskip("pyarrow")
+    rollups = _build_day(directory, "parquet")
+    assert [path.suffix for path in rollups.directory.glob("day=*")] == [".parquet"]
+    _assert_round_trip(rollups)
+    npz = _build_day(str(tmp_path / "npz"), "npz")
+    assert rollups.rollups("2024-05-01") == npz.rollups("2024-05-01")
+    assert np.array_equal(rollups._read_day("2024-05-01")["price_sum"], npz._read_day("2024-05-01")["price_sum"])
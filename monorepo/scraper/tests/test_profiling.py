@@ -0,0 +1,57 @@
+"""Run profilers share tracemalloc: the last one to stop turns it off."""
+import tracemalloc
+
+import pytest
+
+from observability.profiling import RunProfiler
+
+
+@pytest.fixture(autouse=True)
+def not_tracing():
+    assert not tracemalloc.is_tracing()
+    yield
+    tracemalloc.stop()
+
+
+def _peak_line(profiler):
+    return (profiler.write_reports() / "allocations.txt").read_text(encoding="utf-8").splitlines()[0]
+
+
+def test_overlapping_runs_keep_tracing_until_the_last_stops(tmp_path):
+    first = RunProfiler(str(tmp_path), "first")
+    second = RunProfiler(str(tmp_path), "second")
+    first.start()
+    second.start()
+    first.stop()
+    assert tracemalloc.is_tracing()
+    second.stop()
+    assert not tracemalloc.is_tracing()
+
+    assert "process-wide" in _peak_line(first)
+    assert "process-wide" in _peak_line(second)
+
+    alone = RunProfiler(str(tmp_path), "alone")
+    with alone:
+        pass
+    assert _peak_line(alone).endswith("MiB")
+
+
+def test_stop_twice_releases_once(tmp_path):
+    first = RunProfiler(str(tmp_path), "first")
+    second = RunProfiler(str(tmp_path), "second")
+    first.start()
+    second.start()
+    second.stop()
+    second.stop()
+    assert tracemalloc.is_tracing()
+    first.stop()
+    assert not tracemalloc.is_tracing()
+
+
+def test_outside_tracer_is_left_running(tmp_path):
+    tracemalloc.start()
+    profiler = RunProfiler(str(tmp_path))
+    with profiler:
+        pass
+    assert tracemalloc.is_tracing()
+    assert "process-wide" in _peak_line(profiler)
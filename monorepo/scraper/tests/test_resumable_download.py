@@ -0,0 +1,150 @@
+"""Resumable downloads against a local HTTP server that drops, changes and misranges files."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from networking.resumable_download import _checkpoint, _validator_path, download_with_resume
+
+DATA = bytes(range(256)) * 1200  # 300 KB
+ETAG = '"v1"'
+
+
+class _Server:
+    """Serves ``data`` with ranges; ``respond`` can override the reply per request."""
+
+    def __init__(self):
+        self.data = DATA
+        self.etag = ETAG
+        self.requests = []
+        self.respond = None
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                (server.respond or server.serve)(self)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/PriceFull.gz"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def serve(self, handler, cut_at=None):
+        """RFC 7233 semantics: honour Range only if If-Range (when sent) matches the ETag."""
+        data, start = self.data, 0
+        requested = handler.headers.get("Range")
+        if_range = handler.headers.get("If-Range")
+        if requested and (if_range is None or if_range == self.etag):
+            start = int(requested.split("=")[1].rstrip("-"))
+            if start >= len(data):
+                handler.send_response(416)
+                handler.send_header("Content-Range", f"bytes */{len(data)}")
+                handler.send_header("Content-Length", "0")
+                handler.end_headers()
+                return
+            handler.send_response(206)
+            handler.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            handler.send_response(200)
+        body = data[start:]
+        handler.send_header("Content-Length", str(len(body)))
+        handler.send_header("ETag", self.etag)
+        handler.end_headers()
+        if cut_at is not None:
+            handler.wfile.write(body[:cut_at])
+            handler.wfile.flush()
+            handler.close_connection = True
+            return
+        handler.wfile.write(body)
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setenv("SCRAPER_DOWNLOAD_DIR", str(tmp_path))
+    served = _Server()
+    yield served
+    served.close()
+
+
+def _download(server, **kwargs):
+    with requests.Session() as session:
+        return download_with_resume(session, server.url, backoff_seconds=0, **kwargs)
+
+
+def _seed_checkpoint(server, data, validator=ETAG):
+    with _checkpoint(server.url) as (part_path, shared):
+        assert shared
+        part_path.write_bytes(data)
+        _validator_path(part_path).write_text(json.dumps({"if_range": validator}), encoding="utf-8")
+        return part_path
+
+
+def test_resumes_after_dropped_connection(server):
+    calls = []
+
+    def drop_first(handler):
+        calls.append(1)
+        server.serve(handler, cut_at=200 * 1024 if len(calls) == 1 else None)
+
+    server.respond = drop_first
+    assert _download(server, expected_size=len(DATA)) == DATA
+    first, second = server.requests
+    assert "Range" not in first
+    assert second["Range"].startswith("bytes=") and second["Range"] != "bytes=0-"
+    assert second["If-Range"] == ETAG
+
+
+def test_changed_file_is_downloaded_again(server):
+    _seed_checkpoint(server, DATA[:100 * 1024])
+    server.data, server.etag = DATA[::-1], '"v2"'
+    assert _download(server, expected_size=len(DATA)) == DATA[::-1]
+    assert server.requests[0]["Range"] == f"bytes={100 * 1024}-"
+    assert server.requests[0]["If-Range"] == ETAG
+    assert len(server.requests) == 1
+
+
+def test_complete_checkpoint_answered_with_416(server):
+    part_path = _seed_checkpoint(server, DATA)
+    assert _download(server, expected_size=len(DATA)) == DATA
+    assert server.requests[0]["Range"] == f"bytes={len(DATA)}-"
+    assert not part_path.exists()
+
+
+def test_misranged_reply_restarts_from_zero(server):
+    _seed_checkpoint(server, DATA[:100 * 1024])
+
+    def wrong_range_first(handler):
+        if "Range" in handler.headers:
+            # A proxy answering with another range than the one asked for.
+            body = DATA[:1024]
+            handler.send_response(206)
+            handler.send_header("Content-Range", f"bytes 0-1023/{len(DATA)}")
+            handler.send_header("Content-Length", str(len(body)))
+            handler.end_headers()
+            handler.wfile.write(body)
+            return
+        server.serve(handler)
+
+    server.respond = wrong_range_first
+    assert _download(server, expected_size=len(DATA)) == DATA
+    assert [request.get("Range") for request in server.requests] == [f"bytes={100 * 1024}-", None]
+
+
+def test_concurrent_download_uses_a_private_file(server, tmp_path):
+    with _checkpoint(server.url) as (part_path, shared):
+        assert shared
+        part_path.write_bytes(DATA[:100 * 1024])
+        assert _download(server, expected_size=len(DATA)) == DATA
+        # The holder's checkpoint is untouched and the private file is gone.
+        assert part_path.read_bytes() == DATA[:100 * 1024]
+        assert "Range" not in server.requests[0]
+        assert sorted(path.name for path in tmp_path.iterdir() if path.suffix == ".part") == [part_path.name]
@@ -0,0 +1,153 @@
+"""Shufersal listing watermarks: where ``commit`` leaves the marks after partial failures."""
+import pytest
+import requests
+
+from shufersal.prices.shufersal_category_link_extractor import (
+    PRICES_FULL_CATEGORY,
+    ShufersalCategoryLinkExtractor,
+)
+from shufersal.prices.shufersal_watermarks import ShufersalWatermarks
+
+KEY = (PRICES_FULL_CATEGORY, 0)
+
+
+def _file(name, date):
+    return {"file_name": name, "date": date, "url": f"https://example.invalid/{name}.gz"}
+
+
+# Newest first, as Shufersal lists them; F3 and F2 share a publish time.
+F5 = _file("PriceFull-5", "05/01/2024 10:00:00 AM")
+F4 = _file("PriceFull-4", "05/01/2024 09:00:00 AM")
+F3 = _file("PriceFull-3", "05/01/2024 08:00:00 AM")
+F2 = _file("PriceFull-2", "05/01/2024 08:00:00 AM")
+F1 = _file("PriceFull-1", "05/01/2024 07:00:00 AM")
+
+
+def _page(files, page_count):
+    rows = "".join(
+        f'<tr class="webgrid-row-style"><td><a href="{f["url"]}">Download</a></td><td>{f["date"]}</td>'
+        f'<td></td><td></td><td></td><td></td><td>{f["file_name"]}</td></tr>'
+        for f in files
+    )
+    pager = "".join(f'<a href="?catID=2&amp;page={n}">{n}</a>' for n in range(1, page_count + 1))
+    return f"<table>{rows}</table>{pager}"
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class _Session:
+    """Serves ``files`` as a paged PriceFull listing; fetching a page number in ``down`` fails."""
+
+    def __init__(self, files, per_page=2, down=()):
+        self.pages = [files[i:i + per_page] for i in range(0, len(files), per_page)] or [[]]
+        self.down = set(down)
+        self.requested = []
+
+    def get(self, url, params, verify):
+        page = params["page"]
+        self.requested.append(page)
+        if page in self.down:
+            raise requests.ConnectionError("reset")
+        return _Response(_page(self.pages[page - 1], len(self.pages)))
+
+
+@pytest.fixture
+def watermarks(tmp_path):
+    return ShufersalWatermarks(str(tmp_path / "marks.json"))
+
+
+def _extractor(watermarks, files, **kwargs):
+    return ShufersalCategoryLinkExtractor(
+        session=_Session(files, **kwargs), categories=("PriceFull",), watermarks=watermarks
+    )
+
+
+def _names(files):
+    return [file_meta["file_name"] for file_meta in files]
+
+
+def test_all_processed_moves_the_mark_to_the_newest_file(watermarks):
+    extractor = _extractor(watermarks, [F4, F3, F2, F1])
+    listed = extractor.fetch()
+    assert _names(listed) == _names([F4, F3, F2, F1])
+    extractor.commit(listed)
+    assert watermarks.get(*KEY) == {"date": F4["date"], "files": [F4["file_name"]]}
+
+    # The next run stops at the mark, on the first page.
+    extractor = _extractor(watermarks, [F5, F4, F3, F2, F1])
+    assert _names(extractor.fetch()) == _names([F5])
+    assert extractor.session.requested == [1]
+
+
+def test_mark_stops_before_the_oldest_unprocessed_file(watermarks):
+    extractor = _extractor(watermarks, [F5, F4, F2, F1])
+    assert _names(extractor.fetch()) == _names([F5, F4, F2, F1])
+    extractor.commit([F5, F4, F1])
+    assert watermarks.get(*KEY)["files"] == [F1["file_name"]]
+    assert _names(_extractor(watermarks, [F5, F4, F2, F1]).fetch()) == _names([F5, F4, F2])
+
+
+def test_failed_page_fetch_keeps_the_mark(watermarks):
+    watermarks.advance(*KEY, [F1])
+    extractor = _extractor(watermarks, [F5, F4, F3, F2, F1], down={2})
+    listed = extractor.fetch()
+    assert _names(listed) == _names([F5, F4])
+    extractor.commit(listed)
+    # The files on the failed page were never seen, so the mark may not skip them.
+    assert watermarks.get(*KEY)["files"] == [F1["file_name"]]
+
+
+def test_max_links_cut_keeps_the_mark(watermarks):
+    extractor = _extractor(watermarks, [F5, F4, F3, F2, F1])
+    listed = extractor.fetch(max_links=2)
+    assert _names(listed) == _names([F5, F4])
+    extractor.commit(listed)
+    assert watermarks.get(*KEY) is None
+
+
+def test_files_sharing_a_timestamp_are_told_apart_by_name(watermarks):
+    extractor = _extractor(watermarks, [F2, F1])
+    extractor.commit(extractor.fetch())
+    assert watermarks.get(*KEY) == {"date": F2["date"], "files": [F2["file_name"]]}
+
+    # F3 was published at F2's time but listed later: it is new, F2 is not.
+    extractor = _extractor(watermarks, [F4, F3, F2, F1])
+    listed = extractor.fetch()
+    assert _names(listed) == _names([F4, F3])
+    extractor.commit(listed)
+    assert watermarks.get(*KEY)["files"] == [F4["file_name"]]
+
+
+def test_failure_at_a_shared_timestamp_holds_back_its_sibling(watermarks):
+    extractor = _extractor(watermarks, [F4, F3, F2, F1])
+    extractor.fetch()
+    extractor.commit([F4, F3, F1])
+    # F2 failed; F3 shares its time, so the mark stays below both and both are listed again.
+    assert watermarks.get(*KEY)["files"] == [F1["file_name"]]
+    assert _names(_extractor(watermarks, [F4, F3, F2, F1]).fetch()) == _names([F4, F3, F2])
+
+
+def test_is_seen(watermarks):
+    mark = {"date": F3["date"], "files": [F3["file_name"]]}
+    assert not watermarks.is_seen(None, F1)
+    assert watermarks.is_seen(mark, F1)
+    assert watermarks.is_seen(mark, F3)
+    assert not watermarks.is_seen(mark, F2)
+    assert not watermarks.is_seen(mark, F4)
+    assert not watermarks.is_seen(mark, dict(F1, date="not a date"))
+
+
+def test_marks_survive_a_reload(watermarks):
+    watermarks.advance(*KEY, [F3, F2, F1])
+    watermarks.advance(*KEY, [F1])
+    watermarks.save()
+    assert ShufersalWatermarks(str(watermarks.path)).get(*KEY) == {
+        "date": F3["date"],
+        "files": sorted([F2["file_name"], F3["file_name"]]),
+    }
@@ -0,0 +1,107 @@
+"""Delivery order, replays and parking in the SQLite upload outbox."""
+import pytest
+import requests
+
+from orchestration import upload_outbox
+from orchestration.upload_outbox import OutboxDrainer, UploadOutbox, _is_permanent
+
+DEPENDENCIES = {"rami_levy": ["rami_levy_stores"]}
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    # Retried chunks are due again at once.
+    monkeypatch.setattr(upload_outbox, "RETRY_BACKOFF_SECONDS", 0.0)
+    return UploadOutbox(str(tmp_path / "outbox.db"), max_attempts=3, dependencies=DEPENDENCIES)
+
+
+def _enqueue(outbox, key, pipeline_name):
+    pipeline_type = "stores" if pipeline_name.endswith("_stores") else "prices"
+    return outbox.enqueue(key, pipeline_name, pipeline_type, {"records": [key]})
+
+
+def _http_error(status, text):
+    response = requests.Response()
+    response.status_code = status
+    response._content = text.encode("utf-8")
+    return requests.HTTPError(f"{status} Client Error", response=response)
+
+
+def test_prices_wait_for_older_pending_stores(outbox):
+    _enqueue(outbox, "Stores.xml|s|0", "rami_levy_stores")
+    _enqueue(outbox, "Price.xml|p|0", "rami_levy")
+    _enqueue(outbox, "Price.xml|p|1", "other_chain")
+
+    stores = outbox.claim(lease_seconds=60)
+    assert stores["idempotency_key"] == "Stores.xml|s|0"
+    # The stores chunk is leased, not settled: its chain's prices still wait, other chains do not.
+    assert outbox.claim(lease_seconds=60)["idempotency_key"] == "Price.xml|p|1"
+    assert outbox.claim(lease_seconds=60) is None
+
+    outbox.delivered(stores)
+    prices = outbox.claim(lease_seconds=60)
+    assert prices["idempotency_key"] == "Price.xml|p|0"
+    assert prices["payload"] == {"records": ["Price.xml|p|0"]}
+
+
+def test_stores_enqueued_later_do_not_block_prices(outbox):
+    _enqueue(outbox, "Price.xml|p|0", "rami_levy")
+    _enqueue(outbox, "Stores.xml|s|0", "rami_levy_stores")
+    assert outbox.claim(lease_seconds=60)["idempotency_key"] == "Price.xml|p|0"
+
+
+def test_reenqueue_pending_is_a_noop_and_failed_is_reset(outbox):
+    assert _enqueue(outbox, "Price.xml|p|0", "rami_levy")
+    assert not _enqueue(outbox, "Price.xml|p|0", "rami_levy")
+    assert outbox.stats() == {"pending": 1}
+
+    entry = outbox.claim(lease_seconds=60)
+    outbox.retry_later(entry, "rejected", permanent=True)
+    assert outbox.stats() == {"failed": 1}
+    assert outbox.enqueue("Price.xml|p|0", "rami_levy", "prices", {"records": ["new"]})
+    entry = outbox.claim(lease_seconds=60)
+    assert (entry["attempts"], entry["payload"]) == (1, {"records": ["new"]})
+
+
+def test_retry_later_parks_after_max_attempts(outbox):
+    _enqueue(outbox, "Price.xml|p|0", "rami_levy")
+    for attempt in range(1, 4):
+        entry = outbox.claim(lease_seconds=0)
+        assert entry["attempts"] == attempt
+        outbox.retry_later(entry, "503 Service Unavailable")
+    assert outbox.stats() == {"failed": 1}
+    assert outbox.claim(lease_seconds=0) is None
+    assert outbox.wait_until_empty(timeout=0)
+
+
+@pytest.mark.parametrize(
+    "status, text, permanent",
+    [
+        (400, '{"message": "Store not found for ChainId=1 and StoreId=2. Upload stores first."}', False),
+        (400, '{"message": "Insert stores for this chain before uploading prices"}', False),
+        (400, '{"message": "records must be a list"}', True),
+        (422, "", True),
+        (503, "", False),
+    ],
+)
+def test_is_permanent(status, text, permanent):
+    assert _is_permanent(_http_error(status, text)) is permanent
+
+
+def test_is_permanent_without_response():
+    assert not _is_permanent(requests.ConnectionError("reset"))
+
+
+def test_missing_stores_rejection_is_retried_not_parked(outbox, monkeypatch):
+    def reject(entry, timeout):
+        raise _http_error(400, '{"message": "Upload stores first"}')
+
+    monkeypatch.setattr(upload_outbox, "deliver", reject)
+    _enqueue(outbox, "Price.xml|p|0", "rami_levy")
+    drainer = OutboxDrainer(outbox, timeout=0)
+    assert drainer.drain_once()
+    assert outbox.stats() == {"pending": 1}
+
+    monkeypatch.setattr(upload_outbox, "deliver", lambda entry, timeout: None)
+    assert drainer.drain_once()
+    assert outbox.stats() == {}
@@ -11,6 +11,12 @@ export interface DataSourceInsert {
   scrapedAt?: Date;
 }
 
+export interface UploadReceiptInsert {
+  idempotencyKey: string;
+  storageKey: string;
+  records: number;
+}
+
 export interface PriceEventInsert {
   price: string;
   unit_price?: string;
@@ -48,12 +54,26 @@ export interface StoreUpsertRecord {
   };
 }
 
-export interface IDataRepository {
-  insertProducts(records: NewProduct[]): Promise<void>;
-  insertProductsWithIdentifiers(records: ProductWithIdentifierRecord[]): Promise<void>;
+// The writes of one upload chunk; inside runIdempotentUpload they share the receipt's transaction.
+export interface UploadWriter {
+  insertDataSource(record: DataSourceInsert): Promise<{ id: number }>;
   insertProductsWithPriceData(records: ProductWithIdentifierRecord[], sourceId: number): Promise<void>;
   insertStores(records: StoreUpsertRecord[]): Promise<void>;
-  insertDataSource(record: DataSourceInsert): Promise<{ id: number }>;
+}
+
+export interface IDataRepository extends UploadWriter {
+  insertProducts(records: NewProduct[]): Promise<void>;
+  insertProductsWithIdentifiers(records: ProductWithIdentifierRecord[]): Promise<void>;
+  findUploadReceipt(idempotencyKey: string): Promise<{ storageKey: string } | null>;
+  /**
+   * Inserts the receipt and runs `write` in one transaction. If the key already has a
+   * receipt (ON CONFLICT), nothing is written and the stored receipt is returned instead.
+   * `write` returns the data source id to keep on the receipt.
+   */
+  runIdempotentUpload(
+    receipt: UploadReceiptInsert,
+    write: (writer: UploadWriter) => Promise<number | undefined>,
+  ): Promise<{ storageKey: string; replayed: boolean }>;
   getChains(): Promise<Chain[]>;
   insertChain(record: NewChain): Promise<Chain>;
   updateChain(
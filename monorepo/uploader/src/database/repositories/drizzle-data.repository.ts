@@ -1,10 +1,13 @@
 import { BadRequestException, Injectable } from "@nestjs/common";
 import { and, eq, inArray, sql } from "drizzle-orm";
+import { NodePgDatabase } from "drizzle-orm/node-postgres";
 import { DrizzleService } from "../drizzle.service";
+import * as schema from "../schema";
 import {
   chains,
   Chain,
   data_sources,
+  latest_prices,
   NewChain,
   NewProduct,
   price_events,
@@ -12,14 +15,27 @@ import {
   product_specs,
   products,
   stores,
+  upload_receipts,
 } from "../schema";
 import {
   DataSourceInsert,
   IDataRepository,
   ProductWithIdentifierRecord,
   StoreUpsertRecord,
+  UploadReceiptInsert,
+  UploadWriter,
 } from "./data.repository.interface";
 
+type Database = NodePgDatabase<typeof schema>;
+type Transaction = Parameters<Parameters<Database["transaction"]>[0]>[0];
+// Writes run on the pool, or inside a caller's transaction (nested transactions become savepoints).
+type Executor = Database | Transaction;
+
+function publishedTime(publishedAt: Date | string | null | undefined): number {
+  // Missing dates count as "now", matching the COALESCE(published_at, scraped_at) upsert rule.
+  return publishedAt ? new Date(publishedAt).getTime() : Date.now();
+}
+
 @Injectable()
 export class DrizzleDataRepository implements IDataRepository {
   constructor(private readonly drizzleService: DrizzleService) {}
@@ -118,12 +134,13 @@ export class DrizzleDataRepository implements IDataRepository {
   async insertProductsWithPriceData(
     records: ProductWithIdentifierRecord[],
     sourceId: number,
+    executor?: Executor,
   ): Promise<void> {
     if (records.length === 0) {
       return;
     }
 
-    const db = this.drizzleService.getDb();
+    const db = executor ?? this.drizzleService.getDb();
 
     await db.transaction(async (tx) => {
       // 1. Resolve chain internal IDs
@@ -269,7 +286,42 @@ export class DrizzleDataRepository implements IDataRepository {
         await tx.insert(price_events).values(priceEventRows);
       }
 
-      // 8. Upsert product_specs (ON CONFLICT DO UPDATE)
+      // 8. Upsert latest_prices: one row per (product, store), newest published_at wins.
+      //    Rows without a published_at count as published when scraped.
+      const latestPriceRows = new Map<string, typeof latest_prices.$inferInsert>();
+      for (const row of priceEventRows) {
+        const key = `${row.product_id}:${row.store_id}`;
+        const previous = latestPriceRows.get(key);
+        if (!previous || publishedTime(row.published_at) >= publishedTime(previous.published_at)) {
+          latestPriceRows.set(key, {
+            product_id: row.product_id,
+            store_id: row.store_id,
+            source_id: sourceId,
+            price: row.price,
+            unit_price: row.unit_price,
+            published_at: row.published_at,
+          });
+        }
+      }
+
+      if (latestPriceRows.size > 0) {
+        await tx
+          .insert(latest_prices)
+          .values([...latestPriceRows.values()])
+          .onConflictDoUpdate({
+            target: [latest_prices.product_id, latest_prices.store_id],
+            set: {
+              source_id: sql`excluded.source_id`,
+              price: sql`excluded.price`,
+              unit_price: sql`excluded.unit_price`,
+              published_at: sql`excluded.published_at`,
+              scraped_at: sql`excluded.scraped_at`,
+            } as Record<string, unknown>,
+            setWhere: sql`COALESCE(excluded.published_at, excluded.scraped_at) >= COALESCE(${latest_prices.published_at}, ${latest_prices.scraped_at})`,
+          });
+      }
+
+      // 9. Upsert product_specs (ON CONFLICT DO UPDATE)
       const productSpecRows = allResolvedRows
         .filter((row) => row.record.productSpec)
         .map((row) => ({
@@ -298,12 +350,12 @@ export class DrizzleDataRepository implements IDataRepository {
     });
   }
 
-  async insertStores(records: StoreUpsertRecord[]): Promise<void> {
+  async insertStores(records: StoreUpsertRecord[], executor?: Executor): Promise<void> {
     if (records.length === 0) {
       return;
     }
 
-    const db = this.drizzleService.getDb();
+    const db = executor ?? this.drizzleService.getDb();
     const chainExternalIds = [...new Set(records.map((record) => record.chainExternalId))];
 
     const existingChains = await db
@@ -388,8 +440,8 @@ export class DrizzleDataRepository implements IDataRepository {
     return deletedRows.length > 0;
   }
 
-  async insertDataSource(record: DataSourceInsert): Promise<{ id: number }> {
-    const db = this.drizzleService.getDb();
+  async insertDataSource(record: DataSourceInsert, executor?: Executor): Promise<{ id: number }> {
+    const db = executor ?? this.drizzleService.getDb();
 
     const [existingChain] = await db
       .select({ id: chains.id })
@@ -416,4 +468,57 @@ export class DrizzleDataRepository implements IDataRepository {
 
     return { id: inserted.id };
   }
+
+  async findUploadReceipt(idempotencyKey: string): Promise<{ storageKey: string } | null> {
+    const db = this.drizzleService.getDb();
+
+    const [receipt] = await db
+      .select({ storageKey: upload_receipts.storage_key })
+      .from(upload_receipts)
+      .where(eq(upload_receipts.idempotency_key, idempotencyKey));
+
+    return receipt ?? null;
+  }
+
+  async runIdempotentUpload(
+    receipt: UploadReceiptInsert,
+    write: (writer: UploadWriter) => Promise<number | undefined>,
+  ): Promise<{ storageKey: string; replayed: boolean }> {
+    const db = this.drizzleService.getDb();
+
+    return db.transaction(async (tx) => {
+      // The receipt is the gate: a concurrent upload of the same key waits here until this
+      // transaction ends, then finds the receipt; a rolled-back upload leaves no receipt behind.
+      const [claimed] = await tx
+        .insert(upload_receipts)
+        .values({
+          idempotency_key: receipt.idempotencyKey,
+          storage_key: receipt.storageKey,
+          records: receipt.records,
+        })
+        .onConflictDoNothing({ target: upload_receipts.idempotency_key })
+        .returning({ storageKey: upload_receipts.storage_key });
+
+      if (!claimed) {
+        const [existing] = await tx
+          .select({ storageKey: upload_receipts.storage_key })
+          .from(upload_receipts)
+          .where(eq(upload_receipts.idempotency_key, receipt.idempotencyKey));
+        return { storageKey: existing.storageKey, replayed: true };
+      }
+
+      const sourceId = await write({
+        insertDataSource: (record) => this.insertDataSource(record, tx),
+        insertProductsWithPriceData: (records, id) => this.insertProductsWithPriceData(records, id, tx),
+        insertStores: (records) => this.insertStores(records, tx),
+      });
+      if (sourceId !== undefined) {
+        await tx
+          .update(upload_receipts)
+          .set({ source_id: sourceId })
+          .where(eq(upload_receipts.idempotency_key, receipt.idempotencyKey));
+      }
+      return { storageKey: claimed.storageKey, replayed: false };
+    });
+  }
 }
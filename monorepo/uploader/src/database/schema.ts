@@ -44,6 +44,14 @@ export const data_sources = pgTable(
   }),
 );
 
+export const upload_receipts = pgTable("upload_receipts", {
+  idempotency_key: text("idempotency_key").primaryKey(),
+  source_id: integer("source_id").references(() => data_sources.id, { onDelete: "set null" }),
+  storage_key: text("storage_key").notNull(),
+  records: integer("records").notNull(),
+  created_at: timestamp("created_at", { withTimezone: true }).defaultNow(),
+});
+
 export const stores = pgTable(
   "stores",
   {
@@ -189,10 +197,11 @@ export const product_components = pgTable(
   }),
 );
 
+// Partitioned by month on scraped_at in databases/schema.sql (Drizzle only queries it).
 export const price_events = pgTable(
   "price_events",
   {
-    id: bigint("id", { mode: "number" }).generatedByDefaultAsIdentity().primaryKey(),
+    id: bigint("id", { mode: "number" }).generatedByDefaultAsIdentity(),
     product_id: integer("product_id")
       .notNull()
       .references(() => products.id, { onDelete: "cascade" }),
@@ -204,17 +213,43 @@ export const price_events = pgTable(
       .references(() => data_sources.id, { onDelete: "cascade" }),
     price: numeric("price", { precision: 10, scale: 2 }).notNull(),
     unit_price: numeric("unit_price", { precision: 10, scale: 2 }),
-    scraped_at: timestamp("scraped_at", { withTimezone: true }).defaultNow(),
+    scraped_at: timestamp("scraped_at", { withTimezone: true }).notNull().defaultNow(),
     published_at: timestamp("published_at", { withTimezone: true }),
     raw_xml_item_data: jsonb("raw_xml_item_data"),
   },
   (table) => ({
+    price_events_pk: primaryKey({ columns: [table.id, table.scraped_at] }),
     idx_price_events_product_id: index("idx_price_events_product_id").on(table.product_id),
-    idx_price_events_scraped_at: index("idx_price_events_scraped_at").on(table.scraped_at),
+    idx_price_events_scraped_at: index("idx_price_events_scraped_at").using("brin", table.scraped_at),
+    idx_price_events_published_at: index("idx_price_events_published_at").using(
+      "brin",
+      table.published_at,
+    ),
     idx_price_events_source_id: index("idx_price_events_source_id").on(table.source_id),
   }),
 );
 
+export const latest_prices = pgTable(
+  "latest_prices",
+  {
+    product_id: integer("product_id")
+      .notNull()
+      .references(() => products.id, { onDelete: "cascade" }),
+    store_id: integer("store_id")
+      .notNull()
+      .references(() => stores.id, { onDelete: "cascade" }),
+    source_id: integer("source_id").references(() => data_sources.id, { onDelete: "set null" }),
+    price: numeric("price", { precision: 10, scale: 2 }).notNull(),
+    unit_price: numeric("unit_price", { precision: 10, scale: 2 }),
+    published_at: timestamp("published_at", { withTimezone: true }),
+    scraped_at: timestamp("scraped_at", { withTimezone: true }).notNull().defaultNow(),
+  },
+  (table) => ({
+    latest_prices_pk: primaryKey({ columns: [table.product_id, table.store_id] }),
+    idx_latest_prices_store_id: index("idx_latest_prices_store_id").on(table.store_id),
+  }),
+);
+
 export type Product = typeof products.$inferSelect;
 export type NewProduct = typeof products.$inferInsert;
 export type ProductIdentifier = typeof product_identifiers.$inferSelect;
@@ -223,5 +258,7 @@ export type Chain = typeof chains.$inferSelect;
 export type NewChain = typeof chains.$inferInsert;
 export type NewStore = typeof stores.$inferInsert;
 export type NewDataSource = typeof data_sources.$inferInsert;
+export type UploadReceipt = typeof upload_receipts.$inferSelect;
 export type NewPriceEvent = typeof price_events.$inferInsert;
+export type NewLatestPrice = typeof latest_prices.$inferInsert;
 export type NewProductSpec = typeof product_specs.$inferInsert;
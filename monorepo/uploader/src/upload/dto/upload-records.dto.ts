@@ -78,4 +78,13 @@ export class UploadRecordsDto {
   @Type(() => SourceMetadataDto)
   @IsOptional()
   source_metadata?: SourceMetadataDto;
+
+  @ApiPropertyOptional({
+    description:
+      "Identifies this chunk across retries (file name | group key | chunk index). A chunk whose key was already processed is not inserted again.",
+    example: "PriceFull7290027600007-001-201912161530.gz|1-001-456|0",
+  })
+  @IsString()
+  @IsOptional()
+  idempotency_key?: string;
 }
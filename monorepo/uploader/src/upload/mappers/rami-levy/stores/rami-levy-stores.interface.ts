@@ -15,4 +15,6 @@ export interface RamiLevyStore {
   City: string;
   ZipCode: string;
   LastUpdateDate: string;
+  Latitude?: string;
+  Longitude?: string;
 }
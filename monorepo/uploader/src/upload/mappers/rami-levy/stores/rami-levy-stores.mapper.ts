@@ -23,6 +23,9 @@ export class RamiLevyStoreMapper implements IStoreMapper {
     const city = this.parsingHelpers.getStringField(record, "City");
     const address = this.parsingHelpers.getStringField(record, "Address");
     const storeType = this.parsingHelpers.getStringField(record, "StoreType");
+    // Set by the scraper's geocoding stage when the store's address was resolved.
+    const latitude = this.parsingHelpers.getStringField(record, "Latitude");
+    const longitude = this.parsingHelpers.getStringField(record, "Longitude");
 
     if (!chainExternalId || !storeExternalId || !name) {
       this.logger.warn(
@@ -38,6 +41,8 @@ export class RamiLevyStoreMapper implements IStoreMapper {
         name,
         city: city ?? null,
         address: address ?? null,
+        latitude: latitude ?? null,
+        longitude: longitude ?? null,
         store_type: storeType ?? null,
       },
     };
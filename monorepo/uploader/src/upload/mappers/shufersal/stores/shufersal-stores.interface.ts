@@ -14,4 +14,6 @@ export interface ShufersalStore {
   City: string;
   ZipCode: string;
   LastUpdateDate: string;
+  Latitude?: string;
+  Longitude?: string;
 }
\ No newline at end of file
@@ -3,6 +3,7 @@ import { IS3Backend, S3_BACKEND } from "../s3/s3.interface";
 import {
   IDataRepository,
   DATA_REPOSITORY,
+  UploadWriter,
 } from "../database/repositories/data.repository.interface";
 import { UploadRecordsDto } from "./dto/upload-records.dto";
 import { RecordValidator } from "../s3/record-validator";
@@ -24,6 +25,11 @@ export class UploadService {
   ) {}
 
   async uploadRecords(dto: UploadRecordsDto): Promise<{ key: string }> {
+    const receipt = await this.findReceipt(dto);
+    if (receipt) {
+      return receipt;
+    }
+
     // Validate records have required fields and group integrity
     this.recordValidator.validateRecords(dto.records);
 
@@ -43,30 +49,36 @@ export class UploadService {
       );
     }
 
-    const chainExternalId = String(dto.records[0]?.ChainId ?? "");
-    const { id: sourceId } = await this.dataRepository.insertDataSource({
-      chainExternalId,
-      fileName: dto.source_metadata.file_name,
-      sourceUrl: dto.source_metadata.source_url,
-      fileType: "prices",
-      publishedAt: dto.source_metadata.published_at
-        ? new Date(dto.source_metadata.published_at)
-        : undefined,
-      scrapedAt: dto.source_metadata.scraped_at
-        ? new Date(dto.source_metadata.scraped_at)
-        : undefined,
-    });
-
     // Get the appropriate mapper for this pipeline and map records for PostgreSQL
     const mapper = this.recordMapperFactory.getMapper(dto.pipeline_name);
     const records = mapper.mapToProductsWithIdentifiers(dto.records);
-    await this.dataRepository.insertProductsWithPriceData(records, sourceId);
+    const sourceMetadata = dto.source_metadata;
+    const chainExternalId = String(dto.records[0]?.ChainId ?? "");
 
-    // Return the generated key so caller knows where data was stored
-    return { key };
+    return this.writeOnce(dto, key, async (writer) => {
+      const { id: sourceId } = await writer.insertDataSource({
+        chainExternalId,
+        fileName: sourceMetadata.file_name,
+        sourceUrl: sourceMetadata.source_url,
+        fileType: "prices",
+        publishedAt: sourceMetadata.published_at
+          ? new Date(sourceMetadata.published_at)
+          : undefined,
+        scrapedAt: sourceMetadata.scraped_at
+          ? new Date(sourceMetadata.scraped_at)
+          : undefined,
+      });
+      await writer.insertProductsWithPriceData(records, sourceId);
+      return sourceId;
+    });
   }
 
   async uploadStores(dto: UploadRecordsDto): Promise<{ key: string }> {
+    const receipt = await this.findReceipt(dto);
+    if (receipt) {
+      return receipt;
+    }
+
     this.storeRecordValidator.validateRecords(dto.records);
 
     const key = this.keyGenerator.generateStoresKey({
@@ -76,31 +88,64 @@ export class UploadService {
 
     await this.storage.uploadRecords(dto.records, key, dto.create_bucket);
 
-    // Track data source if metadata provided
-    let sourceId: number | undefined;
-    if (dto.source_metadata) {
-      const chainExternalId = String(dto.records[0]?.ChainId ?? "");
-      const result = await this.dataRepository.insertDataSource({
-        chainExternalId,
-        fileName: dto.source_metadata.file_name,
-        sourceUrl: dto.source_metadata.source_url,
-        fileType: "stores",
-        publishedAt: dto.source_metadata.published_at
-          ? new Date(dto.source_metadata.published_at)
-          : undefined,
-        scrapedAt: dto.source_metadata.scraped_at
-          ? new Date(dto.source_metadata.scraped_at)
-          : undefined,
-      });
-      sourceId = result.id;
-    }
-
     const mapper = this.storeMapperFactory.getMapper(dto.pipeline_name);
     const stores = mapper.mapToStores(dto.records);
-    await this.dataRepository.insertStores(
-      stores.map((s) => ({ ...s, sourceId })),
-    );
 
-    return { key };
+    return this.writeOnce(dto, key, async (writer) => {
+      // Track data source if metadata provided
+      let sourceId: number | undefined;
+      if (dto.source_metadata) {
+        const chainExternalId = String(dto.records[0]?.ChainId ?? "");
+        const result = await writer.insertDataSource({
+          chainExternalId,
+          fileName: dto.source_metadata.file_name,
+          sourceUrl: dto.source_metadata.source_url,
+          fileType: "stores",
+          publishedAt: dto.source_metadata.published_at
+            ? new Date(dto.source_metadata.published_at)
+            : undefined,
+          scrapedAt: dto.source_metadata.scraped_at
+            ? new Date(dto.source_metadata.scraped_at)
+            : undefined,
+        });
+        sourceId = result.id;
+      }
+
+      await writer.insertStores(
+        stores.map((s) => ({ ...s, sourceId })),
+      );
+      return sourceId;
+    });
+  }
+
+  // Replayed chunks (same idempotency key) return the original storage key without writing again.
+  private async findReceipt(dto: UploadRecordsDto): Promise<{ key: string } | null> {
+    if (!dto.idempotency_key) {
+      return null;
+    }
+    const receipt = await this.dataRepository.findUploadReceipt(dto.idempotency_key);
+    return receipt ? { key: receipt.storageKey } : null;
+  }
+
+  // With an idempotency key, the receipt is written in the same transaction as the data,
+  // so a chunk is either fully recorded with its receipt or not at all.
+  private async writeOnce(
+    dto: UploadRecordsDto,
+    key: string,
+    write: (writer: UploadWriter) => Promise<number | undefined>,
+  ): Promise<{ key: string }> {
+    if (!dto.idempotency_key) {
+      await write(this.dataRepository);
+      return { key };
+    }
+    const receipt = await this.dataRepository.runIdempotentUpload(
+      {
+        idempotencyKey: dto.idempotency_key,
+        storageKey: key,
+        records: dto.records.length,
+      },
+      write,
+    );
+    return { key: receipt.storageKey };
   }
 }